@@ -38,11 +38,166 @@ from PIL import Image
 import imageio
 import tempfile
 import numpy as np
+import cv2
 import six.moves as sm
 
 from . import meta
 from .meta import Augmenter
 
+# maximum number of channels supported by cv2's arithmetic functions
+_CV2_MAX_CHANNELS = 512
+
+
+def _apply_saturating_uint8(cv2_func, image, samples):
+    """
+    Apply a saturating arithmetic function of cv2 (e.g. cv2.add) to a uint8 image.
+
+    The image is expected to have shape (H,W,C), the samples to have either the same shape
+    or shape (H,W,1) if they are shared by all channels. If possible, the result is written
+    into the image.
+
+    """
+    if not image.flags["C_CONTIGUOUS"] or not image.flags["WRITEABLE"]:
+        image = np.copy(image)
+    if samples.shape[2] == image.shape[2]:
+        image_aug = cv2_func(image, samples, dst=image, dtype=cv2.CV_8U)
+    else:
+        samples = samples[..., 0]
+        channels = cv2.split(image)
+        for channel in channels:
+            cv2_func(channel, samples, dst=channel, dtype=cv2.CV_8U)
+        image_aug = cv2.merge(channels, dst=image)
+    # cv2 drops the channel axis for single-channel images
+    if image_aug.ndim == 2:
+        image_aug = image_aug[..., np.newaxis]
+    return image_aug
+
+
+def _draw_samples_grouped(param, shapes, per_channel, random_state, dtype=None):
+    """
+    Draw samples of a parameter for many images, using one call per group of equal sample shapes.
+
+    Each image receives samples of shape (H,W,C) if `per_channel` is True for it, otherwise
+    of shape (H,W,1). This may only be used for parameters that sample the planes of the
+    individual images independently of each other, such as `FromLowerResolution`.
+    The samples are returned in the given dtype, see `StochasticParameter.draw_samples()`.
+
+    """
+    sample_shapes = [
+        (shape[0], shape[1], shape[2] if per_channel_i else 1)
+        for shape, per_channel_i
+        in zip(shapes, per_channel)
+    ]
+    result = [None] * len(shapes)
+    for sample_shape in sorted(set(sample_shapes)):
+        indices = [i for i, sample_shape_i in enumerate(sample_shapes) if sample_shape_i == sample_shape]
+        samples = param.draw_samples((len(indices),) + sample_shape, random_state=random_state, dtype=dtype)
+        for i, samples_i in zip(indices, samples):
+            result[i] = samples_i
+    return result
+
+
+# Parameters whose samples are drawn independently of each other and of their positions, so
+# that sampling N values is equivalent to sampling an array and picking N of its components.
+_POSITION_INDEPENDENT_PARAMS = (
+    iap.Deterministic, iap.Binomial, iap.DiscreteUniform, iap.Poisson, iap.Normal,
+    iap.Laplace, iap.ChiSquare, iap.Weibull, iap.Uniform, iap.Beta
+)
+
+# Parameters that transform the samples of `other_param` elementwise. Some of them combine these
+# with the samples of a second parameter `val`, which are drawn with the same shape if
+# `elementwise` is True and otherwise once per call.
+_ELEMENTWISE_WRAPPER_PARAMS = (
+    iap.Multiply, iap.Divide, iap.Add, iap.Subtract, iap.Power,
+    iap.Absolute, iap.RandomSign, iap.ForceSign, iap.Clip, iap.Discretize
+)
+
+
+def _is_position_independent(param):
+    """
+    Estimate whether a parameter's samples do not depend on their positions in the sampled array.
+
+    Only known elementwise distributions and elementwise transformations of these (e.g.
+    `Beta(0.5, 0.5) * 255`) are accepted. Every other parameter (e.g. `FromLowerResolution`
+    or arithmetic wrappers around it) may be spatially structured and therefore has to be
+    sampled with the full shape.
+
+    """
+    if isinstance(param, iap.Choice):
+        # choices between parameters sample these with flat shapes
+        return not any([isinstance(a_i, iap.StochasticParameter) for a_i in param.a])
+    elif isinstance(param, _ELEMENTWISE_WRAPPER_PARAMS):
+        val = getattr(param, "val", None)
+        val_independent = (
+            val is None
+            or not param.elementwise
+            or isinstance(val, iap.Deterministic)
+            or _is_position_independent(val)
+        )
+        return val_independent and _is_position_independent(param.other_param)
+    return isinstance(param, _POSITION_INDEPENDENT_PARAMS)
+
+
+def _add_constant(images, value):
+    """
+    Add the same value to all pixels of all images.
+
+    This needs neither random states nor any sampling and leaves the images unchanged
+    if the value is 0. The results match those of `Add` and `AddElementwise`.
+    Values beyond [-255, 255] saturate in the same way as the values -255 or 255.
+
+    """
+    value = int(np.clip(value, -255, 255))
+    if value == 0:
+        return images
+
+    input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
+    table = np.clip(np.arange(256).astype(np.int32) + value, 0, 255).astype(np.uint8)
+    result = images
+    for i, image in enumerate(images):
+        if input_dtypes[i].type == np.uint8:
+            image_aug = ia.apply_lut(image, table)
+        else:
+            image_aug = image.astype(np.int32)
+            image_aug += value
+            image_aug = meta.clip_augmented_image_(image_aug, 0, 255) # TODO make value range more flexible
+            image_aug = meta.restore_augmented_image_dtype_(image_aug, input_dtypes[i])
+        result[i] = image_aug
+    return result
+
+
+def _multiply_constant(images, mul, round_uint8):
+    """
+    Multiply all pixels of all images with the same value.
+
+    This needs neither random states nor any sampling and leaves the images unchanged
+    if the value is 1. For uint8 images, the products are either rounded to the nearest
+    integer (as `MultiplyElementwise` does via cv2) or truncated (as `Multiply` does).
+
+    """
+    ia.do_assert(mul >= 0)
+    if mul == 1:
+        return images
+
+    input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
+    mul = np.float32(mul)
+    table = np.arange(256).astype(np.float32) * mul
+    if round_uint8:
+        table = np.rint(table, out=table)
+    table = meta.clip_augmented_image_(table, 0, 255).astype(np.uint8)
+    result = images
+    for i, image in enumerate(images):
+        if input_dtypes[i].type == np.uint8:
+            image_aug = ia.apply_lut(image, table)
+        else:
+            image_aug = image.astype(np.float32)
+            image_aug *= mul
+            image_aug = meta.clip_augmented_image_(image_aug, 0, 255) # TODO make value range more flexible
+            image_aug = meta.restore_augmented_image_dtype_(image_aug, input_dtypes[i])
+        result[i] = image_aug
+    return result
+
+
 # TODO tests
 class Add(Augmenter):
     """
@@ -109,37 +264,57 @@ class Add(Augmenter):
         self.per_channel = iap.handle_probability_param(per_channel, "per_channel")
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self.value.is_constant():
+            # per_channel has no effect if all images and channels receive the same value
+            value = self.value.get_constant_value()
+            ia.do_assert(-255 <= value <= 255) # TODO make value range more flexible
+            return _add_constant(images, value)
+
         input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
 
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
         for i in sm.xrange(nb_images):
-            image = images[i].astype(np.int32)
             rs_image = ia.new_random_state(seeds[i])
             per_channel = self.per_channel.draw_sample(random_state=rs_image)
             if per_channel == 1:
-                nb_channels = image.shape[2]
-                samples = self.value.draw_samples((nb_channels,), random_state=rs_image).astype(image.dtype)
-                for c, sample in enumerate(samples):
+                nb_channels = images[i].shape[2]
+                samples = self.value.draw_samples((nb_channels,), random_state=rs_image).astype(np.int32)
+                for sample in samples:
                     # TODO make value range more flexible
                     ia.do_assert(-255 <= sample <= 255)
-                    image[..., c] += sample
             else:
-                sample = self.value.draw_sample(random_state=rs_image).astype(image.dtype)
+                sample = self.value.draw_sample(random_state=rs_image).astype(np.int32)
                 ia.do_assert(-255 <= sample <= 255) # TODO make value range more flexible
-                image += sample
+                samples = np.int32([sample])
 
-            image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
-            image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
+            if input_dtypes[i].type == np.uint8:
+                # saturating addition via a lookup table, avoids the int32 copy of the image
+                table = np.clip(np.arange(256).astype(np.int32)[:, np.newaxis] + samples, 0, 255).astype(np.uint8)
+                image = ia.apply_lut(images[i], table if per_channel == 1 else table[:, 0])
+            else:
+                image = images[i].astype(np.int32)
+                image += samples
+                image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
+                image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
 
             result[i] = image
 
         return result
 
+    def _get_fusion_key(self):
+        return meta.FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return meta.augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -215,6 +390,10 @@ class AddElementwise(Augmenter):
         self.per_channel = iap.handle_probability_param(per_channel, "per_channel")
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self.value.is_constant():
+            # constant values do not have to be sampled per pixel
+            return _add_constant(images, self.value.get_constant_value())
+
         input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
 
         result = images
@@ -222,19 +401,27 @@ class AddElementwise(Augmenter):
         seeds = random_state.randint(0, 10**6, (nb_images,))
         for i in sm.xrange(nb_images):
             seed = seeds[i]
-            image = images[i].astype(np.int32)
-            height, width, nb_channels = image.shape
+            height, width, nb_channels = images[i].shape
             rs_image = ia.new_random_state(seed)
             per_channel = self.per_channel.draw_sample(random_state=rs_image)
             if per_channel == 1:
-                samples = self.value.draw_samples((height, width, nb_channels), random_state=rs_image).astype(image.dtype)
+                samples = self.value.draw_samples((height, width, nb_channels), random_state=rs_image)
+            else:
+                samples = self.value.draw_samples((height, width, 1), random_state=rs_image)
+
+            if input_dtypes[i].type == np.uint8 and nb_channels <= _CV2_MAX_CHANNELS:
+                # values beyond [-255, 255] saturate anyways, so clipping them keeps the
+                # results unchanged and allows int16 samples
+                samples = np.clip(samples, -255, 255).astype(np.int16)
+                after_add = _apply_saturating_uint8(cv2.add, images[i], samples)
             else:
-                samples = self.value.draw_samples((height, width, 1), random_state=rs_image).astype(image.dtype)
-                samples = np.tile(samples, (1, 1, nb_channels))
-            after_add = image + samples
+                samples = samples.astype(np.int32)
+                if samples.shape[2] != nb_channels:
+                    samples = np.tile(samples, (1, 1, nb_channels))
+                after_add = images[i].astype(np.int32) + samples
 
-            after_add = meta.clip_augmented_image_(after_add, 0, 255) # TODO make value range more flexible
-            after_add = meta.restore_augmented_image_dtype_(after_add, input_dtypes[i])
+                after_add = meta.clip_augmented_image_(after_add, 0, 255) # TODO make value range more flexible
+                after_add = meta.restore_augmented_image_dtype_(after_add, input_dtypes[i])
 
             result[i] = after_add
 
@@ -243,6 +430,9 @@ class AddElementwise(Augmenter):
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -392,36 +582,56 @@ class Multiply(Augmenter):
         self.per_channel = iap.handle_probability_param(per_channel, "per_channel")
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self.mul.is_constant():
+            # per_channel has no effect if all images and channels receive the same value
+            return _multiply_constant(images, self.mul.get_constant_value(), round_uint8=False)
+
         input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
 
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
         for i in sm.xrange(nb_images):
-            image = images[i].astype(np.float32)
             rs_image = ia.new_random_state(seeds[i])
             per_channel = self.per_channel.draw_sample(random_state=rs_image)
             if per_channel == 1:
-                nb_channels = image.shape[2]
+                nb_channels = images[i].shape[2]
                 samples = self.mul.draw_samples((nb_channels,), random_state=rs_image)
-                for c, sample in enumerate(samples):
+                for sample in samples:
                     ia.do_assert(sample >= 0)
-                    image[..., c] *= sample
             else:
                 sample = self.mul.draw_sample(random_state=rs_image)
                 ia.do_assert(sample >= 0)
-                image *= sample
-
-            image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
-            image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
+                samples = np.float64([sample])
+            samples = samples.astype(np.float32)
+
+            if input_dtypes[i].type == np.uint8:
+                # saturating multiplication via a lookup table, avoids the float32 copy of the image
+                table = np.arange(256).astype(np.float32)[:, np.newaxis] * samples
+                table = meta.clip_augmented_image_(table, 0, 255).astype(np.uint8)
+                image = ia.apply_lut(images[i], table if per_channel == 1 else table[:, 0])
+            else:
+                image = images[i].astype(np.float32)
+                image *= samples
+                image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
+                image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
 
             result[i] = image
 
         return result
 
+    def _get_fusion_key(self):
+        return meta.FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return meta.augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -438,6 +648,9 @@ class MultiplyElementwise(Augmenter):
     While the Multiply Augmenter uses a constant multiplier per image,
     this one can use different multipliers per pixel.
 
+    For uint8 images, the results are rounded to the nearest integer.
+    For other dtypes they are truncated.
+
     Parameters
     ----------
     mul : number or tuple of two number or list of number or StochasticParameter, optional(default=1.0)
@@ -499,26 +712,47 @@ class MultiplyElementwise(Augmenter):
         self.per_channel = iap.handle_probability_param(per_channel, "per_channel")
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self.mul.is_constant():
+            # constant values do not have to be sampled per pixel, e.g. for Dropout(p=0)
+            return _multiply_constant(images, self.mul.get_constant_value(), round_uint8=True)
+
         input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
 
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
+        rss_images = [ia.new_random_state(seed) for seed in seeds]
+        per_channel = [self.per_channel.draw_sample(random_state=rs_image) == 1 for rs_image in rss_images]
+        if isinstance(self.mul, iap.FromLowerResolution):
+            # coarse multipliers (e.g. from CoarseDropout) are sampled for the whole batch at once
+            samples_all = _draw_samples_grouped(self.mul, [image.shape for image in images], per_channel, random_state)
+        else:
+            samples_all = None
+
         for i in sm.xrange(nb_images):
-            seed = seeds[i]
-            image = images[i].astype(np.float32)
-            height, width, nb_channels = image.shape
-            rs_image = ia.new_random_state(seed)
-            per_channel = self.per_channel.draw_sample(random_state=rs_image)
-            if per_channel == 1:
-                samples = self.mul.draw_samples((height, width, nb_channels), random_state=rs_image)
+            height, width, nb_channels = images[i].shape
+            use_cv2 = input_dtypes[i].type == np.uint8 and nb_channels <= _CV2_MAX_CHANNELS
+            # the cv2 path works with float32 multipliers, which can be sampled directly in that dtype
+            samples_dtype = np.float32 if use_cv2 else None
+            if samples_all is not None:
+                samples = samples_all[i]
+            elif per_channel[i]:
+                samples = self.mul.draw_samples((height, width, nb_channels), random_state=rss_images[i], dtype=samples_dtype)
             else:
-                samples = self.mul.draw_samples((height, width, 1), random_state=rs_image)
-                samples = np.tile(samples, (1, 1, nb_channels))
-            image = image * samples
+                samples = self.mul.draw_samples((height, width, 1), random_state=rss_images[i], dtype=samples_dtype)
 
-            image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
-            image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
+            if use_cv2:
+                # note that cv2 rounds the products to the nearest integer
+                # uint8 multipliers, e.g. masks from CoarseDropout, can be used without conversion
+                samples_cv2 = samples if samples.dtype.type == np.uint8 else samples.astype(np.float32)
+                image = _apply_saturating_uint8(cv2.multiply, images[i], samples_cv2)
+            else:
+                if samples.shape[2] != nb_channels:
+                    samples = np.tile(samples, (1, 1, nb_channels))
+                image = images[i].astype(np.float32) * samples
+
+                image = meta.clip_augmented_image_(image, 0, 255) # TODO make value range more flexible
+                image = meta.restore_augmented_image_dtype_(image, input_dtypes[i])
 
             result[i] = image
 
@@ -527,6 +761,9 @@ class MultiplyElementwise(Augmenter):
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -816,50 +1053,65 @@ class ReplaceElementwise(Augmenter):
         self.per_channel = iap.handle_probability_param(per_channel, "per_channel")
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self.mask.is_constant() and self.mask.get_constant_value() == 0:
+            # nothing is replaced, e.g. for SaltAndPepper(p=0)
+            return images
+
         input_dtypes = meta.copy_dtypes_for_restore(images, force_list=True)
 
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
+        per_channel = [self.per_channel.draw_samples_seeded((1,), seed+1)[0] == 1 for seed in seeds]
+        if isinstance(self.mask, iap.FromLowerResolution):
+            # coarse masks (e.g. from CoarseSaltAndPepper) are sampled for the whole batch at once
+            mask_samples_all = _draw_samples_grouped(self.mask, [image.shape for image in images], per_channel, random_state, dtype=np.bool_)
+        else:
+            mask_samples_all = None
+
         for i in sm.xrange(nb_images):
             seed = seeds[i]
-            image = images[i].astype(np.float32)
+            image = images[i]
             height, width, nb_channels = image.shape
-            per_channel = self.per_channel.draw_sample(random_state=ia.new_random_state(seed+1))
-            if per_channel == 1:
-                mask_samples = self.mask.draw_samples(
-                    (height, width, nb_channels),
-                    random_state=ia.new_random_state(seed+2)
-                )
-                replacement_samples = self.replacement.draw_samples(
-                    (height, width, nb_channels),
-                    random_state=ia.new_random_state(seed+3)
-                )
+            sample_shape = (height, width, nb_channels if per_channel[i] else 1)
+            if mask_samples_all is not None:
+                mask_thresh = mask_samples_all[i]
             else:
-                mask_samples = self.mask.draw_samples(
-                    (height, width, 1),
-                    random_state=ia.new_random_state(seed+2)
-                )
-                mask_samples = np.tile(mask_samples, (1, 1, nb_channels))
-                replacement_samples = self.replacement.draw_samples(
-                    (height, width, 1),
-                    random_state=ia.new_random_state(seed+3)
-                )
-                replacement_samples = np.tile(replacement_samples, (1, 1, nb_channels))
-
-            mask_thresh = mask_samples > 0.5
-            image_repl = image * (~mask_thresh) + replacement_samples * mask_thresh
-
-            image_repl = meta.clip_augmented_image_(image_repl, 0, 255) # TODO make value range more flexible
-            image_repl = meta.restore_augmented_image_dtype_(image_repl, input_dtypes[i])
+                mask_thresh = self.mask.draw_samples_seeded(sample_shape, seed+2, dtype=np.bool_)
+
+            # Replacement values are only sampled for the masked components and then written
+            # into the image, so that the costs scale with the mask's size instead of the
+            # image size. If the mask is shared by all channels, so are the replacement values.
+            nb_replaced = int(np.sum(mask_thresh))
+            if nb_replaced == 0:
+                result[i] = image
+                continue
+
+            if _is_position_independent(self.replacement):
+                replacement_samples = self.replacement.draw_samples_seeded((nb_replaced,), seed+3)
+            else:
+                # possibly spatially structured replacements have to be sampled on the whole plane
+                replacement_samples = self.replacement.draw_samples_seeded(sample_shape, seed+3)[mask_thresh]
+            replacement_samples = np.clip(replacement_samples, 0, 255) # TODO make value range more flexible
+            replacement_samples = meta.restore_augmented_image_dtype_(replacement_samples, input_dtypes[i])
+
+            if not image.flags["WRITEABLE"]:
+                image = np.copy(image)
+            if per_channel[i]:
+                image[mask_thresh] = replacement_samples
+            else:
+                image[mask_thresh[..., 0]] = replacement_samples[:, np.newaxis]
 
-            result[i] = image_repl
+            result[i] = image
 
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -1482,9 +1734,18 @@ class Invert(Augmenter):
 
         return result
 
+    def _get_fusion_key(self):
+        return meta.FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return meta.augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -1574,9 +1835,18 @@ class ContrastNormalization(Augmenter):
 
         return result
 
+    def _get_fusion_key(self):
+        return meta.FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return meta.augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -1673,6 +1943,9 @@ class JpegCompression(Augmenter):
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -82,7 +82,8 @@ class GaussianBlur(Augmenter): # pylint: disable=locally-disabled, unused-variab
         result = images
         nb_images = len(images)
         samples = self.sigma.draw_samples((nb_images,), random_state=random_state)
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
             nb_channels = images[i].shape[2]
             sig = samples[i]
             if sig > 0 + self.eps:
@@ -92,11 +93,16 @@ class GaussianBlur(Augmenter): # pylint: disable=locally-disabled, unused-variab
                 # values might be mixed with blue values in RGB)
                 for channel in sm.xrange(nb_channels):
                     result[i][:, :, channel] = ndimage.gaussian_filter(result[i][:, :, channel], sig)
+
+        self._map_images(_augment_image, nb_images)
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -198,7 +204,8 @@ class AverageBlur(Augmenter): # pylint: disable=locally-disabled, unused-variabl
                 self.k[0].draw_samples((nb_images,), random_state=random_state),
                 self.k[1].draw_samples((nb_images,), random_state=random_state),
             )
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
             kh, kw = samples[0][i], samples[1][i]
             #print(images.shape, result.shape, result[i].shape)
             kernel_impossible = (kh == 0 or kw == 0)
@@ -209,11 +216,16 @@ class AverageBlur(Augmenter): # pylint: disable=locally-disabled, unused-variabl
                 if image_aug.ndim == 2:
                     image_aug = image_aug[..., np.newaxis]
                 result[i] = image_aug
+
+        self._map_images(_augment_image, nb_images)
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -281,7 +293,8 @@ class MedianBlur(Augmenter): # pylint: disable=locally-disabled, unused-variable
         result = images
         nb_images = len(images)
         samples = self.k.draw_samples((nb_images,), random_state=random_state)
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
             ki = samples[i]
             if ki > 1:
                 ki = ki + 1 if ki % 2 == 0 else ki
@@ -291,11 +304,16 @@ class MedianBlur(Augmenter): # pylint: disable=locally-disabled, unused-variable
                 if image_aug.ndim == 2:
                     image_aug = image_aug[..., np.newaxis]
                 result[i] = image_aug
+
+        self._map_images(_augment_image, nb_images)
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -388,22 +406,29 @@ class BilateralBlur(Augmenter): # pylint: disable=locally-disabled, unused-varia
         result = images
         nb_images = len(images)
         seed = random_state.randint(0, 10**6)
-        samples_d = self.d.draw_samples((nb_images,), random_state=ia.new_random_state(seed))
-        samples_sigma_color = self.sigma_color.draw_samples((nb_images,), random_state=ia.new_random_state(seed+1))
-        samples_sigma_space = self.sigma_space.draw_samples((nb_images,), random_state=ia.new_random_state(seed+2))
+        samples_d = self.d.draw_samples_seeded((nb_images,), seed)
+        samples_sigma_color = self.sigma_color.draw_samples_seeded((nb_images,), seed+1)
+        samples_sigma_space = self.sigma_space.draw_samples_seeded((nb_images,), seed+2)
         for i in sm.xrange(nb_images):
             ia.do_assert(images[i].shape[2] == 3, "BilateralBlur can currently only be applied to images with 3 channels.")
+
+        def _augment_image(i):
             di = samples_d[i]
             sigma_color_i = samples_sigma_color[i]
             sigma_space_i = samples_sigma_space[i]
 
             if di != 1:
                 result[i] = cv2.bilateralFilter(images[i], di, sigma_color_i, sigma_space_i)
+
+        self._map_images(_augment_image, nb_images)
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
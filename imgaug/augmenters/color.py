@@ -30,6 +30,7 @@ import cv2
 import six.moves as sm
 import warnings
 
+from . import meta
 from .meta import Augmenter, WithChannels, handle_children_list
 from .arithmetic import Add
 
@@ -39,6 +40,114 @@ def InColorspace(to_colorspace, from_colorspace="RGB", children=None, name=None,
     warnings.warn('InColorspace is deprecated. Use WithColorspace.', DeprecationWarning)
     return WithColorspace(to_colorspace, from_colorspace, children, name, deterministic, random_state)
 
+def _convert_colorspace(image, from_colorspace, to_colorspace):
+    """
+    Convert a single image (or a stack of images concatenated along the y-axis)
+    between two colorspaces.
+
+    Parameters
+    ----------
+    image : (H,W,C) ndarray
+        The image to convert.
+
+    from_colorspace : string
+        The current colorspace of the image.
+
+    to_colorspace : string
+        The target colorspace.
+
+    Returns
+    -------
+    img_to_cs : (H,W,3) ndarray
+        The converted image with dtype uint8.
+
+    """
+    # some colorspaces here should use image/255.0 according to the docs,
+    # but at least for conversion to grayscale that results in errors,
+    # ie uint8 is expected
+    if from_colorspace in [ChangeColorspace.RGB, ChangeColorspace.BGR]:
+        from_to_var_name = "%s2%s" % (from_colorspace, to_colorspace)
+        from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
+        img_to_cs = cv2.cvtColor(image, from_to_var)
+    else:
+        # convert to RGB
+        from_to_var_name = "%s2%s" % (from_colorspace, ChangeColorspace.RGB)
+        from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
+        img_rgb = cv2.cvtColor(image, from_to_var)
+
+        if to_colorspace == ChangeColorspace.RGB:
+            img_to_cs = img_rgb
+        else:
+            # convert from RGB to desired target colorspace
+            from_to_var_name = "%s2%s" % (ChangeColorspace.RGB, to_colorspace)
+            from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
+            img_to_cs = cv2.cvtColor(img_rgb, from_to_var)
+
+    # this will break colorspaces that have values outside 0-255 or 0.0-1.0
+    if ia.is_integer_array(img_to_cs):
+        img_to_cs = np.clip(img_to_cs, 0, 255).astype(np.uint8)
+    else:
+        img_to_cs = np.clip(img_to_cs * 255, 0, 255).astype(np.uint8)
+
+    # for grayscale: covnert from (H, W) to (H, W, 3)
+    if len(img_to_cs.shape) == 2:
+        img_to_cs = img_to_cs[:, :, np.newaxis]
+        img_to_cs = np.tile(img_to_cs, (1, 1, 3))
+
+    return img_to_cs
+
+
+def _convert_colorspaces(images, from_colorspace, to_colorspace):
+    """
+    Convert multiple images between two colorspaces.
+
+    All colorspace conversions are pixelwise, so images with the same shape
+    and dtype are concatenated along the y-axis and converted with a single
+    call.
+
+    Parameters
+    ----------
+    images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+        The images to convert.
+
+    from_colorspace : string
+        The current colorspace of the images.
+
+    to_colorspace : string
+        The target colorspace.
+
+    Returns
+    -------
+    images_to_cs : (N,H,W,3) ndarray or list of (H,W,3) ndarray
+        The converted images with dtype uint8.
+        An array if the input was an array, otherwise a list.
+
+    """
+    if ia.is_np_array(images):
+        nb_images, height, width, nb_channels = images.shape
+        if nb_images == 0:
+            return images
+        images_stacked = images.reshape((nb_images * height, width, nb_channels))
+        images_to_cs = _convert_colorspace(images_stacked, from_colorspace, to_colorspace)
+        return images_to_cs.reshape((nb_images, height, width, images_to_cs.shape[2]))
+    else:
+        indices_by_group = dict()
+        for i, image in enumerate(images):
+            indices_by_group.setdefault((image.shape, image.dtype.name), []).append(i)
+
+        result = [None] * len(images)
+        for (shape, _dtype_name), indices in indices_by_group.items():
+            if len(indices) == 1:
+                result[indices[0]] = _convert_colorspace(images[indices[0]], from_colorspace, to_colorspace)
+            else:
+                images_stacked = np.concatenate([images[i] for i in indices], axis=0)
+                images_to_cs = _convert_colorspace(images_stacked, from_colorspace, to_colorspace)
+                images_to_cs = images_to_cs.reshape((len(indices), shape[0], shape[1], images_to_cs.shape[2]))
+                for idx, i in enumerate(indices):
+                    result[i] = images_to_cs[idx]
+        return result
+
+
 class WithColorspace(Augmenter):
     """
     Apply child augmenters within a specific colorspace.
@@ -48,6 +157,12 @@ class WithColorspace(Augmenter):
     child augmenters C and finally changes the colorspace back from B to A.
     See also ChangeColorspace() for more.
 
+    If multiple WithColorspace augmenters with the same source and target
+    colorspaces directly follow each other in a `Sequential`, the images are
+    only converted once to B before the first one's children and once back
+    to A after the last one's children. The roundtrip conversions between
+    the augmenters are skipped. (This is not done if hooks are used.)
+
     Parameters
     ----------
     to_colorspace : string
@@ -88,21 +203,42 @@ class WithColorspace(Augmenter):
     def _augment_images(self, images, random_state, parents, hooks):
         result = images
         if hooks.is_propagating(images, augmenter=self, parents=parents, default=True):
-            result = ChangeColorspace(
-                to_colorspace=self.to_colorspace,
-                from_colorspace=self.from_colorspace,
-            ).augment_images(images=result)
+            result = self._change_colorspace(result, self.from_colorspace, self.to_colorspace)
             result = self.children.augment_images(
                 images=result,
                 parents=parents + [self],
                 hooks=hooks,
             )
-            result = ChangeColorspace(
-                to_colorspace=self.from_colorspace,
-                from_colorspace=self.to_colorspace,
-            ).augment_images(images=result)
+            result = self._change_colorspace(result, self.to_colorspace, self.from_colorspace)
+        return result
+
+    def _get_fusion_key(self):
+        if not self.activated:
+            return None
+        return ("WithColorspace", self.from_colorspace, self.to_colorspace)
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        result = self._change_colorspace(images, self.from_colorspace, self.to_colorspace)
+        for augmenter in augmenters:
+            result = meta.call_with_random_state(
+                augmenter,
+                lambda _random_state: augmenter.children.augment_images(
+                    images=result,
+                    parents=parents + [augmenter],
+                    hooks=hooks,
+                )
+            )
+        result = self._change_colorspace(result, self.to_colorspace, self.from_colorspace)
         return result
 
+    @classmethod
+    def _change_colorspace(cls, images, from_colorspace, to_colorspace):
+        if from_colorspace == to_colorspace:
+            return images
+        input_dtypes = meta.copy_dtypes_for_restore(images)
+        images_to_cs = _convert_colorspaces(images, from_colorspace, to_colorspace)
+        return meta.restore_augmented_images_dtypes_(images_to_cs, input_dtypes)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         result = heatmaps
         if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
@@ -113,6 +249,16 @@ class WithColorspace(Augmenter):
             )
         return result
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        result = segmaps
+        if hooks.is_propagating(segmaps, augmenter=self, parents=parents, default=True):
+            result = self.children.augment_segmentation_maps(
+                result,
+                parents=parents + [self],
+                hooks=hooks,
+            )
+        return result
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         result = keypoints_on_images
         if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
@@ -322,6 +468,10 @@ class ChangeColorspace(Augmenter):
         nb_images = len(images)
         alphas = self.alpha.draw_samples((nb_images,), random_state=ia.copy_random_state(random_state))
         to_colorspaces = self.to_colorspace.draw_samples((nb_images,), random_state=ia.copy_random_state(random_state))
+
+        # group the images by target colorspace, so that each group can be
+        # converted in one batch
+        indices_by_colorspace = dict()
         for i in sm.xrange(nb_images):
             alpha = alphas[i]
             to_colorspace = to_colorspaces[i]
@@ -333,10 +483,6 @@ class ChangeColorspace(Augmenter):
             if alpha == 0 or self.from_colorspace == to_colorspace:
                 pass # no change necessary
             else:
-                # some colorspaces here should use image/255.0 according to the docs,
-                # but at least for conversion to grayscale that results in errors,
-                # ie uint8 is expected
-
                 if image.ndim != 3:
                     warnings.warn(
                         "Received an image with %d dimensions in "
@@ -351,36 +497,20 @@ class ChangeColorspace(Augmenter):
                         "e.g. called during grayscale conversion and hue/saturation "
                         "changes.)" % (image.shape[2],)
                     )
+                indices_by_colorspace.setdefault(to_colorspace, []).append(i)
 
-                if self.from_colorspace in [ChangeColorspace.RGB, ChangeColorspace.BGR]:
-                    from_to_var_name = "%s2%s" % (self.from_colorspace, to_colorspace)
-                    from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
-                    img_to_cs = cv2.cvtColor(image, from_to_var)
-                else:
-                    # convert to RGB
-                    from_to_var_name = "%s2%s" % (self.from_colorspace, ChangeColorspace.RGB)
-                    from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
-                    img_rgb = cv2.cvtColor(image, from_to_var)
-
-                    if to_colorspace == ChangeColorspace.RGB:
-                        img_to_cs = img_rgb
-                    else:
-                        # convert from RGB to desired target colorspace
-                        from_to_var_name = "%s2%s" % (ChangeColorspace.RGB, to_colorspace)
-                        from_to_var = ChangeColorspace.CV_VARS[from_to_var_name]
-                        img_to_cs = cv2.cvtColor(img_rgb, from_to_var)
-
-                # this will break colorspaces that have values outside 0-255 or 0.0-1.0
-                if ia.is_integer_array(img_to_cs):
-                    img_to_cs = np.clip(img_to_cs, 0, 255).astype(np.uint8)
-                else:
-                    img_to_cs = np.clip(img_to_cs * 255, 0, 255).astype(np.uint8)
-
-                # for grayscale: covnert from (H, W) to (H, W, 3)
-                if len(img_to_cs.shape) == 2:
-                    img_to_cs = img_to_cs[:, :, np.newaxis]
-                    img_to_cs = np.tile(img_to_cs, (1, 1, 3))
+        for to_colorspace, indices in indices_by_colorspace.items():
+            if not ia.is_np_array(images):
+                images_to_convert = [images[i] for i in indices]
+            elif len(indices) == nb_images:
+                images_to_convert = images
+            else:
+                images_to_convert = images[indices]
+            images_to_cs = _convert_colorspaces(images_to_convert, self.from_colorspace, to_colorspace)
 
+            for img_to_cs, i in zip(images_to_cs, indices):
+                alpha = alphas[i]
+                image = images[i]
                 if alpha >= (1 - self.eps):
                     result[i] = img_to_cs
                 elif alpha <= self.eps:
@@ -393,6 +523,9 @@ class ChangeColorspace(Augmenter):
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -236,14 +236,19 @@ class _ContrastFuncWrapper(Augmenter):
     def _augment_images(self, images, random_state, parents, hooks):
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, size=(1+nb_images,))
-        per_channel = self.per_channel.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[0]))
+        per_channel = self.per_channel.draw_samples_seeded((nb_images,), seeds[0])
 
         result = images
         for i, (image, per_channel_i, seed) in enumerate(zip(images, per_channel, seeds[1:])):
             rs = ia.new_random_state(seed)
             nb_channels = 1 if per_channel_i <= 0.5 else image.shape[2]
             samples_i = [param.draw_samples((nb_channels,), random_state=rs) for param in self.params1d]
-            if per_channel_i > 0.5:
+            if image.dtype.type == np.uint8:
+                # All contrast functions are pointwise, so for uint8 images they can be
+                # evaluated once for all 256 possible values and then applied as a lookup table.
+                table = self._compute_lut(samples_i, nb_channels)
+                image_aug = ia.apply_lut(image, table)
+            elif per_channel_i > 0.5:
                 input_dtype = image.dtype
                 image_aug = image.astype(np.float64)
                 for c in sm.xrange(nb_channels):
@@ -257,9 +262,28 @@ class _ContrastFuncWrapper(Augmenter):
             result[i] = image_aug
         return result
 
+    def _compute_lut(self, samples, nb_channels):
+        values = np.arange(256).astype(np.uint8)
+        if nb_channels == 1:
+            return self.func(*tuple([values] + samples))
+        table = np.zeros((256, nb_channels), dtype=np.uint8)
+        for c in sm.xrange(nb_channels):
+            samples_c = [sample[c] for sample in samples]
+            table[:, c] = self.func(*tuple([values] + samples_c))
+        return table
+
+    def _get_fusion_key(self):
+        return meta.FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return meta.augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
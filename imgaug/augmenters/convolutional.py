@@ -28,11 +28,124 @@ from .. import parameters as iap
 import numpy as np
 import cv2
 import six.moves as sm
-import types
 
 from . import meta
 from .meta import Augmenter
 
+
+def _are_matrices_identical(matrices):
+    """
+    Check whether all per-channel convolution matrices are identical.
+
+    Parameters
+    ----------
+    matrices : list of (None or ndarray) or ndarray
+        The per-channel matrices, with the channel index being the first axis.
+
+    Returns
+    -------
+    out : bool
+        True if every entry is None or if every entry is the same matrix.
+
+    """
+    first = matrices[0]
+    for matrix in matrices[1:]:
+        if matrix is first:
+            continue
+        elif first is None or matrix is None:
+            return False
+        elif not np.array_equal(matrix, first):
+            return False
+    return True
+
+
+class _QuantizedMatrixCache(object):
+    """
+    Cache for convolution matrices that are generated from continuous parameters.
+
+    The parameters are rounded to `decimals` decimal places and the matrix is
+    then generated from the rounded values. That way, images with (nearly) the
+    same sampled parameters can reuse the same matrix and the result does not
+    depend on whether the matrix was already in the cache or not.
+
+    Parameters
+    ----------
+    func : callable
+        Function that receives the rounded parameters and returns a matrix.
+
+    decimals : int, optional(default=3)
+        Number of decimal places to round each parameter to.
+
+    max_size : int, optional(default=1024)
+        Maximum number of cached matrices. The cache is cleared once this
+        size is exceeded.
+
+    """
+
+    def __init__(self, func, decimals=3, max_size=1024):
+        self.func = func
+        self.decimals = decimals
+        self.max_size = max_size
+        self.matrices = dict()
+
+    def __getstate__(self):
+        # cached matrices are not copied, they are regenerated on demand
+        state = self.__dict__.copy()
+        state["matrices"] = dict()
+        return state
+
+    def get(self, *params):
+        key = tuple([round(float(param), self.decimals) for param in params])
+        matrix = self.matrices.get(key)
+        if matrix is None:
+            if len(self.matrices) >= self.max_size:
+                self.matrices.clear()
+            matrix = self.func(*key)
+            # the same matrix object is returned for many images, so make sure
+            # that it is not accidentally changed in-place
+            matrix.flags.writeable = False
+            self.matrices[key] = matrix
+        return matrix
+
+
+class _MatricesGenerator(object):
+    """
+    Callable for `Convolve` that generates one matrix per image from sampled parameters.
+
+    The samples of `alpha_param` and `other_params` are drawn per image (in that order)
+    and passed to `create_matrix`. The same matrix is used for all channels.
+
+    This is a class instead of a closure, so that augmenters using it can be
+    converted to configs (see `imgaug.to_config()`).
+
+    Parameters
+    ----------
+    create_matrix : callable
+        Module-level function that receives the samples and returns a matrix.
+
+    alpha_param : StochasticParameter
+        Parameter to sample the alpha value (in the interval [0, 1]) from.
+
+    other_params : list of StochasticParameter
+        Further parameters to sample per image.
+
+    """
+
+    def __init__(self, create_matrix, alpha_param, other_params):
+        self.alpha_param = alpha_param
+        self.other_params = other_params
+        self.matrix_cache = _QuantizedMatrixCache(create_matrix)
+
+    def _draw_samples(self, random_state_func):
+        alpha_sample = self.alpha_param.draw_sample(random_state=random_state_func)
+        ia.do_assert(0 <= alpha_sample <= 1.0)
+        return [alpha_sample] + [param.draw_sample(random_state=random_state_func) for param in self.other_params]
+
+    def __call__(self, image, nb_channels, random_state_func):
+        matrix = self.matrix_cache.get(*self._draw_samples(random_state_func))
+        return [matrix] * nb_channels
+
+
 # TODO tests
 class Convolve(Augmenter):
     """
@@ -101,7 +214,7 @@ class Convolve(Augmenter):
             ia.do_assert(len(matrix.shape) == 2, "Expected convolution matrix to have 2 axis, got %d (shape %s)." % (len(matrix.shape), matrix.shape))
             self.matrix = matrix
             self.matrix_type = "constant"
-        elif isinstance(matrix, types.FunctionType):
+        elif ia.is_callable(matrix):
             self.matrix = matrix
             self.matrix_type = "function"
         else:
@@ -140,14 +253,29 @@ class Convolve(Augmenter):
             else:
                 raise Exception("Invalid matrix type")
 
-            for channel in sm.xrange(nb_channels):
-                if matrices[channel] is not None:
+            if _are_matrices_identical(matrices):
+                # Fast path: All channels use the same kernel (always the case for Sharpen,
+                # Emboss, EdgeDetect, DirectedEdgeDetect), so we can filter all channels
+                # in one call.
+                if matrices[0] is not None:
                     # ndimage.convolve caused problems here
-                    result_ic = cv2.filter2D(result[i][..., channel], -1, matrices[channel])
+                    result_i = cv2.filter2D(result[i], -1, matrices[0])
+                    # cv2 drops the channel axis for single-channel images
+                    if result_i.ndim == 2:
+                        result_i = result_i[..., np.newaxis]
                     # TODO make value range more flexible
-                    result_ic = meta.clip_augmented_images_(result_ic, 0, 255)
-                    result_ic = meta.restore_augmented_images_dtypes_(result_ic, input_dtypes[i])
-                    result[i][..., channel] = result_ic
+                    result_i = meta.clip_augmented_image_(result_i, 0, 255)
+                    result_i = meta.restore_augmented_image_dtype_(result_i, input_dtypes[i])
+                    result[i] = result_i
+            else:
+                for channel in sm.xrange(nb_channels):
+                    if matrices[channel] is not None:
+                        # ndimage.convolve caused problems here
+                        result_ic = cv2.filter2D(result[i][..., channel], -1, matrices[channel])
+                        # TODO make value range more flexible
+                        result_ic = meta.clip_augmented_images_(result_ic, 0, 255)
+                        result_ic = meta.restore_augmented_images_dtypes_(result_ic, input_dtypes[i])
+                        result[i][..., channel] = result_ic
 
         return result
 
@@ -155,6 +283,9 @@ class Convolve(Augmenter):
         # TODO this can fail for some matrices, e.g. [[0, 0, 1]]
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         # TODO this can fail for some matrices, e.g. [[0, 0, 1]]
         return keypoints_on_images
@@ -221,28 +352,27 @@ def Sharpen(alpha=0, lightness=1, name=None, deterministic=False, random_state=N
     alpha_param = iap.handle_continuous_param(alpha, "alpha", value_range=(0, 1.0), tuple_to_uniform=True, list_to_choice=True)
     lightness_param = iap.handle_continuous_param(lightness, "lightness", value_range=(0, None), tuple_to_uniform=True, list_to_choice=True)
 
-    def create_matrices(image, nb_channels, random_state_func):
-        alpha_sample = alpha_param.draw_sample(random_state=random_state_func)
-        ia.do_assert(0 <= alpha_sample <= 1.0)
-        lightness_sample = lightness_param.draw_sample(random_state=random_state_func)
-        matrix_nochange = np.array([
-            [0, 0, 0],
-            [0, 1, 0],
-            [0, 0, 0]
-        ], dtype=np.float32)
-        matrix_effect = np.array([
-            [-1, -1, -1],
-            [-1, 8+lightness_sample, -1],
-            [-1, -1, -1]
-        ], dtype=np.float32)
-        matrix = (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
-        return [matrix] * nb_channels
+    create_matrices = _MatricesGenerator(_create_sharpen_matrix, alpha_param, [lightness_param])
 
     if name is None:
         name = "Unnamed%s" % (ia.caller_name(),)
 
     return Convolve(create_matrices, name=name, deterministic=deterministic, random_state=random_state)
 
+
+def _create_sharpen_matrix(alpha_sample, lightness_sample):
+    matrix_nochange = np.array([
+        [0, 0, 0],
+        [0, 1, 0],
+        [0, 0, 0]
+    ], dtype=np.float32)
+    matrix_effect = np.array([
+        [-1, -1, -1],
+        [-1, 8+lightness_sample, -1],
+        [-1, -1, -1]
+    ], dtype=np.float32)
+    return (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
+
 # TODO tests
 def Emboss(alpha=0, strength=1, name=None, deterministic=False, random_state=None):
     """
@@ -300,28 +430,27 @@ def Emboss(alpha=0, strength=1, name=None, deterministic=False, random_state=Non
     alpha_param = iap.handle_continuous_param(alpha, "alpha", value_range=(0, 1.0), tuple_to_uniform=True, list_to_choice=True)
     strength_param = iap.handle_continuous_param(strength, "strength", value_range=(0, None), tuple_to_uniform=True, list_to_choice=True)
 
-    def create_matrices(image, nb_channels, random_state_func):
-        alpha_sample = alpha_param.draw_sample(random_state=random_state_func)
-        ia.do_assert(0 <= alpha_sample <= 1.0)
-        strength_sample = strength_param.draw_sample(random_state=random_state_func)
-        matrix_nochange = np.array([
-            [0, 0, 0],
-            [0, 1, 0],
-            [0, 0, 0]
-        ], dtype=np.float32)
-        matrix_effect = np.array([
-            [-1-strength_sample, 0-strength_sample, 0],
-            [0-strength_sample, 1, 0+strength_sample],
-            [0, 0+strength_sample, 1+strength_sample]
-        ], dtype=np.float32)
-        matrix = (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
-        return [matrix] * nb_channels
+    create_matrices = _MatricesGenerator(_create_emboss_matrix, alpha_param, [strength_param])
 
     if name is None:
         name = "Unnamed%s" % (ia.caller_name(),)
 
     return Convolve(create_matrices, name=name, deterministic=deterministic, random_state=random_state)
 
+
+def _create_emboss_matrix(alpha_sample, strength_sample):
+    matrix_nochange = np.array([
+        [0, 0, 0],
+        [0, 1, 0],
+        [0, 0, 0]
+    ], dtype=np.float32)
+    matrix_effect = np.array([
+        [-1-strength_sample, 0-strength_sample, 0],
+        [0-strength_sample, 1, 0+strength_sample],
+        [0, 0+strength_sample, 1+strength_sample]
+    ], dtype=np.float32)
+    return (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
+
 # TODO tests
 def EdgeDetect(alpha=0, name=None, deterministic=False, random_state=None):
     """
@@ -362,27 +491,27 @@ def EdgeDetect(alpha=0, name=None, deterministic=False, random_state=None):
     """
     alpha_param = iap.handle_continuous_param(alpha, "alpha", value_range=(0, 1.0), tuple_to_uniform=True, list_to_choice=True)
 
-    def create_matrices(image, nb_channels, random_state_func):
-        alpha_sample = alpha_param.draw_sample(random_state=random_state_func)
-        ia.do_assert(0 <= alpha_sample <= 1.0)
-        matrix_nochange = np.array([
-            [0, 0, 0],
-            [0, 1, 0],
-            [0, 0, 0]
-        ], dtype=np.float32)
-        matrix_effect = np.array([
-            [0, 1, 0],
-            [1, -4, 1],
-            [0, 1, 0]
-        ], dtype=np.float32)
-        matrix = (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
-        return [matrix] * nb_channels
+    create_matrices = _MatricesGenerator(_create_edge_detect_matrix, alpha_param, [])
 
     if name is None:
         name = "Unnamed%s" % (ia.caller_name(),)
 
     return Convolve(create_matrices, name=name, deterministic=deterministic, random_state=random_state)
 
+
+def _create_edge_detect_matrix(alpha_sample):
+    matrix_nochange = np.array([
+        [0, 0, 0],
+        [0, 1, 0],
+        [0, 0, 0]
+    ], dtype=np.float32)
+    matrix_effect = np.array([
+        [0, 1, 0],
+        [1, -4, 1],
+        [0, 1, 0]
+    ], dtype=np.float32)
+    return (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
+
 # TODO tests
 # TODO merge EdgeDetect and DirectedEdgeDetect?
 def DirectedEdgeDetect(alpha=0, direction=(0.0, 1.0), name=None, deterministic=False, random_state=None):
@@ -456,59 +585,66 @@ def DirectedEdgeDetect(alpha=0, direction=(0.0, 1.0), name=None, deterministic=F
     alpha_param = iap.handle_continuous_param(alpha, "alpha", value_range=(0, 1.0), tuple_to_uniform=True, list_to_choice=True)
     direction_param = iap.handle_continuous_param(direction, "direction", value_range=None, tuple_to_uniform=True, list_to_choice=True)
 
-    def create_matrices(image, nb_channels, random_state_func):
-        alpha_sample = alpha_param.draw_sample(random_state=random_state_func)
-        ia.do_assert(0 <= alpha_sample <= 1.0)
-        direction_sample = direction_param.draw_sample(random_state=random_state_func)
-
-        deg = int(direction_sample * 360) % 360
-        rad = np.deg2rad(deg)
-        x = np.cos(rad - 0.5*np.pi)
-        y = np.sin(rad - 0.5*np.pi)
-        #x = (deg % 90) / 90 if 0 <= deg <= 180 else -(deg % 90) / 90
-        #y = (-1) + (deg % 90) / 90 if 90 < deg < 270 else 1 - (deg % 90) / 90
-        direction_vector = np.array([x, y])
-
-        #print("direction_vector", direction_vector)
-
-        #vertical_vector = np.array([0, 1])
-
-        matrix_effect = np.array([
-            [0, 0, 0],
-            [0, 0, 0],
-            [0, 0, 0]
-        ], dtype=np.float32)
-        for x in [-1, 0, 1]:
-            for y in [-1, 0, 1]:
-                if (x, y) != (0, 0):
-                    cell_vector = np.array([x, y])
-                    #deg_cell = angle_between_vectors(vertical_vector, vec_cell)
-                    distance_deg = np.rad2deg(ia.angle_between_vectors(cell_vector, direction_vector))
-                    distance = distance_deg / 180
-                    similarity = (1 - distance)**4
-                    matrix_effect[y+1, x+1] = similarity
-                    #print("cell", y, x, "distance_deg", distance_deg, "distance", distance, "similarity", similarity)
-        matrix_effect = matrix_effect / np.sum(matrix_effect)
-        matrix_effect = matrix_effect * (-1)
-        matrix_effect[1, 1] = 1
-        #for y in [0, 1, 2]:
-        #    vals = []
-        #    for x in [0, 1, 2]:
-        #        vals.append("%.2f" % (matrix_effect[y, x],))
-        #    print(" ".join(vals))
-        #print("matrix_effect", matrix_effect)
-
-        matrix_nochange = np.array([
-            [0, 0, 0],
-            [0, 1, 0],
-            [0, 0, 0]
-        ], dtype=np.float32)
-
-        matrix = (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
-
-        return [matrix] * nb_channels
+    create_matrices = _DirectedEdgeDetectMatricesGenerator(_create_directed_edge_detect_matrix, alpha_param,
+                                                           [direction_param])
 
     if name is None:
         name = "Unnamed%s" % (ia.caller_name(),)
 
     return Convolve(create_matrices, name=name, deterministic=deterministic, random_state=random_state)
+
+
+def _create_directed_edge_detect_matrix(alpha_sample, deg):
+    rad = np.deg2rad(deg)
+    x = np.cos(rad - 0.5*np.pi)
+    y = np.sin(rad - 0.5*np.pi)
+    #x = (deg % 90) / 90 if 0 <= deg <= 180 else -(deg % 90) / 90
+    #y = (-1) + (deg % 90) / 90 if 90 < deg < 270 else 1 - (deg % 90) / 90
+    direction_vector = np.array([x, y])
+
+    #print("direction_vector", direction_vector)
+
+    #vertical_vector = np.array([0, 1])
+
+    matrix_effect = np.array([
+        [0, 0, 0],
+        [0, 0, 0],
+        [0, 0, 0]
+    ], dtype=np.float32)
+    for x in [-1, 0, 1]:
+        for y in [-1, 0, 1]:
+            if (x, y) != (0, 0):
+                cell_vector = np.array([x, y])
+                #deg_cell = angle_between_vectors(vertical_vector, vec_cell)
+                distance_deg = np.rad2deg(ia.angle_between_vectors(cell_vector, direction_vector))
+                distance = distance_deg / 180
+                similarity = (1 - distance)**4
+                matrix_effect[y+1, x+1] = similarity
+                #print("cell", y, x, "distance_deg", distance_deg, "distance", distance, "similarity", similarity)
+    matrix_effect = matrix_effect / np.sum(matrix_effect)
+    matrix_effect = matrix_effect * (-1)
+    matrix_effect[1, 1] = 1
+    #for y in [0, 1, 2]:
+    #    vals = []
+    #    for x in [0, 1, 2]:
+    #        vals.append("%.2f" % (matrix_effect[y, x],))
+    #    print(" ".join(vals))
+    #print("matrix_effect", matrix_effect)
+
+    matrix_nochange = np.array([
+        [0, 0, 0],
+        [0, 1, 0],
+        [0, 0, 0]
+    ], dtype=np.float32)
+
+    return (1-alpha_sample) * matrix_nochange + alpha_sample * matrix_effect
+
+
+class _DirectedEdgeDetectMatricesGenerator(_MatricesGenerator):
+    def _draw_samples(self, random_state_func):
+        alpha_sample, direction_sample = super(_DirectedEdgeDetectMatricesGenerator, self)._draw_samples(
+            random_state_func)
+        # the direction is discretized to full degrees, so it can be used
+        # directly as part of the cache key
+        deg = int(direction_sample * 360) % 360
+        return [alpha_sample, deg]
@@ -80,6 +80,17 @@ class Fliplr(Augmenter): # pylint: disable=locally-disabled, unused-variable, li
             heatmaps_i.arr_0to1 = arr_flipped
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        arrs_flipped = self._augment_images(
+            [segmap.arr_int for segmap in segmaps],
+            random_state=random_state,
+            parents=parents,
+            hooks=hooks
+        )
+        for segmap, arr_flipped in zip(segmaps, arrs_flipped):
+            segmap.arr_int = arr_flipped
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         nb_images = len(keypoints_on_images)
         samples = self.p.draw_samples((nb_images,), random_state=random_state)
@@ -147,6 +158,17 @@ class Flipud(Augmenter): # pylint: disable=locally-disabled, unused-variable, li
             heatmaps_i.arr_0to1 = arr_flipped
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        arrs_flipped = self._augment_images(
+            [segmap.arr_int for segmap in segmaps],
+            random_state=random_state,
+            parents=parents,
+            hooks=hooks
+        )
+        for segmap, arr_flipped in zip(segmaps, arrs_flipped):
+            segmap.arr_int = arr_flipped
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         nb_images = len(keypoints_on_images)
         samples = self.p.draw_samples((nb_images,), random_state=random_state)
@@ -32,6 +32,27 @@ import six.moves as sm
 
 from .meta import Augmenter
 
+
+def _is_affine_identity(scale, translate, rotate, shear):
+    """
+    Check whether affine transformation parameters always lead to the identity transformation.
+
+    `scale` and `translate` may each be a single parameter or a tuple of two parameters
+    (one per axis), as used by `Affine` and `AffineCv2`.
+
+    """
+    def _is_constant_value(param, value):
+        params = param if isinstance(param, tuple) else [param]
+        return all([param_i.is_constant() and param_i.get_constant_value() == value for param_i in params])
+
+    return (
+        _is_constant_value(scale, 1)
+        and _is_constant_value(translate, 0)
+        and _is_constant_value(rotate, 0)
+        and _is_constant_value(shear, 0)
+    )
+
+
 class Affine(Augmenter):
     """
     Augmenter to apply affine transformations to images.
@@ -445,6 +466,8 @@ class Affine(Augmenter):
         self.fit_output = fit_output
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self._is_identity():
+            return images
         nb_images = len(images)
         scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples = self._draw_samples(nb_images, random_state)
         result = self._augment_images_by_samples(images, scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples)
@@ -455,7 +478,8 @@ class Affine(Augmenter):
         result = images
         if return_matrices:
             matrices = [None] * nb_images
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
             image = images[i]
             scale_x, scale_y = scale_samples[0][i], scale_samples[1][i]
             translate_x, translate_y = translate_samples[0][i], translate_samples[1][i]
@@ -514,12 +538,16 @@ class Affine(Augmenter):
             else:
                 result[i] = images[i]
 
+        self._map_images(_augment_image, nb_images)
+
         if return_matrices:
             result = (result, matrices)
 
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
+        if self._is_identity():
+            return heatmaps
         nb_heatmaps = len(heatmaps)
         scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples = self._draw_samples(nb_heatmaps, random_state)
         cval_samples = np.zeros((cval_samples.shape[0], 1), dtype=np.float32)
@@ -531,11 +559,56 @@ class Affine(Augmenter):
         for heatmaps_i, arr_aug, matrix in zip(heatmaps, arrs_aug, matrices):
             #heatmaps_i.arr = ia.Heatmaps.change_normalization(arr_aug, source=(0.0, 1.0), target=heatmaps_i)
             heatmaps_i.arr_0to1 = arr_aug
-            _, output_shape_i = self._tf_to_fit_output(heatmaps_i.shape, matrix)
-            heatmaps_i.shape = output_shape_i
+            # no matrix is returned for heatmaps that were not transformed
+            if matrix is not None and self.fit_output:
+                _, output_shape_i = self._tf_to_fit_output(heatmaps_i.shape, matrix)
+                heatmaps_i.shape = output_shape_i
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        if self._is_identity():
+            return segmaps
+        nb_segmaps = len(segmaps)
+        scale_samples, translate_samples, rotate_samples, shear_samples, _cval_samples, _mode_samples, _order_samples = self._draw_samples(nb_segmaps, random_state)
+
+        for i, segmap in enumerate(segmaps):
+            arr_int = segmap.arr_int
+            scale_x, scale_y = scale_samples[0][i], scale_samples[1][i]
+            translate_x, translate_y = translate_samples[0][i], translate_samples[1][i]
+            if ia.is_single_float(translate_y):
+                translate_y_px = int(round(translate_y * arr_int.shape[0]))
+            else:
+                translate_y_px = translate_y
+            if ia.is_single_float(translate_x):
+                translate_x_px = int(round(translate_x * arr_int.shape[1]))
+            else:
+                translate_x_px = translate_x
+            rotate = rotate_samples[i]
+            shear = shear_samples[i]
+            if scale_x != 1.0 or scale_y != 1.0 or translate_x_px != 0 or translate_y_px != 0 or rotate != 0 or shear != 0:
+                # Class ids must not be interpolated, so they are always warped via cv2 and
+                # nearest neighbour interpolation, independent of backend and order.
+                # Pixels outside of the input map are filled with -1 (no class).
+                arr_warped, matrix = self._warp_cv2(
+                    arr_int,
+                    scale_x, scale_y,
+                    translate_x_px, translate_y_px,
+                    rotate, shear,
+                    -1,
+                    cv2.BORDER_CONSTANT,
+                    cv2.INTER_NEAREST,
+                    self.fit_output,
+                    return_matrix=True
+                )
+                segmap.arr_int = arr_warped[..., 0]
+                if self.fit_output:
+                    _, output_shape = self._tf_to_fit_output(segmap.shape, matrix)
+                    segmap.shape = tuple([int(v) for v in output_shape])
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
+        if self._is_identity():
+            return keypoints_on_images
         result = []
         nb_images = len(keypoints_on_images)
         scale_samples, translate_samples, rotate_samples, shear_samples, _cval_samples, _mode_samples, _order_samples = self._draw_samples(nb_images, random_state)
@@ -590,36 +663,41 @@ class Affine(Augmenter):
     def get_parameters(self):
         return [self.scale, self.translate, self.rotate, self.shear, self.order, self.cval, self.mode, self.backend, self.fit_output]
 
+    def _is_identity(self):
+        # Whether the parameters always lead to the identity transformation, e.g. for Affine()
+        # with default values. Then no samples have to be drawn and all inputs stay unchanged.
+        return _is_affine_identity(self.scale, self.translate, self.rotate, self.shear)
+
     def _draw_samples(self, nb_samples, random_state):
         seed = random_state.randint(0, 10**6, 1)[0]
 
         if isinstance(self.scale, tuple):
             scale_samples = (
-                self.scale[0].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 10)),
-                self.scale[1].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 20)),
+                self.scale[0].draw_samples_seeded((nb_samples,), seed + 10),
+                self.scale[1].draw_samples_seeded((nb_samples,), seed + 20),
             )
         else:
-            scale_samples = self.scale.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 30))
+            scale_samples = self.scale.draw_samples_seeded((nb_samples,), seed + 30)
             scale_samples = (scale_samples, scale_samples)
 
         if isinstance(self.translate, tuple):
             translate_samples = (
-                self.translate[0].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 40)),
-                self.translate[1].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 50)),
+                self.translate[0].draw_samples_seeded((nb_samples,), seed + 40),
+                self.translate[1].draw_samples_seeded((nb_samples,), seed + 50),
             )
         else:
-            translate_samples = self.translate.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 60))
+            translate_samples = self.translate.draw_samples_seeded((nb_samples,), seed + 60)
             translate_samples = (translate_samples, translate_samples)
 
         ia.do_assert(translate_samples[0].dtype in [np.int32, np.int64, np.float32, np.float64])
         ia.do_assert(translate_samples[1].dtype in [np.int32, np.int64, np.float32, np.float64])
 
-        rotate_samples = self.rotate.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 70))
-        shear_samples = self.shear.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 80))
+        rotate_samples = self.rotate.draw_samples_seeded((nb_samples,), seed + 70)
+        shear_samples = self.shear.draw_samples_seeded((nb_samples,), seed + 80)
 
-        cval_samples = self.cval.draw_samples((nb_samples, 3), random_state=ia.new_random_state(seed + 90))
-        mode_samples = self.mode.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 100))
-        order_samples = self.order.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 110))
+        cval_samples = self.cval.draw_samples_seeded((nb_samples, 3), seed + 90)
+        mode_samples = self.mode.draw_samples_seeded((nb_samples,), seed + 100)
+        order_samples = self.order.draw_samples_seeded((nb_samples,), seed + 110)
 
         return scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples
 
@@ -1080,6 +1158,8 @@ class AffineCv2(Augmenter):
         self.shear = iap.handle_continuous_param(shear, "shear", value_range=None, tuple_to_uniform=True, list_to_choice=True)
 
     def _augment_images(self, images, random_state, parents, hooks):
+        if self._is_identity():
+            return images
         nb_images = len(images)
         scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples = self._draw_samples(nb_images, random_state)
         result = self._augment_images_by_samples(images, scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples)
@@ -1103,7 +1183,8 @@ class AffineCv2(Augmenter):
 
         nb_images = len(images)
         result = images
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
             height, width = images[i].shape[0], images[i].shape[1]
             shift_x = width / 2.0 - 0.5
             shift_y = height / 2.0 - 0.5
@@ -1162,9 +1243,13 @@ class AffineCv2(Augmenter):
             else:
                 result[i] = images[i]
 
+        self._map_images(_augment_image, nb_images)
+
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
+        if self._is_identity():
+            return heatmaps
         nb_images = len(heatmaps)
         scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples = self._draw_samples(nb_images, random_state)
         cval_samples = np.zeros((cval_samples.shape[0], 1), dtype=np.float32)
@@ -1175,7 +1260,24 @@ class AffineCv2(Augmenter):
             heatmap_i.arr_0to1 = arr_aug
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        if self._is_identity():
+            return segmaps
+        nb_segmaps = len(segmaps)
+        scale_samples, translate_samples, rotate_samples, shear_samples, _cval_samples, _mode_samples, _order_samples = self._draw_samples(nb_segmaps, random_state)
+        # class ids must not be interpolated, pixels outside of the input map are set to -1 (no class)
+        cval_samples = np.full((nb_segmaps, 1), -1, dtype=np.int32)
+        mode_samples = ["constant"] * nb_segmaps
+        order_samples = ["nearest"] * nb_segmaps
+        arrs = [segmap.arr_int[..., np.newaxis] for segmap in segmaps]
+        arrs_aug = self._augment_images_by_samples(arrs, scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples)
+        for segmap, arr_aug in zip(segmaps, arrs_aug):
+            segmap.arr_int = arr_aug[..., 0]
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
+        if self._is_identity():
+            return keypoints_on_images
         result = []
         nb_images = len(keypoints_on_images)
         scale_samples, translate_samples, rotate_samples, shear_samples, _cval_samples, _mode_samples, _order_samples = self._draw_samples(nb_images, random_state)
@@ -1226,36 +1328,41 @@ class AffineCv2(Augmenter):
     def get_parameters(self):
         return [self.scale, self.translate, self.rotate, self.shear, self.order, self.cval, self.mode]
 
+    def _is_identity(self):
+        # Whether the parameters always lead to the identity transformation, e.g. for AffineCv2()
+        # with default values. Then no samples have to be drawn and all inputs stay unchanged.
+        return _is_affine_identity(self.scale, self.translate, self.rotate, self.shear)
+
     def _draw_samples(self, nb_samples, random_state):
         seed = random_state.randint(0, 10**6, 1)[0]
 
         if isinstance(self.scale, tuple):
             scale_samples = (
-                self.scale[0].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 10)),
-                self.scale[1].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 20)),
+                self.scale[0].draw_samples_seeded((nb_samples,), seed + 10),
+                self.scale[1].draw_samples_seeded((nb_samples,), seed + 20),
             )
         else:
-            scale_samples = self.scale.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 30))
+            scale_samples = self.scale.draw_samples_seeded((nb_samples,), seed + 30)
             scale_samples = (scale_samples, scale_samples)
 
         if isinstance(self.translate, tuple):
             translate_samples = (
-                self.translate[0].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 40)),
-                self.translate[1].draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 50)),
+                self.translate[0].draw_samples_seeded((nb_samples,), seed + 40),
+                self.translate[1].draw_samples_seeded((nb_samples,), seed + 50),
             )
         else:
-            translate_samples = self.translate.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 60))
+            translate_samples = self.translate.draw_samples_seeded((nb_samples,), seed + 60)
             translate_samples = (translate_samples, translate_samples)
 
         ia.do_assert(translate_samples[0].dtype in [np.int32, np.int64, np.float32, np.float64])
         ia.do_assert(translate_samples[1].dtype in [np.int32, np.int64, np.float32, np.float64])
 
-        rotate_samples = self.rotate.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 70))
-        shear_samples = self.shear.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 80))
+        rotate_samples = self.rotate.draw_samples_seeded((nb_samples,), seed + 70)
+        shear_samples = self.shear.draw_samples_seeded((nb_samples,), seed + 80)
 
-        cval_samples = self.cval.draw_samples((nb_samples, 3), random_state=ia.new_random_state(seed + 90))
-        mode_samples = self.mode.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 100))
-        order_samples = self.order.draw_samples((nb_samples,), random_state=ia.new_random_state(seed + 110))
+        cval_samples = self.cval.draw_samples_seeded((nb_samples, 3), seed + 90)
+        mode_samples = self.mode.draw_samples_seeded((nb_samples,), seed + 100)
+        order_samples = self.order.draw_samples_seeded((nb_samples,), seed + 110)
 
         return scale_samples, translate_samples, rotate_samples, shear_samples, cval_samples, mode_samples, order_samples
 
@@ -1408,11 +1515,11 @@ class PiecewiseAffine(Augmenter):
         seeds = ia.copy_random_state(random_state).randint(0, 10**6, (nb_images+1,))
 
         seed = seeds[-1]
-        nb_rows_samples = self.nb_rows.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 1))
-        nb_cols_samples = self.nb_cols.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 2))
-        cval_samples = self.cval.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 3))
-        mode_samples = self.mode.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 4))
-        order_samples = self.order.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 5))
+        nb_rows_samples = self.nb_rows.draw_samples_seeded((nb_images,), seed + 1)
+        nb_cols_samples = self.nb_cols.draw_samples_seeded((nb_images,), seed + 2)
+        cval_samples = self.cval.draw_samples_seeded((nb_images,), seed + 3)
+        mode_samples = self.mode.draw_samples_seeded((nb_images,), seed + 4)
+        order_samples = self.order.draw_samples_seeded((nb_images,), seed + 5)
 
         for i in sm.xrange(nb_images):
             rs_image = ia.new_random_state(seeds[i])
@@ -1446,9 +1553,9 @@ class PiecewiseAffine(Augmenter):
         seeds = ia.copy_random_state(random_state).randint(0, 10**6, (nb_images+1,))
 
         seed = seeds[-1]
-        nb_rows_samples = self.nb_rows.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 1))
-        nb_cols_samples = self.nb_cols.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 2))
-        order_samples = self.order.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 5))
+        nb_rows_samples = self.nb_rows.draw_samples_seeded((nb_images,), seed + 1)
+        nb_cols_samples = self.nb_cols.draw_samples_seeded((nb_images,), seed + 2)
+        order_samples = self.order.draw_samples_seeded((nb_images,), seed + 5)
 
         for i in sm.xrange(nb_images):
             heatmaps_i = heatmaps[i]
@@ -1496,8 +1603,8 @@ class PiecewiseAffine(Augmenter):
 
         seeds = ia.copy_random_state(random_state).randint(0, 10**6, (nb_images+1,))
         seed = seeds[-1]
-        nb_rows_samples = self.nb_rows.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 1))
-        nb_cols_samples = self.nb_cols.draw_samples((nb_images,), random_state=ia.new_random_state(seed + 2))
+        nb_rows_samples = self.nb_rows.draw_samples_seeded((nb_images,), seed + 1)
+        nb_cols_samples = self.nb_cols.draw_samples_seeded((nb_images,), seed + 2)
 
         for i in sm.xrange(nb_images):
             rs_image = ia.new_random_state(seeds[i])
@@ -1709,7 +1816,8 @@ class PerspectiveTransform(Augmenter):
             random_state
         )
 
-        for i, (M, max_height, max_width) in enumerate(zip(matrices, max_heights, max_widths)):
+        def _augment_image(i):
+            M, max_height, max_width = matrices[i], max_heights[i], max_widths[i]
             # cv2.warpPerspective only supports <=4 channels
             nb_channels = images[i].shape[2]
             dtype = images[i].dtype
@@ -1734,6 +1842,8 @@ class PerspectiveTransform(Augmenter):
                 warped = warped.astype(dtype)
             result[i] = warped
 
+        self._map_images(_augment_image, len(images))
+
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
@@ -1778,6 +1888,42 @@ class PerspectiveTransform(Augmenter):
 
         return result
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        result = segmaps
+
+        matrices, max_heights, max_widths = self._create_matrices(
+            [segmap.arr_int.shape for segmap in segmaps],
+            ia.copy_random_state(random_state)
+        )
+
+        # see _augment_heatmaps()
+        if self.keep_size:
+            max_heights_imgs, max_widths_imgs = max_heights, max_widths
+        else:
+            _, max_heights_imgs, max_widths_imgs = self._create_matrices(
+                [segmap.shape for segmap in segmaps],
+                ia.copy_random_state(random_state)
+            )
+
+        for i, (M, max_height, max_width) in enumerate(zip(matrices, max_heights, max_widths)):
+            segmap = segmaps[i]
+            arr_int = segmap.arr_int
+
+            # class ids must not be interpolated, pixels outside of the input map are set to -1 (no class)
+            warped = cv2.warpPerspective(arr_int, M, (max_width, max_height), flags=cv2.INTER_NEAREST,
+                                         borderMode=cv2.BORDER_CONSTANT, borderValue=-1)
+
+            if self.keep_size:
+                h, w = arr_int.shape[0:2]
+                warped = ia.imresize_single_image(warped, (h, w), interpolation="nearest")
+                shape = segmap.shape
+            else:
+                shape = (max_heights_imgs[i], max_widths_imgs[i]) + tuple(segmap.shape[2:])
+
+            result[i] = segmap._copy_with_arr_int(warped, shape=shape)
+
+        return result
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         result = keypoints_on_images
         matrices, max_heights, max_widths = self._create_matrices(
@@ -1812,7 +1958,7 @@ class PerspectiveTransform(Augmenter):
         for i in sm.xrange(nb_images):
             h, w = shapes[i][0:2]
 
-            points = self.jitter.draw_samples((4, 2), random_state=ia.new_random_state(seeds[i]))
+            points = self.jitter.draw_samples_seeded((4, 2), seeds[i])
             points = np.mod(np.abs(points), 1)
 
             # top left
@@ -2062,18 +2208,21 @@ class ElasticTransformation(Augmenter):
 
     def _draw_samples(self, nb_images, random_state):
         seeds = ia.copy_random_state(random_state).randint(0, 10**6, (nb_images+1,))
-        alphas = self.alpha.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[-1]+10000))
-        sigmas = self.sigma.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[-1]+10100))
-        orders = self.order.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[-1]+10200))
-        cvals = self.cval.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[-1]+10300))
-        modes = self.mode.draw_samples((nb_images,), random_state=ia.new_random_state(seeds[-1]+10400))
+        alphas = self.alpha.draw_samples_seeded((nb_images,), seeds[-1]+10000)
+        sigmas = self.sigma.draw_samples_seeded((nb_images,), seeds[-1]+10100)
+        orders = self.order.draw_samples_seeded((nb_images,), seeds[-1]+10200)
+        cvals = self.cval.draw_samples_seeded((nb_images,), seeds[-1]+10300)
+        modes = self.mode.draw_samples_seeded((nb_images,), seeds[-1]+10400)
         return seeds[0:-1], alphas, sigmas, orders, cvals, modes
 
     def _augment_images(self, images, random_state, parents, hooks):
         result = images
         nb_images = len(images)
         seeds, alphas, sigmas, orders, cvals, modes = self._draw_samples(nb_images, random_state)
-        for i in sm.xrange(nb_images):
+
+        def _augment_image(i):
+            # each image has its own random state, so the results do not depend on the order
+            # in which threads process the images
             image = images[i]
             (source_indices_x, source_indices_y), (_dx, _dy) = ElasticTransformation.generate_indices(
                 image.shape[0:2],
@@ -2089,6 +2238,9 @@ class ElasticTransformation(Augmenter):
                 cval=cvals[i],
                 mode=modes[i]
             )
+
+        self._map_images(_augment_image, nb_images)
+
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
@@ -19,6 +19,7 @@ List of augmenters:
     * OneOf
     * Sometimes
     * WithChannels
+    * Cached
     * Noop
     * Lambda
     * AssertLambda
@@ -31,11 +32,18 @@ from .. import imgaug as ia
 from .. import parameters as iap
 from abc import ABCMeta, abstractmethod
 import numpy as np
+import collections
 import copy as copy_module
+import multiprocessing
+import multiprocessing.sharedctypes
+import os
 import re
+import hashlib
 import itertools
+import json
 import six
 import six.moves as sm
+from six.moves import cPickle as pickle
 import warnings
 
 
@@ -95,6 +103,206 @@ def clip_augmented_images(images, min_value, max_value):
     return clip_augmented_images_(images, min_value, max_value)
 
 
+def _is_noop_hooks(hooks):
+    """
+    Check whether hooks have no effect, i.e. whether they were created without
+    any callbacks.
+
+    """
+    return (
+        type(hooks) in [ia.HooksImages, ia.HooksHeatmaps, ia.HooksKeypoints]
+        and hooks.activator is None
+        and hooks.propagator is None
+        and hooks.preprocessor is None
+        and hooks.postprocessor is None
+    )
+
+
+# Hooks without any callbacks that are used if no hooks were provided to an augmentation
+# method. Augmenters skip all hook calls for these, as the calls would not change anything.
+_DEFAULT_HOOKS_IMAGES = ia.HooksImages()
+_DEFAULT_HOOKS_HEATMAPS = ia.HooksHeatmaps()
+_DEFAULT_HOOKS_KEYPOINTS = ia.HooksKeypoints()
+
+
+def _is_default_hooks(hooks):
+    return hooks is _DEFAULT_HOOKS_IMAGES or hooks is _DEFAULT_HOOKS_HEATMAPS or hooks is _DEFAULT_HOOKS_KEYPOINTS
+
+
+# Fusion key of augmenters that change each pixel value independently of all
+# other pixels and whose random samples only depend on the number of images and
+# channels, e.g. Add or Multiply. Runs of such augmenters are fused into one
+# lookup table per image, see augment_images_pointwise().
+FUSION_KEY_POINTWISE = "pointwise"
+
+
+def augment_images_pointwise(augmenters, images, parents, hooks):
+    """
+    Augment images with a run of pointwise augmenters, i.e. augmenters
+    that have fusion key `FUSION_KEY_POINTWISE`.
+
+    For uint8 images, the augmenters are applied to arrays containing each
+    of the 256 possible values once per channel. The results are lookup
+    tables that are then applied to the images in a single pass, leading
+    to the same outputs as executing the augmenters one by one.
+
+    Parameters
+    ----------
+    augmenters : list of Augmenter
+        The pointwise augmenters to apply in order.
+
+    images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+        See `Augmenter._augment_images()`.
+
+    parents : list of Augmenter
+        See `Augmenter._augment_images()`.
+
+    hooks : ia.HooksImages
+        See `Augmenter._augment_images()`.
+
+    Returns
+    ----------
+    images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+        The augmented images.
+
+    """
+    def _augment(images_to_aug):
+        for augmenter in augmenters:
+            images_to_aug = call_with_random_state(
+                augmenter,
+                lambda random_state: augmenter._augment_images(
+                    images_to_aug,
+                    random_state=random_state,
+                    parents=parents,
+                    hooks=hooks
+                )
+            )
+        return images_to_aug
+
+    if _is_lut_applicable(images):
+        return _augment_images_via_lut(images, _augment)
+    return _augment(images)
+
+
+def call_with_random_state(augmenter, func):
+    """
+    Call a function with the random state of an augmenter and afterwards
+    update that random state in the same way as `Augmenter.augment_images()`
+    does, i.e. move it forward (or keep it unchanged for deterministic
+    augmenters).
+
+    Parameters
+    ----------
+    augmenter : Augmenter
+        The augmenter whose random state to use.
+
+    func : callable
+        Function that receives a copy of the augmenter's random state
+        as its only argument.
+
+    Returns
+    -------
+    result : any
+        The return value of `func`.
+
+    """
+    if augmenter.deterministic:
+        state_orig = augmenter.random_state.get_state()
+    result = func(ia.copy_random_state(augmenter.random_state))
+    ia.forward_random_state(augmenter.random_state)
+    if augmenter.deterministic:
+        augmenter.random_state.set_state(state_orig)
+    return result
+
+
+def _is_lut_applicable(images):
+    if ia.is_np_array(images):
+        return images.dtype.type == np.uint8
+    return all([image.dtype.type == np.uint8 for image in images])
+
+
+def _augment_images_via_lut(images, func):
+    """
+    Augment uint8 images by calling a pointwise augmentation function once
+    on arrays of shape (256, 1, C) containing all possible values and then
+    using the results as lookup tables.
+
+    """
+    values = np.arange(256).astype(np.uint8)
+    value_images = []
+    for image in images:
+        nb_channels = image.shape[2] if image.ndim == 3 else 1
+        value_images.append(np.tile(values.reshape((256, 1, 1)), (1, 1, nb_channels)))
+
+    tables = func(value_images)
+
+    result = images
+    for i, (image, table) in enumerate(zip(images, tables)):
+        result[i] = ia.apply_lut(image, table.reshape((256, -1)))
+    return result
+
+
+def _create_shared_array(shape, dtype):
+    # Creates an array in shared memory, which child processes of a multiprocessing.Pool
+    # can access without copying, as long as they receive it during their initialization.
+    dtype = np.dtype(dtype)
+    nb_bytes = int(np.prod(shape)) * dtype.itemsize
+    buffer_ = multiprocessing.sharedctypes.RawArray("b", max(nb_bytes, 1))
+    return buffer_, _view_shared_array(buffer_, shape, dtype)
+
+
+def _view_shared_array(buffer_, shape, dtype):
+    dtype = np.dtype(dtype)
+    return np.frombuffer(buffer_, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _augment_images_chunk(augmenter, images, images_aug, start, end, seed):
+    """
+    Augment the images in the index range [start, end) of a batch and write them into the output array.
+
+    The augmenter is reseeded before the augmentation, so that the results only depend on
+    the seed and not on the chunks that were previously augmented with the same augmenter.
+
+    """
+    augmenter.reseed(seed)
+    chunk_aug = augmenter.augment_images(images[start:end])
+    ia.do_assert(
+        ia.is_np_array(chunk_aug) and chunk_aug.shape == images_aug[start:end].shape,
+        "augment_images_parallel() requires augmenters that do not change the image shape, "
+        "expected shape %s, got %s." % (
+            images_aug[start:end].shape,
+            chunk_aug.shape if ia.is_np_array(chunk_aug) else [image.shape for image in chunk_aug]
+        )
+    )
+    images_aug[start:end] = chunk_aug
+
+
+# Default number of images per chunk in augment_images_parallel(). This is a constant
+# (instead of e.g. a fraction of the number of processes), as each chunk is augmented with
+# its own seed and hence the chunk boundaries affect the results.
+_PARALLEL_CHUNK_SIZE = 8
+
+# State of the child processes of augment_images_parallel(), set once per process by the
+# pool's initializer, so that only the index ranges have to be sent to them per chunk.
+_PARALLEL_WORKER_STATE = dict()
+
+
+def _init_parallel_worker(augmenter, buffer_images, buffer_images_aug, shape, dtype):
+    _PARALLEL_WORKER_STATE["augmenter"] = augmenter
+    _PARALLEL_WORKER_STATE["images"] = _view_shared_array(buffer_images, shape, dtype)
+    _PARALLEL_WORKER_STATE["images_aug"] = _view_shared_array(buffer_images_aug, shape, dtype)
+
+
+def _augment_images_chunk_in_worker(chunk):
+    start, end, seed = chunk
+    _augment_images_chunk(
+        _PARALLEL_WORKER_STATE["augmenter"],
+        _PARALLEL_WORKER_STATE["images"],
+        _PARALLEL_WORKER_STATE["images_aug"],
+        start, end, seed
+    )
+
+
 def handle_children_list(lst, augmenter_name, lst_name):
     if lst is None:
         return Sequential([], name="%s-%s" % (augmenter_name, lst_name))
@@ -129,6 +337,144 @@ def invert_reduce_to_nonempty(objs, ids, objs_reduced):
     return objs_inv
 
 
+# Counter that is increased whenever the structure of any augmenter tree or the name of any
+# augmenter changes. Tree indices that were built for an older value are rebuilt on next access.
+_TREE_VERSION = 0
+
+
+def _invalidate_tree_indices():
+    global _TREE_VERSION
+    _TREE_VERSION += 1
+
+
+class _AugmenterTreeIndex(object):
+    """
+    Lookup tables for an augmenter and all of its children.
+
+    The augmenters are stored in the order in which `find_augmenters()` visits them,
+    i.e. the root followed by its children in depth-first order. Positions in that list
+    are used by the name and type tables and by the position matching in
+    `Augmenter.copy_random_state_()`.
+
+    Parameters
+    ----------
+    root : Augmenter
+        Augmenter for which to build the index.
+
+    """
+
+    def __init__(self, root):
+        self.version = _TREE_VERSION
+        self.nodes = []
+        self.parents = []
+        self.by_name = collections.OrderedDict()
+        self.by_type = collections.OrderedDict()
+        self.regex_matches = dict()
+        self._add(root, [])
+
+    def _add(self, aug, parents):
+        position = len(self.nodes)
+        self.nodes.append(aug)
+        self.parents.append(parents)
+        self.by_name.setdefault(aug.name, []).append(position)
+        self.by_type.setdefault(type(aug), []).append(position)
+
+        subparents = parents + [aug]
+        for lst in aug.get_children_lists():
+            for child in lst:
+                self._add(child, subparents)
+
+    def find_by_names(self, names, regex=False):
+        if regex:
+            key = tuple(names)
+            positions = self.regex_matches.get(key)
+            if positions is None:
+                patterns = [re.compile(pattern) for pattern in names]
+                positions = []
+                for name, name_positions in self.by_name.items():
+                    if any([pattern.match(name) for pattern in patterns]):
+                        positions.extend(name_positions)
+                positions = sorted(positions)
+                self.regex_matches[key] = positions
+        else:
+            positions = set()
+            for name in names:
+                positions.update(self.by_name.get(name, []))
+            positions = sorted(positions)
+        return [self.nodes[position] for position in positions]
+
+    def find_by_types(self, types):
+        positions = []
+        for cls, cls_positions in self.by_type.items():
+            if issubclass(cls, types):
+                positions.extend(cls_positions)
+        return [self.nodes[position] for position in sorted(positions)]
+
+
+class _MutationTrackingList(list):
+    """
+    List that invalidates all augmenter tree indices whenever its content changes.
+    Used as a base class for augmenters that are also lists of children, e.g. `Sequential`.
+    """
+
+    def __setitem__(self, key, value):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).__delitem__(key)
+
+    # python 2 calls these instead of __setitem__/__delitem__ for simple slices
+    def __setslice__(self, i, j, sequence):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).__setslice__(i, j, sequence)
+
+    def __delslice__(self, i, j):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).__delslice__(i, j)
+
+    def __iadd__(self, other):
+        _invalidate_tree_indices()
+        return super(_MutationTrackingList, self).__iadd__(other)
+
+    def __imul__(self, n):
+        _invalidate_tree_indices()
+        return super(_MutationTrackingList, self).__imul__(n)
+
+    def append(self, obj):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).append(obj)
+
+    def extend(self, iterable):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).extend(iterable)
+
+    def insert(self, index, obj):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).insert(index, obj)
+
+    def remove(self, obj):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).remove(obj)
+
+    def pop(self, *args):
+        _invalidate_tree_indices()
+        return super(_MutationTrackingList, self).pop(*args)
+
+    def clear(self):
+        _invalidate_tree_indices()
+        del self[:]
+
+    def sort(self, *args, **kwargs):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).sort(*args, **kwargs)
+
+    def reverse(self):
+        _invalidate_tree_indices()
+        super(_MutationTrackingList, self).reverse()
+
+
 @six.add_metaclass(ABCMeta)
 class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, line-too-long
     """
@@ -195,6 +541,41 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             self.random_state = np.random.RandomState(random_state)
 
         self.activated = True
+        self.nb_workers = 1
+
+    def __setattr__(self, key, value):
+        # Renaming an augmenter or assigning new children (e.g. `then_list`) changes the
+        # results of name lookups, so cached tree indices have to be rebuilt.
+        if key == "name" or isinstance(value, Augmenter):
+            _invalidate_tree_indices()
+        super(Augmenter, self).__setattr__(key, value)
+
+    def __getstate__(self):
+        # The tree index and the scratch random state are not copied, as copies have their
+        # own (possibly different) children and random states.
+        state = self.__dict__.copy()
+        state.pop("_tree_index", None)
+        state.pop("_random_state_scratch", None)
+        return state
+
+    def _get_tree_index(self):
+        """
+        Get the lookup index of this augmenter and all of its children.
+
+        The index is built lazily and cached. It is rebuilt after any children list or
+        augmenter name was changed.
+
+        Returns
+        -------
+        index : _AugmenterTreeIndex
+            Index for this augmenter.
+
+        """
+        index = self.__dict__.get("_tree_index")
+        if index is None or index.version != _TREE_VERSION:
+            index = _AugmenterTreeIndex(self)
+            self._tree_index = index
+        return index
 
     def augment_batches(self, batches, hooks=None, background=False):
         """
@@ -357,6 +738,95 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             batch_loader.terminate()
             bg_augmenter.terminate()
 
+    def augment_indexed_batch(self, batch, seed, epoch=0, sample_indices=None, hooks=None):
+        """
+        Augment a batch so that each sample's augmentation only depends on its index.
+
+        Before augmenting a sample, the random states of all augmenters are reset using the
+        seed returned by ``imgaug.derive_sample_seed(seed, epoch, sample_index)``. Each sample
+        is therefore augmented in the same way, independent of the other samples in its batch,
+        its position within the batch and the process or machine that augments it. This allows
+        to distribute the augmentation of a dataset across processes or machines (and to
+        repeat it partially) without affecting the results.
+
+        All data of a sample (image, heatmaps, keypoints, ...) is augmented in the same way.
+        The random states of this augmenter are not changed. As the samples are augmented
+        one by one, this is slower than `augment_batches()`.
+
+        Parameters
+        ----------
+        batch : ia.Batch
+            The batch to augment.
+
+        seed : int
+            Global seed to derive the samples' seeds from.
+
+        epoch : int, optional(default=0)
+            Epoch to derive the samples' seeds from. Use different values to get different
+            augmentations of the same samples.
+
+        sample_indices : None or iterable of int, optional(default=None)
+            Index of each sample of the batch within the dataset.
+            If None, ``batch.data`` is expected to contain the indices, as e.g. provided by
+            `imgaug.AugmentationCache.get_batches()`.
+
+        hooks : None or ia.HooksImages, optional(default=None)
+            HooksImages object to dynamically interfere with the augmentation
+            process.
+
+        Returns
+        -------
+        batch : ia.Batch
+            The input batch with its ``*_aug`` attributes set to the augmented data.
+
+        Examples
+        --------
+        >>> seq = iaa.Sequential([iaa.Fliplr(0.5), iaa.Affine(rotate=(-20, 20))])
+        >>> batch = ia.Batch(images=images[10:20], data=np.arange(10, 20))
+        >>> batch_aug = seq.augment_indexed_batch(batch, seed=1, epoch=3)
+
+        This augments the samples 10 to 19 of `images` in the same way as any other
+        call with ``seed=1`` and ``epoch=3`` that contains these samples.
+
+        """
+        ia.do_assert(isinstance(batch, ia.Batch), "Expected ia.Batch, got %s." % (type(batch),))
+        if sample_indices is None:
+            sample_indices = batch.data
+        ia.do_assert(ia.is_iterable(sample_indices),
+                     "Expected sample_indices or batch.data to contain one index per sample, got %s." % (
+                         type(sample_indices),))
+        sample_indices = [int(sample_index) for sample_index in sample_indices]
+
+        columns = [
+            ("images", "augment_images"),
+            ("heatmaps", "augment_heatmaps"),
+            ("segmentation_maps", "augment_segmentation_maps"),
+            ("keypoints", "augment_keypoints"),
+            ("bounding_boxes", "augment_bounding_boxes")
+        ]
+        columns = [(attr_name, method_name) for attr_name, method_name in columns
+                   if getattr(batch, attr_name) is not None]
+        for attr_name, _ in columns:
+            ia.do_assert(len(getattr(batch, attr_name)) == len(sample_indices),
+                         "Expected %d %s for %d sample indices, got %d." % (
+                             len(sample_indices), attr_name, len(sample_indices), len(getattr(batch, attr_name))))
+
+        augseq = self.to_deterministic()
+        results = dict([(attr_name, []) for attr_name, _ in columns])
+        for i, sample_index in enumerate(sample_indices):
+            augseq.reseed(ia.derive_sample_seed(seed, epoch, sample_index), deterministic_too=True)
+            for attr_name, method_name in columns:
+                sample = getattr(batch, attr_name)[i:i+1]
+                results[attr_name].append(getattr(augseq, method_name)(sample, hooks=hooks)[0])
+
+        for attr_name, _ in columns:
+            result = results[attr_name]
+            if attr_name == "images" and ia.is_np_array(batch.images) and len(result) > 0 \
+                    and len(set([image.shape for image in result])) == 1:
+                result = np.array(result, dtype=result[0].dtype)
+            setattr(batch, attr_name + "_aug", result)
+        return batch
+
     def augment_image(self, image, hooks=None):
         """
         Augment a single image.
@@ -416,7 +886,8 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             parents = []
 
         if hooks is None:
-            hooks = ia.HooksImages()
+            hooks = _DEFAULT_HOOKS_IMAGES
+        with_hooks = not _is_default_hooks(hooks)
 
         if ia.is_np_array(images):
             input_type = "array"
@@ -466,7 +937,8 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         else:
             raise Exception("Expected images as one numpy array or list/tuple of numpy arrays, got %s." % (type(images),))
 
-        images_copy = hooks.preprocess(images_copy, augmenter=self, parents=parents)
+        if with_hooks:
+            images_copy = hooks.preprocess(images_copy, augmenter=self, parents=parents)
 
         #if ia.is_np_array(images) != ia.is_np_array(images_copy):
         #    print("[WARNING] images vs images_copy", ia.is_np_array(images), ia.is_np_array(images_copy))
@@ -479,23 +951,32 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         # the is_activated() call allows to use hooks that selectively
         # deactivate specific augmenters in previously defined augmentation
         # sequences
-        if hooks.is_activated(images_copy, augmenter=self, parents=parents, default=self.activated):
+        activated = hooks.is_activated(images_copy, augmenter=self, parents=parents, default=self.activated) \
+            if with_hooks else self.activated
+        if activated:
             if len(images) > 0:
-                images_result = self._augment_images(
-                    images_copy,
-                    random_state=ia.copy_random_state(self.random_state),
-                    parents=parents,
-                    hooks=hooks
-                )
+                random_state, scratch = self._acquire_random_state_copy()
+                try:
+                    images_result = self._augment_images(
+                        images_copy,
+                        random_state=random_state,
+                        parents=parents,
+                        hooks=hooks
+                    )
+                finally:
+                    self._release_random_state_copy(scratch)
                 # move "forward" the random state, so that the next call to
                 # augment_images() will use different random values
-                ia.forward_random_state(self.random_state)
+                # (not necessary for deterministic augmenters, which reset their random state below)
+                if not self.deterministic:
+                    ia.forward_random_state(self.random_state)
             else:
                 images_result = images_copy
         else:
             images_result = images_copy
 
-        images_result = hooks.postprocess(images_result, augmenter=self, parents=parents)
+        if with_hooks:
+            images_result = hooks.postprocess(images_result, augmenter=self, parents=parents)
 
         # remove temporarily added channel axis for 2D input images
         output_type = "list" if isinstance(images_result, list) else "array"
@@ -526,6 +1007,105 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
 
         return images_result
 
+    def augment_images_parallel(self, images, processes=None, chunk_size=None):
+        """
+        Augment a batch of images with a pool of processes.
+
+        The input images are copied once into shared memory and split into chunks
+        of consecutive images. Each process augments whole chunks and writes the
+        results directly into a preallocated output array, which is also placed
+        in shared memory. Only the index ranges of the chunks are sent to the
+        processes, the augmenter is transferred once per process.
+
+        This is mainly useful for large batches and expensive augmenters, as
+        starting the processes has some overhead. The augmenters must not change
+        the shape or dtype of the images.
+
+        Each chunk is augmented with a copy of this augmenter that is reseeded
+        (see `reseed()`) with a seed sampled from this augmenter's random state.
+        The results hence only depend on that random state and the chunk size,
+        not on the number of processes or the order in which the chunks are
+        processed. They are the same as for ``processes=1``, which
+        augments the chunks one after another in the current process. They are
+        however not the same as for `augment_images()`, which samples all
+        random values for the whole batch at once.
+
+        Parameters
+        ----------
+        images : (N,H,W,C) ndarray or (N,H,W) ndarray
+            Images to augment.
+
+        processes : None or int, optional(default=None)
+            Number of processes to use. If None, the number of CPU cores
+            will be used.
+
+        chunk_size : None or int, optional(default=None)
+            Number of images per chunk. If None, a default of 8 images will be
+            used. Larger chunks reduce the overhead per chunk, smaller ones
+            distribute the work more evenly between the processes.
+
+        Returns
+        -------
+        images_result : ndarray
+            Augmented images. The array's memory is shared with the (already
+            terminated) processes.
+
+        Examples
+        --------
+        >>> seq = iaa.Sequential([iaa.Affine(rotate=(-10, 10)), iaa.GaussianBlur((0, 1.0))])
+        >>> images = np.zeros((1024, 128, 128, 3), dtype=np.uint8)
+        >>> images_aug = seq.augment_images_parallel(images, processes=4, chunk_size=64)
+
+        Augments 1024 images in chunks of 64 images with 4 processes.
+
+        """
+        ia.do_assert(ia.is_np_array(images) and images.ndim in [3, 4],
+                     "Expected images as an array of shape (N, H, W) or (N, H, W, C), got %s." % (
+                         images.shape if ia.is_np_array(images) else type(images),))
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        ia.do_assert(ia.is_single_integer(processes) and processes >= 1,
+                     "Expected processes to be None or an int >= 1, got %s." % (processes,))
+        ia.do_assert(chunk_size is None or (ia.is_single_integer(chunk_size) and chunk_size >= 1),
+                     "Expected chunk_size to be None or an int >= 1, got %s." % (chunk_size,))
+
+        nb_images = len(images)
+        if nb_images == 0:
+            return np.copy(images)
+        if chunk_size is None:
+            chunk_size = _PARALLEL_CHUNK_SIZE
+        starts = list(sm.xrange(0, nb_images, chunk_size))
+
+        if self.deterministic:
+            state_orig = self.random_state.get_state()
+        seeds = self.random_state.randint(0, 10**6, size=(len(starts),))
+        ia.forward_random_state(self.random_state)
+        if self.deterministic:
+            self.random_state.set_state(state_orig)
+
+        chunks = [(start, min(start + chunk_size, nb_images), seed) for start, seed in zip(starts, seeds)]
+        buffer_images, images_shared = _create_shared_array(images.shape, images.dtype)
+        buffer_images_aug, images_aug = _create_shared_array(images.shape, images.dtype)
+        images_shared[...] = images
+
+        if processes == 1 or len(chunks) == 1:
+            augmenter = self.deepcopy()
+            for start, end, seed in chunks:
+                _augment_images_chunk(augmenter, images_shared, images_aug, start, end, seed)
+        else:
+            pool = multiprocessing.Pool(
+                min(processes, len(chunks)),
+                initializer=_init_parallel_worker,
+                initargs=(self, buffer_images, buffer_images_aug, images.shape, images.dtype)
+            )
+            try:
+                pool.map(_augment_images_chunk_in_worker, chunks, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+
+        return images_aug
+
     @abstractmethod
     def _augment_images(self, images, random_state, parents, hooks):
         """
@@ -568,6 +1148,57 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         """
         raise NotImplementedError()
 
+    def _get_fusion_key(self):
+        """
+        Get the key under which this augmenter may be fused with adjacent augmenters.
+
+        `Sequential` executes runs of directly adjacent children that have
+        the same key (that is not None) with a single call of
+        `_augment_images_fused()` on the first augmenter of the run.
+        This allows to e.g. skip work that would otherwise be repeated for
+        each of these augmenters.
+
+        Returns
+        -------
+        key : None or hashable
+            The fusion key. None if the augmenter can not be fused.
+
+        """
+        return None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        """
+        Augment images with a run of adjacent augmenters that share the same
+        fusion key.
+
+        This is only called for augmenters that return a fusion key
+        in `_get_fusion_key()`. The method behaves like calling
+        `augment_images()` on each of the augmenters in order, including
+        the changes to their random states (see `call_with_random_state()`),
+        but skips the hooks of the individual augmenters.
+
+        Parameters
+        ----------
+        augmenters : list of Augmenter
+            The augmenters to apply, starting with this augmenter.
+
+        images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+            See `Augmenter._augment_images()`.
+
+        parents : list of Augmenter
+            See `Augmenter._augment_images()`.
+
+        hooks : ia.HooksImages
+            See `Augmenter._augment_images()`.
+
+        Returns
+        ----------
+        images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+            The augmented images.
+
+        """
+        raise NotImplementedError()
+
     def augment_heatmaps(self, heatmaps, parents=None, hooks=None):
         """
         Augment a heatmap.
@@ -599,30 +1230,40 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             parents = []
 
         if hooks is None:
-            hooks = ia.HooksHeatmaps()
+            hooks = _DEFAULT_HOOKS_HEATMAPS
+        with_hooks = not _is_default_hooks(hooks)
 
         ia.do_assert(ia.is_iterable(heatmaps), "Expected to get list of imgaug.HeatmapsOnImage() instances, got %s." % (type(heatmaps),))
         ia.do_assert(all([isinstance(heatmaps_i, ia.HeatmapsOnImage) for heatmaps_i in heatmaps]), "Expected to get list of imgaug.HeatmapsOnImage() instances, got %s." % ([type(el) for el in heatmaps],))
 
         heatmaps_copy = [heatmaps_i.deepcopy() for heatmaps_i in heatmaps]
 
-        heatmaps_copy = hooks.preprocess(heatmaps_copy, augmenter=self, parents=parents)
+        if with_hooks:
+            heatmaps_copy = hooks.preprocess(heatmaps_copy, augmenter=self, parents=parents)
 
-        if hooks.is_activated(heatmaps_copy, augmenter=self, parents=parents, default=self.activated):
+        activated = hooks.is_activated(heatmaps_copy, augmenter=self, parents=parents, default=self.activated) \
+            if with_hooks else self.activated
+        if activated:
             if len(heatmaps_copy) > 0:
-                heatmaps_result = self._augment_heatmaps(
-                    heatmaps_copy,
-                    random_state=ia.copy_random_state(self.random_state),
-                    parents=parents,
-                    hooks=hooks
-                )
-                ia.forward_random_state(self.random_state)
+                random_state, scratch = self._acquire_random_state_copy()
+                try:
+                    heatmaps_result = self._augment_heatmaps(
+                        heatmaps_copy,
+                        random_state=random_state,
+                        parents=parents,
+                        hooks=hooks
+                    )
+                finally:
+                    self._release_random_state_copy(scratch)
+                if not self.deterministic:
+                    ia.forward_random_state(self.random_state)
             else:
                 heatmaps_result = heatmaps_copy
         else:
             heatmaps_result = heatmaps_copy
 
-        heatmaps_result = hooks.postprocess(heatmaps_result, augmenter=self, parents=parents)
+        if with_hooks:
+            heatmaps_result = hooks.postprocess(heatmaps_result, augmenter=self, parents=parents)
 
         if self.deterministic:
             self.random_state.set_state(state_orig)
@@ -690,6 +1331,12 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         """
         Augment segmentation maps.
 
+        Segmentation maps that were created from integer class ids are augmented via
+        `_augment_segmentation_maps()`, which by default converts them temporarily to heatmaps
+        (see `_augment_segmentation_maps_as_heatmaps()`). Geometric augmenters override that
+        method to transform the class ids directly, using nearest neighbour interpolation.
+        All other segmentation maps are converted to heatmaps and augmented as such.
+
         Parameters
         ----------
         segmaps : list of ia.SegmentationMapOnImage
@@ -710,14 +1357,119 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             Corresponding augmented segmentation maps.
 
         """
+        ia.do_assert(ia.is_iterable(segmaps), "Expected to get list of imgaug.SegmentationMapOnImage() instances, got %s." % (type(segmaps),))
+        ia.do_assert(all([isinstance(segmap, ia.SegmentationMapOnImage) for segmap in segmaps]), "Expected to get list of imgaug.SegmentationMapOnImage() instances, got %s." % ([type(el) for el in segmaps],))
+
+        if not all([segmap.arr_int is not None for segmap in segmaps]):
+            return self._augment_segmentation_maps_as_heatmaps(
+                segmaps,
+                lambda heatmaps: self.augment_heatmaps(heatmaps, parents=parents, hooks=hooks)
+            )
+
+        if self.deterministic:
+            state_orig = self.random_state.get_state()
+
+        if parents is None:
+            parents = []
+
+        if hooks is None:
+            hooks = _DEFAULT_HOOKS_HEATMAPS
+        with_hooks = not _is_default_hooks(hooks)
+
+        segmaps_copy = [segmap.deepcopy() for segmap in segmaps]
+
+        if with_hooks:
+            segmaps_copy = hooks.preprocess(segmaps_copy, augmenter=self, parents=parents)
+
+        activated = hooks.is_activated(segmaps_copy, augmenter=self, parents=parents, default=self.activated) \
+            if with_hooks else self.activated
+        if activated:
+            if len(segmaps_copy) > 0:
+                random_state, scratch = self._acquire_random_state_copy()
+                try:
+                    segmaps_result = self._augment_segmentation_maps(
+                        segmaps_copy,
+                        random_state=random_state,
+                        parents=parents,
+                        hooks=hooks
+                    )
+                finally:
+                    self._release_random_state_copy(scratch)
+                if not self.deterministic:
+                    ia.forward_random_state(self.random_state)
+            else:
+                segmaps_result = segmaps_copy
+        else:
+            segmaps_result = segmaps_copy
+
+        if with_hooks:
+            segmaps_result = hooks.postprocess(segmaps_result, augmenter=self, parents=parents)
+
+        if self.deterministic:
+            self.random_state.set_state(state_orig)
+
+        return segmaps_result
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        """
+        Augment integer-based segmentation maps on multiple images.
+
+        This is the internal version of `augment_segmentation_maps()` for segmentation maps
+        that are stored as class ids (i.e. `arr_int` is not None).
+        By default, the segmentation maps are converted to heatmaps containing one channel per
+        class that appears in the map, which are then augmented via `_augment_heatmaps()`.
+        Augmenters that change the geometry of the maps should overwrite this method and
+        transform the class ids directly, using nearest neighbour interpolation.
+        Augmenters that don't change the maps should overwrite it and return the inputs.
+
+        Parameters
+        ----------
+        segmaps : list of ia.SegmentationMapOnImage
+            Segmentation maps to augment. They may be changed in-place.
+
+        random_state : np.random.RandomState
+            The random state to use for all sampling tasks during the
+            augmentation. Must be used in the same way as in `_augment_heatmaps()`,
+            so that the segmentation maps stay aligned with the images.
+
+        parents : list of Augmenter
+            See `augment_segmentation_maps()`.
+
+        hooks : ia.HooksHeatmaps
+            See `augment_segmentation_maps()`.
+
+        Returns
+        ----------
+        segmaps : list of ia.SegmentationMapOnImage
+            The augmented segmentation maps.
+
+        """
+        return self._augment_segmentation_maps_as_heatmaps(
+            segmaps,
+            lambda heatmaps: self._augment_heatmaps(heatmaps, random_state=random_state, parents=parents, hooks=hooks)
+        )
+
+    @classmethod
+    def _augment_segmentation_maps_as_heatmaps(cls, segmaps, augment_func):
+        # Augments segmentation maps by converting them to heatmaps (one channel per class
+        # that appears in the map), calling augment_func(heatmaps) and converting back.
+        # Integer-based maps are converted back to class ids, which avoids creating
+        # arrays with one channel for every possible class.
         heatmaps_with_nonempty = [segmap.to_heatmaps(only_nonempty=True, not_none_if_no_nonempty=True) for segmap in segmaps]
         heatmaps = [heatmaps_i for heatmaps_i, nonempty_class_indices_i in heatmaps_with_nonempty]
         nonempty_class_indices = [nonempty_class_indices_i for heatmaps_i, nonempty_class_indices_i in heatmaps_with_nonempty]
-        heatmaps_aug = self.augment_heatmaps(heatmaps)
+        heatmaps_aug = augment_func(heatmaps)
         segmaps_aug = []
         for segmap, heatmaps_aug_i, nonempty_class_indices_i in zip(segmaps, heatmaps_aug, nonempty_class_indices):
-            segmap_aug = ia.SegmentationMapOnImage.from_heatmaps(heatmaps_aug_i, class_indices=nonempty_class_indices_i, nb_classes=segmap.nb_classes)
-            segmap_aug.input_was = segmap.input_was
+            if segmap.arr_int is not None:
+                arr_0to1 = heatmaps_aug_i.arr_0to1
+                class_ids = np.int32(nonempty_class_indices_i)[np.argmax(arr_0to1, axis=2)]
+                # same background threshold as in SegmentationMapOnImage.get_arr_int()
+                class_ids[np.amax(arr_0to1, axis=2) < 0.01] = -1
+                segmap_aug = segmap._copy_with_arr_int(class_ids, shape=heatmaps_aug_i.shape)
+            else:
+                segmap_aug = ia.SegmentationMapOnImage.from_heatmaps(heatmaps_aug_i, class_indices=nonempty_class_indices_i, nb_classes=segmap.nb_classes)
+                segmap_aug.input_was = segmap.input_was
             segmaps_aug.append(segmap_aug)
         return segmaps_aug
 
@@ -776,16 +1528,20 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             parents = []
 
         if hooks is None:
-            hooks = ia.HooksKeypoints()
+            hooks = _DEFAULT_HOOKS_KEYPOINTS
+        with_hooks = not _is_default_hooks(hooks)
 
         ia.do_assert(ia.is_iterable(keypoints_on_images))
         ia.do_assert(all([isinstance(keypoints_on_image, ia.KeypointsOnImage) for keypoints_on_image in keypoints_on_images]))
 
         keypoints_on_images_copy = [keypoints_on_image.deepcopy() for keypoints_on_image in keypoints_on_images]
 
-        keypoints_on_images_copy = hooks.preprocess(keypoints_on_images_copy, augmenter=self, parents=parents)
+        if with_hooks:
+            keypoints_on_images_copy = hooks.preprocess(keypoints_on_images_copy, augmenter=self, parents=parents)
 
-        if hooks.is_activated(keypoints_on_images_copy, augmenter=self, parents=parents, default=self.activated):
+        activated = hooks.is_activated(keypoints_on_images_copy, augmenter=self, parents=parents, default=self.activated) \
+            if with_hooks else self.activated
+        if activated:
             if len(keypoints_on_images_copy) > 0:
                 # TODO empty KeypointsOnImage objects are filtered here, which means that their
                 # .shape is not altered by augmentation. Add a separate augment_shape() method and
@@ -794,24 +1550,30 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
                 keypoints_on_images_to_aug, nonempty_idx = reduce_to_nonempty(keypoints_on_images_copy)
 
                 if len(nonempty_idx) > 0:
-                    keypoints_on_images_result = self._augment_keypoints(
-                        keypoints_on_images_to_aug,
-                        random_state=ia.copy_random_state(self.random_state),
-                        parents=parents,
-                        hooks=hooks
-                    )
+                    random_state, scratch = self._acquire_random_state_copy()
+                    try:
+                        keypoints_on_images_result = self._augment_keypoints(
+                            keypoints_on_images_to_aug,
+                            random_state=random_state,
+                            parents=parents,
+                            hooks=hooks
+                        )
+                    finally:
+                        self._release_random_state_copy(scratch)
                 else:
                     keypoints_on_images_result = []
 
                 keypoints_on_images_result = invert_reduce_to_nonempty(keypoints_on_images_copy, nonempty_idx, keypoints_on_images_result)
 
-                ia.forward_random_state(self.random_state)
+                if not self.deterministic:
+                    ia.forward_random_state(self.random_state)
             else:
                 keypoints_on_images_result = keypoints_on_images_copy
         else:
             keypoints_on_images_result = keypoints_on_images_copy
 
-        keypoints_on_images_result = hooks.postprocess(keypoints_on_images_result, augmenter=self, parents=parents)
+        if with_hooks:
+            keypoints_on_images_result = hooks.postprocess(keypoints_on_images_result, augmenter=self, parents=parents)
 
         if self.deterministic:
             self.random_state.set_state(state_orig)
@@ -1125,6 +1887,107 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         aug.deterministic = True
         return aug
 
+    def _acquire_random_state_copy(self):
+        """
+        Get a copy of this augmenter's random state for one call of an augmentation method.
+
+        Creating a new RandomState object is the most expensive step of augmenting small
+        batches, hence the same object is reused between calls and only its state is
+        overwritten. Nested calls of the same augmenter (e.g. when heatmaps are augmented as
+        images) receive fresh copies instead. The reused object is never shared with (shallow)
+        copies of this augmenter.
+
+        Returns
+        -------
+        random_state : np.random.RandomState
+            Copy of the random state.
+
+        scratch : None or list
+            Handle to pass to `_release_random_state_copy()` after the call.
+
+        """
+        scratch = self.__dict__.get("_random_state_scratch")
+        if scratch is None or scratch[0] is not self:
+            scratch = [self, ia.dummy_random_state(), False]
+            self._random_state_scratch = scratch
+        elif scratch[2]:
+            return ia.copy_random_state(self.random_state), None
+        scratch[1].set_state(self.random_state.get_state())
+        scratch[2] = True
+        return scratch[1], scratch
+
+    @classmethod
+    def _release_random_state_copy(cls, scratch):
+        if scratch is not None:
+            scratch[2] = False
+
+    def set_nb_workers(self, nb_workers, recursive=True):
+        """
+        Set the number of threads to use for augmenting the images of a batch.
+
+        If above 1, augmenters that process images one by one in expensive
+        routines which release the GIL (e.g. the cv2-based warping in
+        `Affine` or the blurs) distribute the images of each batch over a
+        shared pool of threads. All random values are still sampled in the
+        calling thread, so the results are identical to the ones with a
+        single thread. This does not affect augmenters that only perform
+        cheap operations per image.
+
+        Parameters
+        ----------
+        nb_workers : int or "auto"
+            Number of threads to use. 1 deactivates the parallelization.
+            If "auto", the number of CPU cores will be used.
+
+        recursive : bool, optional(default=True)
+            Whether to also set the number of threads of all children.
+
+        Examples
+        --------
+        >>> seq = iaa.Sequential([iaa.Affine(rotate=(-10, 10)), iaa.GaussianBlur((0, 1.0))])
+        >>> seq.set_nb_workers(4)
+
+        Augments the images of each batch with 4 threads.
+
+        """
+        if nb_workers == "auto":
+            nb_workers = multiprocessing.cpu_count()
+        ia.do_assert(ia.is_single_integer(nb_workers) and nb_workers >= 1,
+                     "Expected nb_workers to be \"auto\" or an int >= 1, got %s." % (nb_workers,))
+        self.nb_workers = nb_workers
+        if recursive:
+            for lst in self.get_children_lists():
+                for aug in lst:
+                    aug.set_nb_workers(nb_workers, recursive=True)
+
+    def _map_images(self, func, nb_images):
+        """
+        Call a function for the indices of all images of a batch.
+
+        If `nb_workers` (see `set_nb_workers()`) is above 1, the calls are distributed
+        over a shared pool of threads. The function must therefore not sample random
+        values from random states that are shared between images, as the results would
+        otherwise depend on the order of the calls. Sample them beforehand instead or
+        create one random state per image from seeds sampled beforehand.
+
+        Parameters
+        ----------
+        func : callable
+            Function that receives the index of an image as its only argument.
+
+        nb_images : int
+            Number of images in the batch.
+
+        Returns
+        -------
+        results : list
+            Return values of `func`, ordered by image index.
+
+        """
+        if self.nb_workers > 1 and nb_images > 1:
+            return ia._get_thread_pool(self.nb_workers).map(func, sm.xrange(nb_images))
+        return [func(i) for i in sm.xrange(nb_images)]
+
     def reseed(self, random_state=None, deterministic_too=False):
         """
         Reseed this augmenter and all of its children (if it has any).
@@ -1313,8 +2176,14 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             Returns itself (after random state copy).
 
         """
-        source_augs = [source] + source.get_all_children(flat=True) if recursive else [source]
-        target_augs = [self] + self.get_all_children(flat=True) if recursive else [self]
+        if recursive:
+            source_index = source._get_tree_index()
+            target_index = self._get_tree_index()
+            source_augs = source_index.nodes
+            target_augs = target_index.nodes
+        else:
+            source_augs = [source]
+            target_augs = [self]
 
         global_rs = ia.current_random_state()
         global_rs_exc_msg = "You called copy_random_state_() with a source " \
@@ -1324,8 +2193,17 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
                             "states, e.g. via Dropout(..., random_state=1234)."
 
         if matching == "name":
-            source_augs_dict = {aug.name: aug for aug in source_augs}
-            target_augs_dict = {aug.name: aug for aug in target_augs}
+            # if names appear multiple times, the last augmenter with that name is used
+            if recursive:
+                source_augs_dict = {name: source_augs[positions[-1]]
+                                    for name, positions in source_index.by_name.items()}
+                target_augs_dict = collections.OrderedDict([
+                    (name, target_augs[positions[-1]])
+                    for name, positions in target_index.by_name.items()
+                ])
+            else:
+                source_augs_dict = {source.name: source}
+                target_augs_dict = {self.name: self}
 
             if len(source_augs_dict) < len(source_augs) or len(target_augs_dict) < len(target_augs):
                 warnings.warn(
@@ -1411,6 +2289,9 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             The children as a nested or flat list.
 
         """
+        if flat:
+            return self._get_tree_index().nodes[1:]
+
         result = []
         for lst in self.get_children_lists():
             for aug in lst:
@@ -1462,6 +2343,10 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         This will return the first child augmenter (Fliplr instance).
 
         """
+        if parents is None and flat:
+            index = self._get_tree_index()
+            return [aug for aug, aug_parents in zip(index.nodes, index.parents) if func(aug, aug_parents)]
+
         if parents is None:
             parents = []
 
@@ -1525,6 +2410,9 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             Flat list if flat was set to True.
 
         """
+        if flat:
+            return self._get_tree_index().find_by_names(names, regex=regex)
+
         if regex:
             def comparer(aug, parents):
                 for pattern in names:
@@ -1536,6 +2424,36 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         else:
             return self.find_augmenters(lambda aug, parents: aug.name in names, flat=flat)
 
+    def find_augmenters_by_type(self, types, flat=True):
+        """
+        Find augmenter(s) that are instances of given class(es).
+
+        Parameters
+        ----------
+        types : type or tuple of type
+            Augmenter class(es) to search for. Subclasses match too.
+
+        flat : bool, optional
+            See `Augmenter.find_augmenters()`.
+
+        Returns
+        -------
+        augmenters : list of Augmenter
+            Nested list if flat was set to False.
+            Flat list if flat was set to True.
+
+        Examples
+        --------
+        >>> seq = iaa.Sequential([iaa.Fliplr(0.5), iaa.Sometimes(0.5, iaa.Fliplr(1.0))])
+        >>> flips = seq.find_augmenters_by_type(iaa.Fliplr)
+
+        This will return both Fliplr instances.
+
+        """
+        if flat:
+            return self._get_tree_index().find_by_types(types)
+        return self.find_augmenters(lambda aug, parents: isinstance(aug, types), flat=flat)
+
     def remove_augmenters(self, func, copy=True, noop_if_topmost=True):
         """
         Remove this augmenter or its children that match a condition.
@@ -1640,9 +2558,41 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
             for aug in lst:
                 aug.remove_augmenters_inplace(func, subparents)
 
-    # TODO
-    # def to_json(self):
-    #    pass
+    def to_config(self):
+        """
+        Convert this augmenter and all of its children to a config.
+
+        The config only consists of dicts, lists, strings, numbers, bools and None.
+        Random states are saved as seeds, see `imgaug.to_config()` for details.
+        Use `imgaug.from_config()` to rebuild the augmenter.
+
+        Returns
+        -------
+        config : dict
+            Config of this augmenter.
+
+        """
+        return ia.to_config(self)
+
+    def to_json(self):
+        """
+        Convert this augmenter and all of its children to a JSON string.
+
+        This is usually much smaller than a pickled augmenter and can be used to send
+        augmenters to other processes. Use `imgaug.from_json()` to rebuild the augmenter.
+
+        Returns
+        -------
+        json_str : string
+            Config of this augmenter in JSON format.
+
+        Examples
+        --------
+        >>> seq = iaa.Sequential([iaa.Fliplr(0.5), iaa.Add((-10, 10))])
+        >>> seq_rebuilt = ia.from_json(seq.to_json())
+
+        """
+        return json.dumps(self.to_config())
 
     def copy(self):
         """
@@ -1677,7 +2627,7 @@ class Augmenter(object): # pylint: disable=locally-disabled, unused-variable, li
         return "%s(name=%s, parameters=[%s], deterministic=%s)" % (self.__class__.__name__, self.name, params_str, self.deterministic)
 
 
-class Sequential(Augmenter, list):
+class Sequential(Augmenter, _MutationTrackingList):
     """
     List augmenter that may contain other augmenters to apply in sequence
     or random order.
@@ -1757,31 +2707,75 @@ class Sequential(Augmenter, list):
                         hooks=hooks
                     )
             else:
-                for augmenter in self:
-                    images = augmenter.augment_images(
-                        images=images,
-                        parents=parents + [self],
-                        hooks=hooks
-                    )
+                for augmenters in self._get_fused_runs(hooks):
+                    if len(augmenters) == 1:
+                        images = augmenters[0].augment_images(
+                            images=images,
+                            parents=parents + [self],
+                            hooks=hooks
+                        )
+                    elif len(images) > 0:
+                        images = augmenters[0]._augment_images_fused(
+                            augmenters,
+                            images,
+                            parents=parents + [self],
+                            hooks=hooks
+                        )
         return images
 
+    def _get_fused_runs(self, hooks):
+        """
+        Split the children into runs of adjacent augmenters that can be
+        executed together (see `Augmenter._get_fusion_key()`).
+
+        Fusion skips the hooks of the fused augmenters themselves, so it is
+        deactivated if the hooks have any effect.
+
+        """
+        use_fusion = _is_noop_hooks(hooks)
+        runs = []
+        last_key = None
+        for augmenter in self:
+            key = augmenter._get_fusion_key() if use_fusion else None
+            if key is not None and key == last_key:
+                runs[-1].append(augmenter)
+            else:
+                runs.append([augmenter])
+            last_key = key
+        return runs
+
+    def _get_fusion_key(self):
+        # the container is pointwise if all of its children are
+        if self.activated and all([child._get_fusion_key() == FUSION_KEY_POINTWISE for child in self]):
+            return FUSION_KEY_POINTWISE
+        return None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
+        return self._augment_maps(heatmaps, "augment_heatmaps", random_state, parents, hooks)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return self._augment_maps(segmaps, "augment_segmentation_maps", random_state, parents, hooks)
+
+    def _augment_maps(self, maps, method_name, random_state, parents, hooks):
+        if hooks.is_propagating(maps, augmenter=self, parents=parents, default=True):
             if self.random_order:
                 for index in random_state.permutation(len(self)):
-                    heatmaps = self[index].augment_heatmaps(
-                        heatmaps=heatmaps,
+                    maps = getattr(self[index], method_name)(
+                        maps,
                         parents=parents + [self],
                         hooks=hooks
                     )
             else:
                 for augmenter in self:
-                    heatmaps = augmenter.augment_heatmaps(
-                        heatmaps=heatmaps,
+                    maps = getattr(augmenter, method_name)(
+                        maps,
                         parents=parents + [self],
                         hooks=hooks
                     )
-        return heatmaps
+        return maps
 
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
@@ -1829,7 +2823,7 @@ class Sequential(Augmenter, list):
         augs_str = ", ".join([aug.__str__() for aug in self])
         return "Sequential(name=%s, random_order=%s, children=[%s], deterministic=%s)" % (self.name, self.random_order, augs_str, self.deterministic)
 
-class SomeOf(Augmenter, list):
+class SomeOf(Augmenter, _MutationTrackingList):
     """
     List augmenter that applies only some of its children to images.
 
@@ -1986,71 +2980,99 @@ class SomeOf(Augmenter, list):
 
     def _augment_images(self, images, random_state, parents, hooks):
         if hooks.is_propagating(images, augmenter=self, parents=parents, default=True):
-            input_is_array = ia.is_np_array(images)
-
-            # This must happen before creating the augmenter_active array,
-            # otherwise in case of determinism the number of augmented images
-            # would change the random_state's state, resulting in the order
-            # being dependent on the number of augmented images (and not be
-            # constant). By doing this first, the random state is always the
-            # same (when determinism is active), so the order is always the
-            # same.
-            augmenter_order = self._get_augmenter_order(random_state)
-
-            # create an array of active augmenters per image
-            # e.g.
-            #  [[0, 0, 1],
-            #   [1, 0, 1],
-            #   [1, 0, 0]]
-            # would signal, that augmenter 3 is active for the first image,
-            # augmenter 1 and 3 for the 2nd image and augmenter 1 for the 3rd.
-            augmenter_active = self._get_augmenter_active(len(images), random_state)
-
-            for augmenter_index in augmenter_order:
-                active = augmenter_active[:, augmenter_index].nonzero()[0]
-                if len(active) > 0:
-                    # pick images to augment, i.e. images for which
-                    # augmenter at current index is active
-                    if input_is_array:
-                        images_to_aug = images[active]
-                    else:
-                        images_to_aug = [images[idx] for idx in active]
+            if len(images) > 0 and _is_noop_hooks(hooks) and _is_lut_applicable(images) \
+                    and self._get_fusion_key() == FUSION_KEY_POINTWISE:
+                # only pointwise children, compute all of their changes as a single
+                # lookup table per image instead of augmenting each image once per child
+                images = _augment_images_via_lut(
+                    images,
+                    lambda value_images: self._augment_images_by_children(value_images, random_state, parents, hooks)
+                )
+            else:
+                images = self._augment_images_by_children(images, random_state, parents, hooks)
+        return images
 
-                    # augment the images
-                    images_to_aug = self[augmenter_index].augment_images(
-                        images=images_to_aug,
-                        parents=parents + [self],
-                        hooks=hooks
-                    )
-                    output_is_array = ia.is_np_array(images_to_aug)
-                    output_all_same_shape = len(set([img.shape for img in images_to_aug])) == 1
+    def _augment_images_by_children(self, images, random_state, parents, hooks):
+        input_is_array = ia.is_np_array(images)
+
+        # This must happen before creating the augmenter_active array,
+        # otherwise in case of determinism the number of augmented images
+        # would change the random_state's state, resulting in the order
+        # being dependent on the number of augmented images (and not be
+        # constant). By doing this first, the random state is always the
+        # same (when determinism is active), so the order is always the
+        # same.
+        augmenter_order = self._get_augmenter_order(random_state)
+
+        # create an array of active augmenters per image
+        # e.g.
+        #  [[0, 0, 1],
+        #   [1, 0, 1],
+        #   [1, 0, 0]]
+        # would signal, that augmenter 3 is active for the first image,
+        # augmenter 1 and 3 for the 2nd image and augmenter 1 for the 3rd.
+        augmenter_active = self._get_augmenter_active(len(images), random_state)
+
+        for augmenter_index in augmenter_order:
+            active = augmenter_active[:, augmenter_index].nonzero()[0]
+            if len(active) > 0:
+                # pick images to augment, i.e. images for which
+                # augmenter at current index is active
+                if input_is_array:
+                    images_to_aug = images[active]
+                else:
+                    images_to_aug = [images[idx] for idx in active]
 
-                    # Map them back to their position in the images array/list
-                    # But it can happen that the augmented images have different shape(s) from
-                    # the input image, as well as being suddenly a list instead of a numpy array.
-                    # This is usually the case if a child augmenter has to change shapes, e.g.
-                    # due to cropping (without resize afterwards). So accomodate here for that
-                    # possibility.
-                    if input_is_array:
-                        if not output_is_array and output_all_same_shape:
-                            images_to_aug = np.array(images_to_aug, dtype=images.dtype)
-                            output_is_array = True
-
-                        if output_is_array and images_to_aug.shape[1:] == images.shape[1:]:
-                            images[active] = images_to_aug
-                        else:
-                            images = list(images)
-                            for aug_idx, original_idx in enumerate(active):
-                                images[original_idx] = images_to_aug[aug_idx]
-                            input_is_array = False
+                # augment the images
+                images_to_aug = self[augmenter_index].augment_images(
+                    images=images_to_aug,
+                    parents=parents + [self],
+                    hooks=hooks
+                )
+                output_is_array = ia.is_np_array(images_to_aug)
+                output_all_same_shape = len(set([img.shape for img in images_to_aug])) == 1
+
+                # Map them back to their position in the images array/list
+                # But it can happen that the augmented images have different shape(s) from
+                # the input image, as well as being suddenly a list instead of a numpy array.
+                # This is usually the case if a child augmenter has to change shapes, e.g.
+                # due to cropping (without resize afterwards). So accomodate here for that
+                # possibility.
+                if input_is_array:
+                    if not output_is_array and output_all_same_shape:
+                        images_to_aug = np.array(images_to_aug, dtype=images.dtype)
+                        output_is_array = True
+
+                    if output_is_array and images_to_aug.shape[1:] == images.shape[1:]:
+                        images[active] = images_to_aug
                     else:
+                        images = list(images)
                         for aug_idx, original_idx in enumerate(active):
                             images[original_idx] = images_to_aug[aug_idx]
+                        input_is_array = False
+                else:
+                    for aug_idx, original_idx in enumerate(active):
+                        images[original_idx] = images_to_aug[aug_idx]
 
         return images
 
+    def _get_fusion_key(self):
+        # the container is pointwise if all of its children are
+        if self.activated and all([child._get_fusion_key() == FUSION_KEY_POINTWISE for child in self]):
+            return FUSION_KEY_POINTWISE
+        return None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
+        return self._augment_maps(heatmaps, "augment_heatmaps", random_state, parents, hooks)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return self._augment_maps(segmaps, "augment_segmentation_maps", random_state, parents, hooks)
+
+    def _augment_maps(self, maps, method_name, random_state, parents, hooks):
+        if hooks.is_propagating(maps, augmenter=self, parents=parents, default=True):
             # This must happen before creating the augmenter_active array,
             # otherwise in case of determinism the number of augmented images
             # would change the random_state's state, resulting in the order
@@ -2067,27 +3089,27 @@ class SomeOf(Augmenter, list):
             #   [1, 0, 0]]
             # would signal, that augmenter 3 is active for the first image,
             # augmenter 1 and 3 for the 2nd image and augmenter 1 for the 3rd.
-            augmenter_active = self._get_augmenter_active(len(heatmaps), random_state)
+            augmenter_active = self._get_augmenter_active(len(maps), random_state)
 
             for augmenter_index in augmenter_order:
                 active = augmenter_active[:, augmenter_index].nonzero()[0]
                 if len(active) > 0:
                     # pick images to augment, i.e. images for which
                     # augmenter at current index is active
-                    heatmaps_to_aug = [heatmaps[idx] for idx in active]
+                    maps_to_aug = [maps[idx] for idx in active]
 
                     # augment the images
-                    heatmaps_aug = self[augmenter_index].augment_heatmaps(
-                        heatmaps_to_aug,
+                    maps_aug = getattr(self[augmenter_index], method_name)(
+                        maps_to_aug,
                         parents=parents + [self],
                         hooks=hooks
                     )
 
                     # Map them back to their position in the images array/list
                     for aug_idx, original_idx in enumerate(active):
-                        heatmaps[original_idx] = heatmaps_aug[aug_idx]
+                        maps[original_idx] = maps_aug[aug_idx]
 
-        return heatmaps
+        return maps
 
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
@@ -2315,37 +3337,52 @@ class Sometimes(Augmenter):
 
         return result
 
+    def _get_fusion_key(self):
+        # the container is pointwise if all of its children are
+        if self.activated and all([child._get_fusion_key() == FUSION_KEY_POINTWISE for child in [self.then_list, self.else_list]]):
+            return FUSION_KEY_POINTWISE
+        return None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
-            nb_heatmaps = len(heatmaps)
-            samples = self.p.draw_samples((nb_heatmaps,), random_state=random_state)
+        return self._augment_maps(heatmaps, "augment_heatmaps", random_state, parents, hooks)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return self._augment_maps(segmaps, "augment_segmentation_maps", random_state, parents, hooks)
+
+    def _augment_maps(self, maps, method_name, random_state, parents, hooks):
+        if hooks.is_propagating(maps, augmenter=self, parents=parents, default=True):
+            nb_maps = len(maps)
+            samples = self.p.draw_samples((nb_maps,), random_state=random_state)
 
-            # create lists of heatmaps for if and else lists (one for each)
+            # create lists of maps for if and else lists (one for each)
             indices_then_list = np.where(samples == 1)[0] # np.where returns tuple(array([0, 5, 9, ...])) or tuple(array([]))
             indices_else_list = np.where(samples == 0)[0]
-            heatmaps_then_list = [heatmaps[i] for i in indices_then_list]
-            heatmaps_else_list = [heatmaps[i] for i in indices_else_list]
+            maps_then_list = [maps[i] for i in indices_then_list]
+            maps_else_list = [maps[i] for i in indices_else_list]
 
             # augment according to if and else list
-            result_then_list = self.then_list.augment_heatmaps(
-                heatmaps_then_list,
+            result_then_list = getattr(self.then_list, method_name)(
+                maps_then_list,
                 parents=parents + [self],
                 hooks=hooks
             )
-            result_else_list = self.else_list.augment_heatmaps(
-                heatmaps_else_list,
+            result_else_list = getattr(self.else_list, method_name)(
+                maps_else_list,
                 parents=parents + [self],
                 hooks=hooks
             )
 
-            # map results of if/else lists back to their initial positions (in "heatmaps" variable)
-            result = [None] * len(heatmaps)
-            for idx_result_then_list, idx_heatmaps in enumerate(indices_then_list):
-                result[idx_heatmaps] = result_then_list[idx_result_then_list]
-            for idx_result_else_list, idx_heatmaps in enumerate(indices_else_list):
-                result[idx_heatmaps] = result_else_list[idx_result_else_list]
+            # map results of if/else lists back to their initial positions (in "maps" variable)
+            result = [None] * len(maps)
+            for idx_result_then_list, idx_maps in enumerate(indices_then_list):
+                result[idx_maps] = result_then_list[idx_result_then_list]
+            for idx_result_else_list, idx_maps in enumerate(indices_else_list):
+                result[idx_maps] = result_else_list[idx_result_else_list]
         else:
-            result = heatmaps
+            result = maps
 
         return result
 
@@ -2498,28 +3535,34 @@ class WithChannels(Augmenter):
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        result = heatmaps
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
-            # Augment heatmaps in the style of the children if all channels or the majority of
-            # them are selected by this layer, otherwise don't change the heatmaps.
-            heatmaps_to_aug = []
+        return self._augment_maps(heatmaps, "augment_heatmaps", random_state, parents, hooks)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return self._augment_maps(segmaps, "augment_segmentation_maps", random_state, parents, hooks)
+
+    def _augment_maps(self, maps, method_name, random_state, parents, hooks):
+        result = maps
+        if hooks.is_propagating(maps, augmenter=self, parents=parents, default=True):
+            # Augment maps in the style of the children if all channels or the majority of
+            # them are selected by this layer, otherwise don't change the maps.
+            maps_to_aug = []
             indices = []
 
-            for i, heatmaps_i in enumerate(heatmaps):
-                nb_channels = heatmaps_i.shape[2] if len(heatmaps_i.shape) >= 3 else 1
+            for i, maps_i in enumerate(maps):
+                nb_channels = maps_i.shape[2] if len(maps_i.shape) >= 3 else 1
                 if self.channels is None or len(self.channels) > nb_channels*0.5:
-                    heatmaps_to_aug.append(heatmaps_i)
+                    maps_to_aug.append(maps_i)
                     indices.append(i)
 
-            if len(heatmaps_to_aug) > 0:
-                heatmaps_aug = self.children.augment_heatmaps(
-                    heatmaps_to_aug,
+            if len(maps_to_aug) > 0:
+                maps_aug = getattr(self.children, method_name)(
+                    maps_to_aug,
                     parents=parents + [self],
                     hooks=hooks
                 )
 
-                for idx_orig, heatmaps_i_aug in zip(indices, heatmaps_aug):
-                    result[idx_orig] = heatmaps_i_aug
+                for idx_orig, maps_i_aug in zip(indices, maps_aug):
+                    result[idx_orig] = maps_i_aug
 
         return result
 
@@ -2555,6 +3598,316 @@ class WithChannels(Augmenter):
     def __str__(self):
         return "WithChannels(channels=%s, name=%s, children=%s, deterministic=%s)" % (self.channels, self.name, self.children, self.deterministic)
 
+class _LRUCache(object):
+    """
+    Least-recently-used store of augmentation results with a maximum size in bytes.
+
+    If `cache_dir` is None, the results are kept in memory, otherwise they are pickled to
+    files in that directory. Files that already exist in the directory (e.g. from a previous
+    run) are reused.
+
+    """
+
+    FILE_EXTENSION = ".pkl"
+
+    def __init__(self, max_bytes, cache_dir=None):
+        ia.do_assert(max_bytes > 0, "Expected max_bytes to be above 0, got %s." % (max_bytes,))
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        # key -> (value, nb_bytes), the least recently used entry comes first
+        # (for file-based caches, value is always None)
+        self.entries = collections.OrderedDict()
+        self.nb_bytes = 0
+        self.nb_hits = 0
+        self.nb_misses = 0
+
+        if cache_dir is not None:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            filenames = [filename for filename in os.listdir(cache_dir) if filename.endswith(self.FILE_EXTENSION)]
+            filepaths = sorted([os.path.join(cache_dir, filename) for filename in filenames], key=os.path.getmtime)
+            for filepath in filepaths:
+                key = os.path.basename(filepath)[:-len(self.FILE_EXTENSION)]
+                self._add(key, None, os.path.getsize(filepath))
+
+    def __getstate__(self):
+        # The cached results are not copied (e.g. by deepcopy(), pickle or `to_config()`),
+        # as they can be very large. Copies start with an empty store, or respectively with
+        # the files in `cache_dir`.
+        return {"max_bytes": self.max_bytes, "cache_dir": self.cache_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["max_bytes"], cache_dir=state["cache_dir"])
+
+    def _get_filepath(self, key):
+        return os.path.join(self.cache_dir, key + self.FILE_EXTENSION)
+
+    def _add(self, key, value, nb_bytes):
+        self.entries[key] = (value, nb_bytes)
+        self.nb_bytes += nb_bytes
+        while self.nb_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, nb_bytes = self.entries.pop(key)
+        self.nb_bytes -= nb_bytes
+        if self.cache_dir is not None and os.path.isfile(self._get_filepath(key)):
+            os.remove(self._get_filepath(key))
+
+    def get(self, key):
+        if key not in self.entries:
+            self.nb_misses += 1
+            return None
+
+        # re-insert the entry to mark it as the most recently used one
+        value, nb_bytes = self.entries.pop(key)
+        self.entries[key] = (value, nb_bytes)
+        if self.cache_dir is not None:
+            try:
+                with open(self._get_filepath(key), "rb") as f:
+                    value = pickle.load(f)
+            except (IOError, OSError):
+                # the file was deleted from outside of the cache
+                self.nb_bytes -= nb_bytes
+                del self.entries[key]
+                self.nb_misses += 1
+                return None
+
+        self.nb_hits += 1
+        return value
+
+    def put(self, key, value, nb_bytes):
+        if key in self.entries:
+            self._remove(key)
+
+        if self.cache_dir is not None:
+            filepath = self._get_filepath(key)
+            with open(filepath, "wb") as f:
+                pickle.dump(value, f, protocol=-1)
+            value = None
+            nb_bytes = os.path.getsize(filepath)
+
+        if nb_bytes <= self.max_bytes:
+            self._add(key, value, nb_bytes)
+        elif self.cache_dir is not None:
+            os.remove(self._get_filepath(key))
+
+
+class Cached(Augmenter):
+    """
+    Cache the images augmented by child augmenters and reuse them for identical inputs.
+
+    This is useful when the same deterministic augmenters are applied to the same images
+    multiple times, e.g. during evaluation or test time augmentation. The cache key of a batch
+    is computed from the images (or their ids), the configuration of the child augmenters and
+    the random states of all child augmenters. Hence, only deterministic child augmenters (see
+    `Augmenter.to_deterministic()`) lead to cache hits, while stochastic ones produce new
+    augmentations for every call, exactly as they would without the cache.
+
+    Only images are cached. Heatmaps, segmentation maps and keypoints are always augmented by
+    the child augmenters. The cache is bypassed if hooks with callbacks are used.
+
+    Parameters
+    ----------
+    children : Augmenter or list of Augmenters or None, optional(default=None)
+        One or more augmenters whose results will be cached.
+
+    max_bytes : int, optional(default=1024**3)
+        Maximum size of the cache in bytes. If the size is exceeded, the least recently
+        used results are removed from the cache.
+
+    cache_dir : None or string, optional(default=None)
+        Directory in which to save the cached results. If None, the results are
+        kept in memory.
+
+    name : string, optional(default=None)
+        See `Augmenter.__init__()`
+
+    deterministic : bool, optional(default=False)
+        See `Augmenter.__init__()`
+
+    random_state : int or np.random.RandomState or None, optional(default=None)
+        See `Augmenter.__init__()`
+
+    Examples
+    --------
+    >>> aug = iaa.Cached(iaa.Affine(rotate=(-20, 20))).to_deterministic()
+    >>> for epoch in range(10):
+    >>>     images_aug = aug.augment_images(images, ids=image_ids)
+    >>> print(aug.get_cache_info())
+
+    augments the images only in the first epoch and reads the results from the cache in
+    all following epochs. The cache keys are computed from `image_ids` instead of the
+    image contents.
+
+    """
+
+    def __init__(self, children=None, max_bytes=1024**3, cache_dir=None, name=None, deterministic=False,
+                 random_state=None):
+        super(Cached, self).__init__(name=name, deterministic=deterministic, random_state=random_state)
+        self.children = handle_children_list(children, self.name, "then")
+        self.cache = _LRUCache(max_bytes, cache_dir=cache_dir)
+        self.ids = None
+
+    def augment_images(self, images, parents=None, hooks=None, ids=None):
+        """
+        Augment multiple images.
+
+        See `Augmenter.augment_images()` for details.
+
+        Parameters
+        ----------
+        images : (N,H,W,C) ndarray or (N,H,W) ndarray or list of (H,W,C) ndarray or list of (H,W) ndarray
+            See `Augmenter.augment_images()`.
+
+        parents : None or list of Augmenter, optional(default=None)
+            See `Augmenter.augment_images()`.
+
+        hooks : None or ia.HooksImages, optional(default=None)
+            See `Augmenter.augment_images()`.
+
+        ids : None or list of hashable, optional(default=None)
+            Ids of the images, e.g. their indices or filepaths in the dataset. If provided,
+            the cache keys are computed from these ids instead of the image contents, which
+            is faster, but assumes that an id always denotes the same image.
+
+        Returns
+        -------
+        images_result : ndarray or list
+            Corresponding augmented images.
+
+        """
+        ids_before = self.ids
+        if ids is not None:
+            ia.do_assert(len(ids) == len(images), "Expected one id per image, got %d ids for %d images." % (len(ids), len(images)))
+            self.ids = ids
+        try:
+            return super(Cached, self).augment_images(images, parents=parents, hooks=hooks)
+        finally:
+            self.ids = ids_before
+
+    def augment_batches(self, batches, hooks=None, background=False):
+        """
+        Augment multiple batches of images.
+
+        See `Augmenter.augment_batches()` for details. If a batch is an `imgaug.Batch`
+        containing images and its `data` attribute is a list with one entry per image,
+        the entries are used as the ids of the images (see `Cached.augment_images()`).
+
+        """
+        ia.do_assert(not background, "Cached can not be used with background augmentation, as the cache would not be shared between the processes.")
+        for batch in batches:
+            ids_before = self.ids
+            if isinstance(batch, ia.Batch) and batch.images is not None and isinstance(batch.data, (list, tuple)) \
+                    and len(batch.data) == len(batch.images):
+                self.ids = batch.data
+            try:
+                batch_aug = list(super(Cached, self).augment_batches([batch], hooks=hooks))[0]
+            finally:
+                self.ids = ids_before
+            yield batch_aug
+
+    def _augment_images(self, images, random_state, parents, hooks):
+        if not hooks.is_propagating(images, augmenter=self, parents=parents, default=True):
+            return images
+
+        # hooks may change the augmentation results without changing the cache key
+        if not _is_noop_hooks(hooks):
+            return self.children.augment_images(images=images, parents=parents + [self], hooks=hooks)
+
+        key = self._compute_cache_key(images)
+        images_aug = self.cache.get(key)
+        if images_aug is None:
+            images_aug = self.children.augment_images(images=images, parents=parents + [self], hooks=hooks)
+            self.cache.put(key, self._copy_images(images_aug), sum([image.nbytes for image in images_aug]))
+            return images_aug
+
+        # advance the random states as if the children were called, so that stochastic
+        # children do not repeat their augmentations in the next call
+        for augmenter in [self.children] + self.children.get_all_children(flat=True):
+            if not augmenter.deterministic:
+                ia.forward_random_state(augmenter.random_state)
+        return self._copy_images(images_aug)
+
+    def _compute_cache_key(self, images):
+        hasher = hashlib.sha1()
+        hasher.update(str(self.children).encode("utf-8"))
+        for augmenter in [self.children] + self.children.get_all_children(flat=True):
+            state = augmenter.random_state.get_state()
+            hasher.update(state[1].tobytes())
+            hasher.update(str(state[2:]).encode("utf-8"))
+
+        hasher.update(("array" if ia.is_np_array(images) else "list").encode("utf-8"))
+        hasher.update(str([(image.shape, image.dtype.str) for image in images]).encode("utf-8"))
+        if self.ids is not None:
+            hasher.update(repr(list(self.ids)).encode("utf-8"))
+        else:
+            for image in images:
+                hasher.update(np.ascontiguousarray(image).view(np.uint8).ravel())
+        return hasher.hexdigest()
+
+    @classmethod
+    def _copy_images(cls, images):
+        if ia.is_np_array(images):
+            return np.copy(images)
+        return [np.copy(image) for image in images]
+
+    def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
+        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
+            return self.children.augment_heatmaps(heatmaps, parents=parents + [self], hooks=hooks)
+        return heatmaps
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        if hooks.is_propagating(segmaps, augmenter=self, parents=parents, default=True):
+            return self.children.augment_segmentation_maps(segmaps, parents=parents + [self], hooks=hooks)
+        return segmaps
+
+    def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
+        if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
+            return self.children.augment_keypoints(keypoints_on_images, parents=parents + [self], hooks=hooks)
+        return keypoints_on_images
+
+    def get_cache_info(self):
+        """
+        Get statistics about the usage of the cache.
+
+        The cache is shared between this augmenter and its deterministic variations
+        created via `to_deterministic()`.
+
+        Returns
+        -------
+        info : dict
+            Dictionary with the keys `nb_hits`, `nb_misses`, `nb_entries`, `nb_bytes` and
+            `max_bytes`.
+
+        """
+        return {
+            "nb_hits": self.cache.nb_hits,
+            "nb_misses": self.cache.nb_misses,
+            "nb_entries": len(self.cache.entries),
+            "nb_bytes": self.cache.nb_bytes,
+            "max_bytes": self.cache.max_bytes
+        }
+
+    def _to_deterministic(self):
+        # the shallow copy shares the cache with this augmenter
+        aug = self.copy()
+        aug.children = aug.children.to_deterministic()
+        aug.deterministic = True
+        aug.random_state = ia.new_random_state()
+        return aug
+
+    def get_parameters(self):
+        return [self.cache.max_bytes, self.cache.cache_dir]
+
+    def get_children_lists(self):
+        return [self.children]
+
+    def __str__(self):
+        return "Cached(max_bytes=%d, cache_dir=%s, name=%s, children=%s, deterministic=%s)" % (
+            self.cache.max_bytes, self.cache.cache_dir, self.name, self.children, self.deterministic)
+
+
 class Noop(Augmenter):
     """
     Augmenter that never changes input images ("no operation").
@@ -2583,9 +3936,18 @@ class Noop(Augmenter):
     def _augment_images(self, images, random_state, parents, hooks):
         return images
 
+    def _get_fusion_key(self):
+        return FUSION_KEY_POINTWISE if self.activated else None
+
+    def _augment_images_fused(self, augmenters, images, parents, hooks):
+        return augment_images_pointwise(augmenters, images, parents, hooks)
+
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -24,10 +24,89 @@ from __future__ import print_function, division, absolute_import
 from .. import imgaug as ia
 from .. import parameters as iap
 import numpy as np
+import cv2
 import six.moves as sm
 
+from . import meta
 from .meta import Augmenter, handle_children_list
 
+
+def _augment_subset(func, items, mask):
+    """
+    Call an augmentation function only on the items for which `mask` is True.
+
+    Returns the augmentation results at the positions of these items and None at all
+    other positions.
+
+    """
+    indices = np.nonzero(mask)[0]
+    if len(indices) == len(items):
+        return func(items)
+
+    result = [None] * len(items)
+    if len(indices) > 0:
+        if ia.is_np_array(items):
+            subset = items[indices]
+        else:
+            subset = [items[idx] for idx in indices]
+        for idx, item_aug in zip(indices, func(subset)):
+            result[idx] = item_aug
+    return result
+
+
+def _blend_alpha_channelwise(image_first, image_second, alphas, eps):
+    """
+    Blend two images with one alpha value for all channels or one per channel.
+
+    Alpha values that are within `eps` of 1.0 (0.0) are treated as 1.0 (0.0). Images
+    that are not needed for the result may be None.
+
+    """
+    alphas = np.array(alphas, dtype=np.float64)
+    alphas[alphas >= 1.0 - eps] = 1.0
+    alphas[alphas <= 0.0 + eps] = 0.0
+    if np.all(alphas == 1.0):
+        return image_first
+    elif np.all(alphas == 0.0):
+        return image_second
+
+    nb_channels = image_first.shape[2]
+    if image_first.dtype.type == np.uint8 and image_second.dtype.type == np.uint8 and nb_channels <= 512:
+        if np.all(alphas == alphas[0]):
+            image = cv2.addWeighted(image_first, alphas[0], image_second, 1.0 - alphas[0], 0.0)
+        else:
+            channels = [cv2.addWeighted(channel_first, alpha, channel_second, 1.0 - alpha, 0.0)
+                        for channel_first, channel_second, alpha
+                        in zip(cv2.split(image_first), cv2.split(image_second), alphas)]
+            image = cv2.merge(channels)
+        # cv2 drops the channel axis for single-channel images
+        return image.reshape(image_first.shape)
+
+    alphas = alphas.astype(np.float32)
+    return alphas * image_first.astype(np.float32) + (1.0 - alphas) * image_second.astype(np.float32)
+
+
+def _blend_alpha_elementwise(image_first, image_second, mask):
+    """
+    Blend two images with one alpha value per pixel (and possibly channel).
+
+    Images that are not needed for the result may be None.
+
+    """
+    if image_first is None:
+        return image_second
+    elif image_second is None:
+        return image_first
+
+    if mask.ndim == 2:
+        mask = mask[..., np.newaxis]
+    # computes mask*first + (1-mask)*second
+    image = image_second.astype(np.float32)
+    image += mask * (image_first.astype(np.float32) - image)
+    if image_first.dtype.type == np.uint8:
+        np.rint(image, out=image)
+    return image
+
 # TODO tests
 class Alpha(Augmenter): # pylint: disable=locally-disabled, unused-variable, line-too-long
     """
@@ -155,114 +234,36 @@ class Alpha(Augmenter): # pylint: disable=locally-disabled, unused-variable, lin
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
+        factors = self._draw_factors(seeds, [image.shape[2] for image in images])
 
-        if hooks.is_propagating(images, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                images_first = images
-            else:
-                images_first = self.first.augment_images(
-                    images=images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                images_second = images
-            else:
-                images_second = self.second.augment_images(
-                    images=images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            images_first = images
-            images_second = images
+        # only augment the images with a branch if its result is actually visible
+        images_first, images_second = self._augment_branches(images, factors, "augment_images", parents, hooks)
 
         for i in sm.xrange(nb_images):
-            image = images[i]
-            image_first = images_first[i]
-            image_second = images_second[i]
-            rs_image = ia.new_random_state(seeds[i])
-            per_channel = self.per_channel.draw_sample(random_state=rs_image)
-            input_dtype = image.dtype
-            if per_channel == 1:
-                nb_channels = image.shape[2]
-                samples = self.factor.draw_samples((nb_channels,), random_state=rs_image)
-                for c, sample in enumerate(samples):
-                    ia.do_assert(0 <= sample <= 1.0)
-                    # if the value is nearly 1.0 or 0.0 skip the computation
-                    # and just use only the first/second image
-                    if sample >= 1.0 - self.epsilon:
-                        image[..., c] = image_first[..., c]
-                    elif sample <= 0.0 + self.epsilon:
-                        image[..., c] = image_second[..., c]
-                    else:
-                        image[..., c] = sample * image_first[..., c] + (1 - sample) * image_second[..., c]
-                # TODO change this to meta.clip_* and meta.restore_*
-                np.clip(image, 0, 255, out=image)
-                result[i] = image.astype(input_dtype)
-            else:
-                sample = self.factor.draw_sample(random_state=rs_image)
-                ia.do_assert(0 <= sample <= 1.0)
-                # if the value is nearly 1.0 or 0.0 skip the computation
-                # and just use only the first/second image
-                if sample >= 1.0 - self.epsilon:
-                    image = image_first
-                elif sample <= 0.0 + self.epsilon:
-                    image = image_second
-                else:
-                    image = sample * image_first + (1 - sample) * image_second
-                # TODO change this to meta.clip_* and meta.restore_*
-                np.clip(image, 0, 255, out=image)
-                result[i] = image.astype(input_dtype)
+            input_dtype = images[i].dtype
+            image = _blend_alpha_channelwise(images_first[i], images_second[i], factors[i], self.epsilon)
+            if image.dtype != input_dtype:
+                image = meta.clip_augmented_image_(image, 0, 255)
+                image = meta.restore_augmented_image_dtype_(image, input_dtype)
+            result[i] = image
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         result = heatmaps
         nb_heatmaps = len(heatmaps)
         seeds = random_state.randint(0, 10**6, (nb_heatmaps,))
+        # sample alphas channelwise if necessary and try to use the image's channel number
+        # values properly synchronized with the image augmentation
+        factors = self._draw_factors(seeds, [heatmaps_i.shape[2] if len(heatmaps_i.shape) >= 3 else 1
+                                             for heatmaps_i in heatmaps])
 
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                heatmaps_first = heatmaps
-            else:
-                heatmaps_first = self.first.augment_heatmaps(
-                    heatmaps,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                heatmaps_second = heatmaps
-            else:
-                heatmaps_second = self.second.augment_heatmaps(
-                    heatmaps,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            heatmaps_first = heatmaps
-            heatmaps_second = heatmaps
+        heatmaps_first, heatmaps_second = self._augment_branches(heatmaps, factors, "augment_heatmaps", parents, hooks)
 
         for i in sm.xrange(nb_heatmaps):
-            heatmaps_first_i = heatmaps_first[i]
-            heatmaps_second_i = heatmaps_second[i]
-            rs_image = ia.new_random_state(seeds[i])
-            # sample alphas channelwise if necessary and try to use the image's channel number
-            # values properly synchronized with the image augmentation
-            per_channel = self.per_channel.draw_sample(random_state=rs_image)
-            if per_channel == 1:
-                nb_channels = heatmaps[i].shape[2] if len(heatmaps[i].shape) >= 3 else 1
-                samples = self.factor.draw_samples((nb_channels,), random_state=rs_image)
-                sample = np.average(samples)
+            if np.average(factors[i]) >= 0.5:
+                result[i].arr_0to1 = heatmaps_first[i].arr_0to1
             else:
-                sample = self.factor.draw_sample(random_state=rs_image)
-                ia.do_assert(0 <= sample <= 1.0)
-
-            mask = sample >= 0.5
-            heatmaps_arr_aug = mask * heatmaps_first_i.arr_0to1 + (~mask) * heatmaps_second_i.arr_0to1
-
-            result[i].arr_0to1 = heatmaps_arr_aug
+                result[i].arr_0to1 = heatmaps_second[i].arr_0to1
 
         return result
 
@@ -270,57 +271,68 @@ class Alpha(Augmenter): # pylint: disable=locally-disabled, unused-variable, lin
         result = keypoints_on_images
         nb_images = len(keypoints_on_images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
+        # keypoint augmentation also works channel-wise, even though
+        # keypoints do not have channels, in order to keep the random
+        # values properly synchronized with the image augmentation
+        factors = self._draw_factors(seeds, [kps_oi.shape[2] if len(kps_oi.shape) >= 3 else 1
+                                             for kps_oi in keypoints_on_images])
 
-        if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                kps_ois_first = keypoints_on_images
-            else:
-                kps_ois_first = self.first.augment_keypoints(
-                    keypoints_on_images=keypoints_on_images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                kps_ois_second = keypoints_on_images
-            else:
-                kps_ois_second = self.second.augment_keypoints(
-                    keypoints_on_images=keypoints_on_images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            kps_ois_first = keypoints_on_images
-            kps_ois_second = keypoints_on_images
+        kps_ois_first, kps_ois_second = self._augment_branches(
+            keypoints_on_images, factors, "augment_keypoints", parents, hooks)
 
         for i in sm.xrange(nb_images):
-            kps_oi_first = kps_ois_first[i]
-            kps_oi_second = kps_ois_second[i]
-            rs_image = ia.new_random_state(seeds[i])
-            # keypoint augmentation also works channel-wise, even though
-            # keypoints do not have channels, in order to keep the random
-            # values properly synchronized with the image augmentation
-            per_channel = self.per_channel.draw_sample(random_state=rs_image)
-            if per_channel == 1:
-                nb_channels = keypoints_on_images[i].shape[2]
-                samples = self.factor.draw_samples((nb_channels,), random_state=rs_image)
-                sample = np.average(samples)
-            else:
-                sample = self.factor.draw_sample(random_state=rs_image)
-                ia.do_assert(0 <= sample <= 1.0)
-
             # We cant choose "just a bit" of one keypoint augmentation result
             # without messing up the positions (interpolation doesn't make much
             # sense here),
             # so if the alpha is >= 0.5 (branch A is more visible than
             # branch B), the result of branch A, otherwise branch B.
-            if sample >= 0.5:
-                result[i] = kps_oi_first
+            if np.average(factors[i]) >= 0.5:
+                result[i] = kps_ois_first[i]
             else:
-                result[i] = kps_oi_second
+                result[i] = kps_ois_second[i]
 
         return result
 
+    def _draw_factors(self, seeds, nb_channels):
+        # one factor per image or, if per_channel is active, one per channel
+        factors = []
+        for seed, nb_channels_i in zip(seeds, nb_channels):
+            rs_image = ia.new_random_state(seed)
+            per_channel = self.per_channel.draw_sample(random_state=rs_image)
+            if per_channel == 1:
+                samples = self.factor.draw_samples((nb_channels_i,), random_state=rs_image)
+            else:
+                samples = np.float64([self.factor.draw_sample(random_state=rs_image)])
+            ia.do_assert(np.all(0 <= samples) and np.all(samples <= 1.0))
+            factors.append(samples)
+        return factors
+
+    def _get_branches_used(self, factors):
+        # first/second branch results are only visible if the factors are not (nearly) 0.0/1.0,
+        # this rule also covers the >=0.5 decisions for heatmaps and keypoints, so that all
+        # of them are augmented with the same subsets of items
+        uses_first = [np.any(factors_i > 0.0 + self.epsilon) for factors_i in factors]
+        uses_second = [np.any(factors_i < 1.0 - self.epsilon) for factors_i in factors]
+        return uses_first, uses_second
+
+    def _augment_branches(self, items, factors, method_name, parents, hooks):
+        if not hooks.is_propagating(items, augmenter=self, parents=parents, default=True):
+            return items, items
+
+        uses_first, uses_second = self._get_branches_used(factors)
+        results = []
+        for children, uses in [(self.first, uses_first), (self.second, uses_second)]:
+            if children is None:
+                results.append(items)
+            else:
+                augment_func = getattr(children, method_name)
+                results.append(_augment_subset(
+                    lambda subset: augment_func(subset, parents=parents + [self], hooks=hooks),
+                    items,
+                    uses
+                ))
+        return results[0], results[1]
+
     def _to_deterministic(self):
         aug = self.copy()
         aug.first = aug.first.to_deterministic() if aug.first is not None else None
@@ -456,120 +468,54 @@ class AlphaElementwise(Alpha): # pylint: disable=locally-disabled, unused-variab
         result = images
         nb_images = len(images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
+        masks = [self._draw_factor_mask(image.shape[0], image.shape[1], image.shape[2], seed)
+                 for image, seed in zip(images, seeds)]
 
-        if hooks.is_propagating(images, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                images_first = images
-            else:
-                images_first = self.first.augment_images(
-                    images=images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                images_second = images
-            else:
-                images_second = self.second.augment_images(
-                    images=images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            images_first = images
-            images_second = images
+        # only augment the images with a branch if its result is actually visible
+        images_first, images_second = self._augment_branches(images, masks, "augment_images", parents, hooks)
 
         for i in sm.xrange(nb_images):
-            image = images[i]
-            h, w, nb_channels = image.shape[0:3]
-            image_first = images_first[i]
-            image_second = images_second[i]
-            per_channel = self.per_channel.draw_sample(random_state=ia.new_random_state(seeds[i]))
-            input_dtype = image.dtype
-            if per_channel == 1:
-                for c in sm.xrange(nb_channels):
-                    samples_c = self.factor.draw_samples((h, w), random_state=ia.new_random_state(seeds[i]+1+c))
-                    ia.do_assert(0 <= samples_c.item(0) <= 1.0) # validate only first value
-                    image[..., c] = samples_c * image_first[..., c] + (1.0 - samples_c) * image_second[..., c]
-                # TODO change this to meta.clip_* and meta.restore_*
-                np.clip(image, 0, 255, out=image)
-                result[i] = image.astype(input_dtype)
-            else:
-                samples = self.factor.draw_samples((h, w), random_state=ia.new_random_state(seeds[i]))
-                samples = np.tile(samples[..., np.newaxis], (1, 1, nb_channels))
-                ia.do_assert(0.0 <= samples.item(0) <= 1.0)
-
-                image = samples * image_first + (1.0 - samples) * image_second
-                # TODO change this to meta.clip_* and meta.restore_*
-                np.clip(image, 0, 255, out=image)
-                result[i] = image.astype(input_dtype)
+            input_dtype = images[i].dtype
+            image = _blend_alpha_elementwise(images_first[i], images_second[i], masks[i])
+            if image.dtype != input_dtype:
+                image = meta.clip_augmented_image_(image, 0, 255)
+                image = meta.restore_augmented_image_dtype_(image, input_dtype)
+            result[i] = image
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        def _sample_factor_mask(h_images, w_images, h_heatmaps, w_heatmaps, seed):
-            samples_c = self.factor.draw_samples((h_images, w_images), random_state=ia.new_random_state(seed))
-            ia.do_assert(0 <= samples_c.item(0) <= 1.0) # validate only first value
-
-            if (h_images, w_images) != (h_heatmaps, w_heatmaps):
-                samples_c = np.clip(samples_c * 255, 0, 255).astype(np.uint8)
-                samples_c = ia.imresize_single_image(samples_c, (h_heatmaps, w_heatmaps), interpolation="cubic")
-                samples_c = samples_c.astype(np.float32) / 255.0
-
-            return samples_c
-
         result = heatmaps
         nb_heatmaps = len(heatmaps)
         seeds = random_state.randint(0, 10**6, (nb_heatmaps,))
+        # We sample here at the same size as the original image, as some effects
+        # might not scale with image size. The sampled mask is then downscaled to the
+        # heatmap size.
+        masks = []
+        for heatmaps_i, seed in zip(heatmaps, seeds):
+            h_img, w_img = heatmaps_i.shape[0:2]
+            nb_channels_img = heatmaps_i.shape[2] if len(heatmaps_i.shape) >= 3 else 1
+            masks.append(self._draw_factor_mask(h_img, w_img, nb_channels_img, seed))
 
-        if hooks.is_propagating(heatmaps, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                heatmaps_first = heatmaps
-            else:
-                heatmaps_first = self.first.augment_heatmaps(
-                    heatmaps,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                heatmaps_second = heatmaps
-            else:
-                heatmaps_second = self.second.augment_heatmaps(
-                    heatmaps,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            heatmaps_first = heatmaps
-            heatmaps_second = heatmaps
+        heatmaps_first, heatmaps_second = self._augment_branches(heatmaps, masks, "augment_heatmaps", parents, hooks)
 
         for i in sm.xrange(nb_heatmaps):
-            heatmaps_i = heatmaps[i]
-            h_img, w_img = heatmaps_i.shape[0:2]
-            h_heatmaps, w_heatmaps = heatmaps_i.arr_0to1.shape[0:2]
-            nb_channels_img = heatmaps_i.shape[2] if len(heatmaps_i.shape) >= 3 else 1
-            nb_channels_heatmaps = heatmaps_i.arr_0to1.shape[2]
-            heatmaps_first_i = heatmaps_first[i]
-            heatmaps_second_i = heatmaps_second[i]
-            per_channel = self.per_channel.draw_sample(random_state=ia.new_random_state(seeds[i]))
-            if per_channel == 1:
-                samples = []
-                for c in sm.xrange(nb_channels_img):
-                    # We sample here at the same size as the original image, as some effects
-                    # might not scale with image size. We sampled mask is then downscaled to the
-                    # heatmap size.
-                    samples_c = _sample_factor_mask(h_img, w_img, h_heatmaps, w_heatmaps, seeds[i]+1+c)
-                    samples.append(samples_c[..., np.newaxis])
-                samples = np.concatenate(samples, axis=2)
-                samples_avg = np.average(samples, axis=2)
-                samples_tiled = np.tile(samples_avg[..., np.newaxis], (1, 1, nb_channels_heatmaps))
+            mask = masks[i]
+            if mask.ndim == 2:
+                mask = mask[..., np.newaxis]
+            h_heatmaps, w_heatmaps = heatmaps[i].arr_0to1.shape[0:2]
+            if mask.shape[0:2] != (h_heatmaps, w_heatmaps):
+                mask = np.concatenate([
+                    self._resize_factor_mask(mask[..., c], h_heatmaps, w_heatmaps)[..., np.newaxis]
+                    for c in sm.xrange(mask.shape[2])
+                ], axis=2)
+            mask = np.average(mask, axis=2)[..., np.newaxis] >= 0.5
+
+            if heatmaps_first[i] is None:
+                heatmaps_arr_aug = heatmaps_second[i].arr_0to1
+            elif heatmaps_second[i] is None:
+                heatmaps_arr_aug = heatmaps_first[i].arr_0to1
             else:
-                #samples = self.factor.draw_samples((h, w), random_state=ia.new_random_state(seeds[i]))
-                samples = _sample_factor_mask(h_img, w_img, h_heatmaps, w_heatmaps, seeds[i])
-                samples_tiled = np.tile(samples[..., np.newaxis], (1, 1, nb_channels_heatmaps))
-
-            mask = samples_tiled >= 0.5
-            heatmaps_arr_aug = mask * heatmaps_first_i.arr_0to1 + (~mask) * heatmaps_second_i.arr_0to1
+                heatmaps_arr_aug = mask * heatmaps_first[i].arr_0to1 + (~mask) * heatmaps_second[i].arr_0to1
 
             result[i].arr_0to1 = heatmaps_arr_aug
 
@@ -580,71 +526,63 @@ class AlphaElementwise(Alpha): # pylint: disable=locally-disabled, unused-variab
         nb_images = len(keypoints_on_images)
         seeds = random_state.randint(0, 10**6, (nb_images,))
 
-        if hooks.is_propagating(keypoints_on_images, augmenter=self, parents=parents, default=True):
-            if self.first is None:
-                kps_ois_first = keypoints_on_images
-            else:
-                kps_ois_first = self.first.augment_keypoints(
-                    keypoints_on_images=keypoints_on_images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-
-            if self.second is None:
-                kps_ois_second = keypoints_on_images
-            else:
-                kps_ois_second = self.second.augment_keypoints(
-                    keypoints_on_images=keypoints_on_images,
-                    parents=parents + [self],
-                    hooks=hooks
-                )
-        else:
-            kps_ois_first = keypoints_on_images
-            kps_ois_second = keypoints_on_images
-
-        # FIXME this is essentially the same behaviour as Alpha, requires inclusion of (x, y)
-        # coordinates to estimate new keypoint coordinates
-        for i in sm.xrange(nb_images):
-            kps_oi_first = kps_ois_first[i]
-            kps_oi_second = kps_ois_second[i]
-            #rs_image = ia.new_random_state(seeds[i])
+        # keypoint augmentation also works channel-wise, even though
+        # keypoints do not have channels, in order to keep the random
+        # values properly synchronized with the image augmentation
+        masks = []
+        for kps_oi, seed in zip(keypoints_on_images, seeds):
             ia.do_assert(
-                len(kps_oi_first.shape) == 3,
+                len(kps_oi.shape) == 3,
                 "Keypoint augmentation in AlphaElementwise requires " \
                 "KeypointsOnImage.shape to have channel information (i.e. " \
                 "tuple with 3 entries), which you did not provide (input " \
                 "shape: %s). The channels must match the corresponding " \
-                "image channels." % (kps_oi_first.shape,)
+                "image channels." % (kps_oi.shape,)
             )
-            h, w, nb_channels = kps_oi_first.shape[0:3]
+            h, w, nb_channels = kps_oi.shape[0:3]
+            masks.append(self._draw_factor_mask(h, w, nb_channels, seed))
 
-            # keypoint augmentation also works channel-wise, even though
-            # keypoints do not have channels, in order to keep the random
-            # values properly synchronized with the image augmentation
-            per_channel = self.per_channel.draw_sample(random_state=ia.new_random_state(seeds[i]))
-            if per_channel == 1:
-                #samples = self.factor.draw_samples((h, w, nb_channels,), random_state=rs_image)
-                samples = np.zeros((h, w, nb_channels), dtype=np.float32)
-                for c in sm.xrange(nb_channels):
-                    samples_c = self.factor.draw_samples((h, w), random_state=ia.new_random_state(seeds[i]+1+c))
-                    samples[:, :, c] = samples_c
-            else:
-                samples = self.factor.draw_samples((h, w), random_state=ia.new_random_state(seeds[i]))
-            ia.do_assert(0.0 <= samples.item(0) <= 1.0)
-            sample = np.average(samples)
+        kps_ois_first, kps_ois_second = self._augment_branches(
+            keypoints_on_images, masks, "augment_keypoints", parents, hooks)
 
+        # FIXME this is essentially the same behaviour as Alpha, requires inclusion of (x, y)
+        # coordinates to estimate new keypoint coordinates
+        for i in sm.xrange(nb_images):
             # We cant choose "just a bit" of one keypoint augmentation result
             # without messing up the positions (interpolation doesn't make much
             # sense here),
             # so if the alpha is >= 0.5 (branch A is more visible than
             # branch B), the result of branch A, otherwise branch B.
-            if sample >= 0.5:
-                result[i] = kps_oi_first
+            if np.average(masks[i]) >= 0.5:
+                result[i] = kps_ois_first[i]
             else:
-                result[i] = kps_oi_second
+                result[i] = kps_ois_second[i]
 
         return result
 
+    def _draw_factor_mask(self, height, width, nb_channels, seed):
+        per_channel = self.per_channel.draw_sample(random_state=ia.new_random_state(seed))
+        if per_channel == 1:
+            mask = np.zeros((height, width, nb_channels), dtype=np.float32)
+            for c in sm.xrange(nb_channels):
+                mask[..., c] = self.factor.draw_samples_seeded((height, width), seed+1+c)
+        else:
+            mask = self.factor.draw_samples_seeded((height, width), seed)
+            mask = mask.astype(np.float32)
+        ia.do_assert(0 <= mask.item(0) <= 1.0) # validate only first value
+        return mask
+
+    @classmethod
+    def _resize_factor_mask(cls, mask, height, width):
+        mask = np.clip(mask * 255, 0, 255).astype(np.uint8)
+        mask = ia.imresize_single_image(mask, (height, width), interpolation="cubic")
+        return mask.astype(np.float32) / 255.0
+
+    def _get_branches_used(self, masks):
+        uses_first = [np.any(mask > 0.0) for mask in masks]
+        uses_second = [np.any(mask < 1.0) for mask in masks]
+        return uses_first, uses_second
+
 def SimplexNoiseAlpha(first=None, second=None, per_channel=False,
                       size_px_max=(2, 16), upscale_method=None,
                       iterations=(1, 3), aggregation_method="max",
@@ -129,10 +129,16 @@ class Superpixels(Augmenter):
         #p_replace_samples = self.p_replace.draw_samples((nb_images,), random_state=random_state)
         n_segments_samples = self.n_segments.draw_samples((nb_images,), random_state=random_state)
         seeds = random_state.randint(0, 10**6, size=(nb_images,))
-        for i in sm.xrange(nb_images):
-            #replace_samples = ia.new_random_state(seeds[i]).binomial(1, p_replace_samples[i], size=(n_segments_samples[i],))
-            # TODO this results in an error when n_segments is 0
-            replace_samples = self.p_replace.draw_samples((n_segments_samples[i],), random_state=ia.new_random_state(seeds[i]))
+        #replace_samples = ia.new_random_state(seeds[i]).binomial(1, p_replace_samples[i], size=(n_segments_samples[i],))
+        # TODO this results in an error when n_segments is 0
+        # all samples are drawn before the images are distributed over threads (if any)
+        replace_samples_all = [
+            self.p_replace.draw_samples_seeded((n_segments_samples[i],), seeds[i])
+            for i in sm.xrange(nb_images)
+        ]
+
+        def _augment_image(i):
+            replace_samples = replace_samples_all[i]
             #print("n_segments", n_segments_samples[i], "replace_samples.shape", replace_samples.shape)
             #print("p", p_replace_samples[i])
             #print("replace_samples", replace_samples)
@@ -180,11 +186,17 @@ class Superpixels(Augmenter):
                     image_sp = ia.imresize_single_image(image_sp, orig_shape[0:2], interpolation=self.interpolation)
 
                 images[i] = image_sp
+
+        self._map_images(_augment_image, nb_images)
+
         return images
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
         return heatmaps
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return segmaps
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         return keypoints_on_images
 
@@ -287,21 +287,32 @@ class Scale(Augmenter):
             raise Exception("Expected int or string or iterable or StochasticParameter, got %s." % (type(interpolation),))
 
     def _augment_images(self, images, random_state, parents, hooks):
-        result = []
         nb_images = len(images)
         samples_h, samples_w, samples_ip = self._draw_samples(nb_images, random_state, do_sample_ip=True)
+
+        # Group the images by target size and interpolation, so that each group can be resized
+        # with a single call and its results be written directly into the output.
+        groups = dict()
+        sizes = []
         for i in sm.xrange(nb_images):
             image = images[i]
             ia.do_assert(image.dtype == np.uint8, "Scale() can currently only process images of dtype uint8 (got %s)" % (image.dtype,))
-            sample_h, sample_w, sample_ip = samples_h[i], samples_w[i], samples_ip[i]
-            h, w = self._compute_height_width(image.shape, sample_h, sample_w)
-            image_rs = ia.imresize_single_image(image, (h, w), interpolation=sample_ip)
-            result.append(image_rs)
+            h, w = self._compute_height_width(image.shape, samples_h[i], samples_w[i])
+            sizes.append((h, w))
+            groups.setdefault((h, w, samples_ip[i]), []).append(i)
+
+        if len(groups) == 1 and not isinstance(images, list):
+            (h, w, sample_ip), _indices = list(groups.items())[0]
+            return ia.imresize_many_images(images, (h, w), interpolation=sample_ip, nb_workers=self.nb_workers)
+        elif not isinstance(images, list) and len(set(sizes)) == 1:
+            result = np.empty((nb_images,) + sizes[0] + images.shape[3:], dtype=np.uint8)
+        else:
+            result = [None] * nb_images
 
-        if not isinstance(images, list):
-            all_same_size = (len(set([image.shape for image in result])) == 1)
-            if all_same_size:
-                result = np.array(result, dtype=np.uint8)
+        for (h, w, sample_ip), indices in groups.items():
+            images_rs = ia.imresize_many_images([images[i] for i in indices], (h, w), interpolation=sample_ip, nb_workers=self.nb_workers)
+            for i, image_rs in zip(indices, images_rs):
+                result[i] = image_rs
 
         return result
 
@@ -314,11 +325,26 @@ class Scale(Augmenter):
             sample_h, sample_w, sample_ip = samples_h[i], samples_w[i], samples_ip[i]
             h, w = self._compute_height_width(heatmaps_i.arr_0to1.shape, sample_h, sample_w)
             heatmaps_i_scaled = heatmaps_i.scale((h, w), interpolation=sample_ip)
-            heatmaps_i_scaled.shape = (sample_h, sample_w) + heatmaps_i.shape[2:]
+            heatmaps_i_scaled.shape = self._compute_height_width(heatmaps_i.shape, sample_h, sample_w) + tuple(heatmaps_i.shape[2:])
             result.append(heatmaps_i_scaled)
 
         return result
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        result = []
+        nb_segmaps = len(segmaps)
+        samples_h, samples_w, _samples_ip = self._draw_samples(nb_segmaps, random_state, do_sample_ip=True)
+        for i in sm.xrange(nb_segmaps):
+            segmap = segmaps[i]
+            sample_h, sample_w = samples_h[i], samples_w[i]
+            h, w = self._compute_height_width(segmap.arr_int.shape, sample_h, sample_w)
+            # class ids are always scaled with nearest neighbour interpolation
+            segmap_scaled = segmap.scale((h, w))
+            segmap_scaled.shape = self._compute_height_width(segmap.shape, sample_h, sample_w) + tuple(segmap.shape[2:])
+            result.append(segmap_scaled)
+
+        return result
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         result = []
         nb_images = len(keypoints_on_images)
@@ -337,13 +363,13 @@ class Scale(Augmenter):
     def _draw_samples(self, nb_images, random_state, do_sample_ip=True):
         seed = random_state.randint(0, 10**6, 1)[0]
         if isinstance(self.size, tuple):
-            samples_h = self.size[0].draw_samples(nb_images, random_state=ia.new_random_state(seed + 0))
-            samples_w = self.size[1].draw_samples(nb_images, random_state=ia.new_random_state(seed + 1))
+            samples_h = self.size[0].draw_samples_seeded(nb_images, seed + 0)
+            samples_w = self.size[1].draw_samples_seeded(nb_images, seed + 1)
         else:
-            samples_h = self.size.draw_samples(nb_images, random_state=ia.new_random_state(seed + 0))
+            samples_h = self.size.draw_samples_seeded(nb_images, seed + 0)
             samples_w = samples_h
         if do_sample_ip:
-            samples_ip = self.interpolation.draw_samples(nb_images, random_state=ia.new_random_state(seed + 2))
+            samples_ip = self.interpolation.draw_samples_seeded(nb_images, seed + 2)
         else:
             samples_ip = None
         return samples_h, samples_w, samples_ip
@@ -671,24 +697,20 @@ class CropAndPad(Augmenter):
 
             image_cr = images[i][crop_top:height-crop_bottom, crop_left:width-crop_right, :]
 
-            if any([pad_top > 0, pad_right > 0, pad_bottom > 0, pad_left > 0]):
-                if image_cr.ndim == 2:
-                    pad_vals = ((pad_top, pad_bottom), (pad_left, pad_right))
-                else:
-                    pad_vals = ((pad_top, pad_bottom), (pad_left, pad_right), (0, 0))
-
-                if pad_mode == "constant":
-                    image_cr_pa = np.pad(image_cr, pad_vals, mode=pad_mode, constant_values=pad_cval)
-                elif pad_mode == "linear_ramp":
-                    image_cr_pa = np.pad(image_cr, pad_vals, mode=pad_mode, end_values=pad_cval)
-                else:
-                    image_cr_pa = np.pad(image_cr, pad_vals, mode=pad_mode)
+            if self.keep_size:
+                # pads and resizes in one step, without creating the padded intermediate image
+                image_cr_pa = ia.pad_and_resize(
+                    image_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode=pad_mode, cval=pad_cval, sizes=(height, width)
+                )
+            elif any([pad_top > 0, pad_right > 0, pad_bottom > 0, pad_left > 0]):
+                image_cr_pa = ia.pad(
+                    image_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode=pad_mode, cval=pad_cval
+                )
             else:
                 image_cr_pa = image_cr
 
-            if self.keep_size:
-                image_cr_pa = ia.imresize_single_image(image_cr_pa, (height, width))
-
             result.append(image_cr_pa)
 
         if ia.is_np_array(images):
@@ -706,54 +728,28 @@ class CropAndPad(Augmenter):
         seeds = random_state.randint(0, 10**6, (nb_heatmaps,))
         for i in sm.xrange(nb_heatmaps):
             seed = seeds[i]
-            height_image, width_image = heatmaps[i].shape[0:2]
             height_heatmaps, width_heatmaps = heatmaps[i].arr_0to1.shape[0:2]
-
-            vals = self._draw_samples_image(seed, height_image, width_image)
+            vals_image, vals_arr = self._draw_samples_map(seed, heatmaps[i].shape, heatmaps[i].arr_0to1.shape)
             crop_image_top, crop_image_right, crop_image_bottom, crop_image_left, \
-                pad_image_top, pad_image_right, pad_image_bottom, pad_image_left, \
-                _pad_mode, _pad_cval = vals
-
-            if (height_image, width_image) != (height_heatmaps, width_heatmaps):
-                crop_top = int(round(height_heatmaps * (crop_image_top/height_image)))
-                crop_right = int(round(width_heatmaps * (crop_image_right/width_image)))
-                crop_bottom = int(round(height_heatmaps * (crop_image_bottom/height_image)))
-                crop_left = int(round(width_heatmaps * (crop_image_left/width_image)))
-
-                crop_top, crop_right, crop_bottom, crop_left = _crop_prevent_zero_size(height_heatmaps, width_heatmaps, crop_top, crop_right, crop_bottom, crop_left)
-
-                pad_top = int(round(height_heatmaps * (pad_image_top/height_image)))
-                pad_right = int(round(width_heatmaps * (pad_image_right/width_image)))
-                pad_bottom = int(round(height_heatmaps * (pad_image_bottom/height_image)))
-                pad_left = int(round(width_heatmaps * (pad_image_left/width_image)))
-            else:
-                crop_top = crop_image_top
-                crop_right = crop_image_right
-                crop_bottom = crop_image_bottom
-                crop_left = crop_image_left
-
-                pad_top = pad_image_top
-                pad_right = pad_image_right
-                pad_bottom = pad_image_bottom
-                pad_left = pad_image_left
+                pad_image_top, pad_image_right, pad_image_bottom, pad_image_left = vals_image
+            crop_top, crop_right, crop_bottom, crop_left, \
+                pad_top, pad_right, pad_bottom, pad_left = vals_arr
 
             arr_cr = heatmaps[i].arr_0to1[crop_top:height_heatmaps-crop_bottom, crop_left:width_heatmaps-crop_right, :]
 
-            if any([pad_top > 0, pad_right > 0, pad_bottom > 0, pad_left > 0]):
-                if arr_cr.ndim == 2:
-                    pad_vals = ((pad_top, pad_bottom), (pad_left, pad_right))
-                else:
-                    pad_vals = ((pad_top, pad_bottom), (pad_left, pad_right), (0, 0))
-
-                arr_cr_pa = np.pad(arr_cr, pad_vals, mode="constant", constant_values=0)
-            else:
-                arr_cr_pa = arr_cr
-
-            heatmaps[i].arr_0to1 = arr_cr_pa
-
             if self.keep_size:
-                heatmaps[i] = heatmaps[i].scale((height_heatmaps, width_heatmaps))
+                arr_cr_pa = ia.pad_and_resize(
+                    arr_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode="constant", cval=0, sizes=(height_heatmaps, width_heatmaps), interpolation="cubic"
+                )
+                # cubic interpolation can lead to values outside of [0.0, 1.0],
+                # see HeatmapsOnImage.scale()
+                heatmaps[i].arr_0to1 = np.clip(arr_cr_pa, 0.0, 1.0)
             else:
+                heatmaps[i].arr_0to1 = ia.pad(
+                    arr_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode="constant", cval=0
+                )
                 heatmaps[i].shape = (
                     heatmaps[i].shape[0] - crop_image_top - crop_image_bottom + pad_image_top + pad_image_bottom,
                     heatmaps[i].shape[1] - crop_image_left - crop_image_right + pad_image_left + pad_image_right
@@ -763,6 +759,42 @@ class CropAndPad(Augmenter):
 
         return result
 
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        result = []
+        nb_segmaps = len(segmaps)
+        seeds = random_state.randint(0, 10**6, (nb_segmaps,))
+        for i in sm.xrange(nb_segmaps):
+            seed = seeds[i]
+            segmap = segmaps[i]
+            height_arr, width_arr = segmap.arr_int.shape[0:2]
+            vals_image, vals_arr = self._draw_samples_map(seed, segmap.shape, segmap.arr_int.shape)
+            crop_image_top, crop_image_right, crop_image_bottom, crop_image_left, \
+                pad_image_top, pad_image_right, pad_image_bottom, pad_image_left = vals_image
+            crop_top, crop_right, crop_bottom, crop_left, \
+                pad_top, pad_right, pad_bottom, pad_left = vals_arr
+
+            arr_cr = segmap.arr_int[crop_top:height_arr-crop_bottom, crop_left:width_arr-crop_right]
+
+            # class ids must not be interpolated, padded pixels are set to -1 (no class)
+            if self.keep_size:
+                segmap.arr_int = ia.pad_and_resize(
+                    arr_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode="constant", cval=-1, sizes=(height_arr, width_arr), interpolation="nearest"
+                )
+            else:
+                segmap.arr_int = ia.pad(
+                    arr_cr, top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
+                    mode="constant", cval=-1
+                )
+                segmap.shape = (
+                    segmap.shape[0] - crop_image_top - crop_image_bottom + pad_image_top + pad_image_bottom,
+                    segmap.shape[1] - crop_image_left - crop_image_right + pad_image_left + pad_image_right
+                ) + tuple(segmap.shape[2:])
+
+            result.append(segmap)
+
+        return result
+
     def _augment_keypoints(self, keypoints_on_images, random_state, parents, hooks):
         result = []
         nb_images = len(keypoints_on_images)
@@ -784,6 +816,46 @@ class CropAndPad(Augmenter):
 
         return result
 
+    def _draw_samples_map(self, seed, image_shape, arr_shape):
+        # Draws the crop and pad amounts of the image with the given shape and projects them
+        # onto a map array (heatmaps, segmentation map) of a potentially different size.
+        height_image, width_image = image_shape[0:2]
+        height_arr, width_arr = arr_shape[0:2]
+
+        vals = self._draw_samples_image(seed, height_image, width_image)
+        crop_image_top, crop_image_right, crop_image_bottom, crop_image_left, \
+            pad_image_top, pad_image_right, pad_image_bottom, pad_image_left, \
+            _pad_mode, _pad_cval = vals
+
+        if (height_image, width_image) != (height_arr, width_arr):
+            crop_top = int(round(height_arr * (crop_image_top/height_image)))
+            crop_right = int(round(width_arr * (crop_image_right/width_image)))
+            crop_bottom = int(round(height_arr * (crop_image_bottom/height_image)))
+            crop_left = int(round(width_arr * (crop_image_left/width_image)))
+
+            crop_top, crop_right, crop_bottom, crop_left = _crop_prevent_zero_size(height_arr, width_arr, crop_top, crop_right, crop_bottom, crop_left)
+
+            pad_top = int(round(height_arr * (pad_image_top/height_image)))
+            pad_right = int(round(width_arr * (pad_image_right/width_image)))
+            pad_bottom = int(round(height_arr * (pad_image_bottom/height_image)))
+            pad_left = int(round(width_arr * (pad_image_left/width_image)))
+        else:
+            crop_top = crop_image_top
+            crop_right = crop_image_right
+            crop_bottom = crop_image_bottom
+            crop_left = crop_image_left
+
+            pad_top = pad_image_top
+            pad_right = pad_image_right
+            pad_bottom = pad_image_bottom
+            pad_left = pad_image_left
+
+        vals_image = (crop_image_top, crop_image_right, crop_image_bottom, crop_image_left,
+                      pad_image_top, pad_image_right, pad_image_bottom, pad_image_left)
+        vals_arr = (crop_top, crop_right, crop_bottom, crop_left,
+                    pad_top, pad_right, pad_bottom, pad_left)
+        return vals_image, vals_arr
+
     def _draw_samples_image(self, seed, height, width):
         random_state = ia.new_random_state(seed)
 
@@ -1283,50 +1355,57 @@ class PadToFixedSize(Augmenter):
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        nb_images = len(heatmaps)
+        return self._augment_maps(heatmaps, "arr_0to1", 0, random_state)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        # padded pixels are set to -1 (no class)
+        return self._augment_maps(segmaps, "arr_int", -1, random_state)
+
+    def _augment_maps(self, maps, arr_attr, cval, random_state):
+        # Pads heatmaps or segmentation maps, whose arrays are stored in attribute arr_attr.
+        nb_images = len(maps)
         w, h = self.size
         pad_xs, pad_ys, _pad_modes, _pad_cvals = self._draw_samples(nb_images, random_state)
         for i in sm.xrange(nb_images):
-            height_image, width_image = heatmaps[i].shape[:2]
+            height_image, width_image = maps[i].shape[:2]
             pad_image_left, pad_image_right, pad_image_top, pad_image_bottom = self._calculate_paddings(h, w, height_image, width_image, pad_xs[i], pad_ys[i])
-            height_heatmaps, width_heatmaps = heatmaps[i].arr_0to1.shape[0:2]
+            height_arr, width_arr = getattr(maps[i], arr_attr).shape[0:2]
 
             # TODO for 30x30 padded to 32x32 with 15x15 heatmaps this results in paddings of 1 on
             # each side (assuming position=(0.5, 0.5)) giving 17x17 heatmaps when they should be
             # 16x16. Error is due to each side getting projected 0.5 padding which is rounded to 1.
             # This doesn't seem right.
-            if (height_image, width_image) != (height_heatmaps, width_heatmaps):
-                pad_top = int(round(height_heatmaps * (pad_image_top/height_image)))
-                pad_right = int(round(width_heatmaps * (pad_image_right/width_image)))
-                pad_bottom = int(round(height_heatmaps * (pad_image_bottom/height_image)))
-                pad_left = int(round(width_heatmaps * (pad_image_left/width_image)))
+            if (height_image, width_image) != (height_arr, width_arr):
+                pad_top = int(round(height_arr * (pad_image_top/height_image)))
+                pad_right = int(round(width_arr * (pad_image_right/width_image)))
+                pad_bottom = int(round(height_arr * (pad_image_bottom/height_image)))
+                pad_left = int(round(width_arr * (pad_image_left/width_image)))
             else:
                 pad_top = pad_image_top
                 pad_right = pad_image_right
                 pad_bottom = pad_image_bottom
                 pad_left = pad_image_left
 
-            heatmaps[i].arr_0to1 = ia.pad(
-                heatmaps[i].arr_0to1,
+            setattr(maps[i], arr_attr, ia.pad(
+                getattr(maps[i], arr_attr),
                 top=pad_top, right=pad_right, bottom=pad_bottom, left=pad_left,
-                mode="constant", cval=0
-            )
-            heatmaps[i].shape = (
+                mode="constant", cval=cval
+            ))
+            maps[i].shape = (
                 height_image + pad_image_top + pad_image_bottom,
                 width_image + pad_image_left + pad_image_right
-            ) + heatmaps[i].shape[2:]
-
+            ) + tuple(maps[i].shape[2:])
 
-        return heatmaps
+        return maps
 
     def _draw_samples(self, nb_images, random_state):
         seed = random_state.randint(0, 10**6, 1)[0]
 
-        pad_xs = self.position[0].draw_samples(nb_images, random_state=ia.new_random_state(seed + 0))
-        pad_ys = self.position[1].draw_samples(nb_images, random_state=ia.new_random_state(seed + 1))
+        pad_xs = self.position[0].draw_samples_seeded(nb_images, seed + 0)
+        pad_ys = self.position[1].draw_samples_seeded(nb_images, seed + 1)
 
-        pad_modes = self.pad_mode.draw_samples(nb_images, random_state=ia.new_random_state(seed + 2))
-        pad_cvals = self.pad_cval.draw_samples(nb_images, random_state=ia.new_random_state(seed + 3))
+        pad_modes = self.pad_mode.draw_samples_seeded(nb_images, seed + 2)
+        pad_cvals = self.pad_cval.draw_samples_seeded(nb_images, seed + 3)
         pad_cvals = np.clip(np.round(pad_cvals), 0, 255).astype(np.uint8)
 
         return pad_xs, pad_ys, pad_modes, pad_cvals
@@ -1453,14 +1532,21 @@ class CropToFixedSize(Augmenter):
         return result
 
     def _augment_heatmaps(self, heatmaps, random_state, parents, hooks):
-        nb_images = len(heatmaps)
+        return self._augment_maps(heatmaps, "arr_0to1", random_state)
+
+    def _augment_segmentation_maps(self, segmaps, random_state, parents, hooks):
+        return self._augment_maps(segmaps, "arr_int", random_state)
+
+    def _augment_maps(self, maps, arr_attr, random_state):
+        # Crops heatmaps or segmentation maps, whose arrays are stored in attribute arr_attr.
+        nb_images = len(maps)
         w, h = self.size
         offset_xs, offset_ys = self._draw_samples(nb_images, random_state)
         for i in sm.xrange(nb_images):
-            ih, iw = heatmaps[i].shape[:2]
+            ih, iw = maps[i].shape[:2]
 
-            height_image, width_image = heatmaps[i].shape[0:2]
-            height_heatmaps, width_heatmaps = heatmaps[i].arr_0to1.shape[0:2]
+            height_image, width_image = maps[i].shape[0:2]
+            height_arr, width_arr = getattr(maps[i], arr_attr).shape[0:2]
 
             crop_image_top, crop_image_bottom = 0, 0
             crop_image_left, crop_image_right = 0, 0
@@ -1473,33 +1559,34 @@ class CropToFixedSize(Augmenter):
                 crop_image_left = int(offset_xs[i] * (width_image - w))
                 crop_image_right = width_image - w - crop_image_left
 
-            if (height_image, width_image) != (height_heatmaps, width_heatmaps):
-                crop_top = int(round(height_heatmaps * (crop_image_top/height_image)))
-                crop_right = int(round(width_heatmaps * (crop_image_right/width_image)))
-                crop_bottom = int(round(height_heatmaps * (crop_image_bottom/height_image)))
-                crop_left = int(round(width_heatmaps * (crop_image_left/width_image)))
+            if (height_image, width_image) != (height_arr, width_arr):
+                crop_top = int(round(height_arr * (crop_image_top/height_image)))
+                crop_right = int(round(width_arr * (crop_image_right/width_image)))
+                crop_bottom = int(round(height_arr * (crop_image_bottom/height_image)))
+                crop_left = int(round(width_arr * (crop_image_left/width_image)))
 
                 # TODO add test for zero-size prevention
-                crop_top, crop_right, crop_bottom, crop_left = _crop_prevent_zero_size(height_heatmaps, width_heatmaps, crop_top, crop_right, crop_bottom, crop_left)
+                crop_top, crop_right, crop_bottom, crop_left = _crop_prevent_zero_size(height_arr, width_arr, crop_top, crop_right, crop_bottom, crop_left)
             else:
                 crop_top = crop_image_top
                 crop_right = crop_image_right
                 crop_bottom = crop_image_bottom
                 crop_left = crop_image_left
 
-            heatmaps[i].arr_0to1 = heatmaps[i].arr_0to1[crop_top:height_heatmaps-crop_bottom, crop_left:width_heatmaps-crop_right, :]
+            arr = getattr(maps[i], arr_attr)
+            setattr(maps[i], arr_attr, arr[crop_top:height_arr-crop_bottom, crop_left:width_arr-crop_right, ...])
 
-            heatmaps[i].shape = (
-                heatmaps[i].shape[0] - crop_image_top - crop_image_bottom,
-                heatmaps[i].shape[1] - crop_image_left - crop_image_right
-            ) + heatmaps[i].shape[2:]
+            maps[i].shape = (
+                maps[i].shape[0] - crop_image_top - crop_image_bottom,
+                maps[i].shape[1] - crop_image_left - crop_image_right
+            ) + tuple(maps[i].shape[2:])
 
-        return heatmaps
+        return maps
 
     def _draw_samples(self, nb_images, random_state):
         seed = random_state.randint(0, 10**6, 1)[0]
-        offset_xs = 1.0 - self.position[0].draw_samples(nb_images, random_state=ia.new_random_state(seed + 0))
-        offset_ys = 1.0 - self.position[1].draw_samples(nb_images, random_state=ia.new_random_state(seed + 1))
+        offset_xs = 1.0 - self.position[0].draw_samples_seeded(nb_images, seed + 0)
+        offset_ys = 1.0 - self.position[1].draw_samples_seeded(nb_images, seed + 1)
 
         return offset_xs, offset_ys
 
@@ -1,5 +1,6 @@
 from __future__ import print_function, division, absolute_import
 import random
+import atexit
 import numpy as np
 import copy
 import numbers
@@ -8,6 +9,7 @@ import math
 import imageio
 import scipy.spatial.distance
 import multiprocessing
+import multiprocessing.pool
 import threading
 import traceback
 import sys
@@ -19,6 +21,9 @@ import skimage.measure
 import collections
 import time
 import json
+import importlib
+import types
+import warnings
 import matplotlib.pyplot as plt
 
 if sys.version_info[0] == 2:
@@ -49,6 +54,25 @@ DEFAULT_FONT_FP = os.path.join(
 # here (and in all augmenters) instead of np.random.
 CURRENT_RANDOM_STATE = np.random.RandomState(42)
 
+# Padding modes of numpy.pad() that have an equivalent border mode in cv2.
+_PAD_MODE_TO_CV2_BORDER = {
+    "constant": cv2.BORDER_CONSTANT,
+    "edge": cv2.BORDER_REPLICATE,
+    "reflect": cv2.BORDER_REFLECT_101,
+    "symmetric": cv2.BORDER_REFLECT,
+    "wrap": cv2.BORDER_WRAP
+}
+
+# Thread pools used for parallelized operations, such as in imresize_many_images().
+# Maps number of threads to pool. The pools belong to the process with id _THREAD_POOLS_PID.
+_THREAD_POOLS = dict()
+_THREAD_POOLS_LOCK = threading.Lock()
+_THREAD_POOLS_PID = [os.getpid()]
+
+# Lookup tables of matplotlib color maps, used to render heatmaps.
+# Maps color map name to a (256, 3) uint8 array with one RGB color per heatmap value.
+_COLORMAP_LUTS = dict()
+
 def is_np_array(val):
     """
     Checks whether a variable is a numpy array.
@@ -384,9 +408,285 @@ def forward_random_state(random_state):
     """
     random_state.uniform()
 
-# TODO
-# def from_json(json_str):
-#    pass
+def derive_sample_seed(seed, epoch, sample_index):
+    """
+    Derive the seed of a single sample from a global seed, an epoch and the sample's index.
+
+    This is a counter-based generator, i.e. the result is a pure function of the three
+    inputs and does not depend on any random state. Hence, it returns the same value in
+    any process and on any machine, no matter in which order samples are processed.
+    See `Augmenter.augment_indexed_batch()` for its main use case.
+
+    Parameters
+    ----------
+    seed : int
+        Global seed, e.g. of a training run.
+
+    epoch : int
+        Index of the epoch.
+
+    sample_index : int
+        Index of the sample within the dataset.
+
+    Returns
+    -------
+    sample_seed : int
+        Seed in the interval ``[0, 2**32)``, which can be used for np.random.RandomState.
+
+    """
+    value = _mix_seed(int(seed))
+    value = _mix_seed(value ^ int(epoch))
+    value = _mix_seed(value ^ int(sample_index))
+    return int(value >> 32)
+
+
+_UINT64_MASK = 2**64 - 1
+
+
+def _mix_seed(value):
+    # one step of the SplitMix64 generator, see Steele et al., "Fast splittable
+    # pseudorandom number generators", 2014
+    value = (value + 0x9E3779B97F4A7C15) & _UINT64_MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _UINT64_MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _UINT64_MASK
+    return value ^ (value >> 31)
+
+def to_config(obj):
+    """
+    Convert an augmenter, a stochastic parameter or any other imgaug object to a config.
+
+    The config is a declarative description of the object that consists only of dicts,
+    lists, strings, numbers, bools and None. It can be turned into a JSON string via
+    ``json.dumps()`` and back into an equivalent object via `from_config()`.
+
+    In contrast to pickling, random states are not saved with their full internal state.
+    Instead, a seed is derived from each random state (without changing that random state)
+    and saved. The rebuilt object will therefore produce different random samples than
+    the original one unless it is reseeded. Random states that are shared between objects
+    (e.g. imgaug's global random state) stay shared after rebuilding.
+
+    Functions and classes (e.g. the functions of a `Lambda` augmenter) are saved as
+    references of the form ``module:name`` and must hence be importable. Lambda functions,
+    nested functions and closures can not be converted.
+
+    Parameters
+    ----------
+    obj : object
+        The object to convert, usually an Augmenter or StochasticParameter.
+
+    Returns
+    -------
+    config : dict
+        The config of the object.
+
+    """
+    return _ConfigEncoder().encode_root(obj)
+
+
+def from_config(config):
+    """
+    Create an object from a config that was generated via `to_config()`.
+
+    Only classes within the imgaug package are instantiated. Functions are however
+    imported from any module that they refer to, so the config should originate from
+    a trusted source.
+
+    Parameters
+    ----------
+    config : dict
+        The config of the object.
+
+    Returns
+    -------
+    obj : object
+        The rebuilt object.
+
+    """
+    return _ConfigDecoder(config).decode_root()
+
+
+def from_json(json_str):
+    """
+    Create an object from a JSON string that was generated via ``to_json()``.
+
+    See `from_config()` for details.
+
+    Parameters
+    ----------
+    json_str : string
+        A config in JSON format, e.g. generated via `Augmenter.to_json()`.
+
+    Returns
+    -------
+    obj : object
+        The rebuilt object.
+
+    """
+    return from_config(json.loads(json_str, object_pairs_hook=collections.OrderedDict))
+
+
+_CONFIG_VERSION = 1
+
+
+def _get_reference_name(obj):
+    module_name = getattr(obj, "__module__", None)
+    name = getattr(obj, "__qualname__", getattr(obj, "__name__", None))
+    if module_name is None or name is None or "<" in name:
+        raise Exception(
+            "Could not convert %s to a config, as it can not be imported by name. Only module-level "
+            "functions and classes are supported, lambda functions and closures are not." % (obj,)
+        )
+    reference = "%s:%s" % (module_name, name)
+    if _resolve_reference(reference) is not obj:
+        raise Exception("Could not convert %s to a config, as '%s' refers to a different object." % (obj, reference))
+    return reference
+
+
+def _resolve_reference(reference):
+    module_name, name = reference.split(":")
+    obj = importlib.import_module(module_name)
+    for attr_name in name.split("."):
+        obj = getattr(obj, attr_name)
+    return obj
+
+
+class _ConfigEncoder(object):
+    def __init__(self):
+        self.object_ids = dict()
+        self.random_state_ids = dict()
+        self.seeds = []
+        # keeps encoded objects alive, so that their ids are not reused during the encoding
+        self.encoded = []
+
+    def encode_root(self, obj):
+        root = self.encode(obj)
+        return {"version": _CONFIG_VERSION, "random_state_seeds": self.seeds, "root": root}
+
+    def encode(self, obj):
+        if obj is None or isinstance(obj, (bool, six.string_types)):
+            return obj
+        elif type(obj) in [float] + list(six.integer_types):
+            return obj
+        elif isinstance(obj, np.generic):
+            return {"__scalar__": obj.item(), "dtype": obj.dtype.str}
+        elif isinstance(obj, list) and type(obj) is list:
+            return [self.encode(item) for item in obj]
+        elif type(obj) is tuple:
+            return {"__tuple__": [self.encode(item) for item in obj]}
+        elif type(obj) in [dict, collections.OrderedDict]:
+            return {"__dict__": [[self.encode(key), self.encode(value)] for key, value in obj.items()],
+                    "ordered": isinstance(obj, collections.OrderedDict)}
+        elif isinstance(obj, np.ndarray):
+            return {"__ndarray__": obj.tolist(), "dtype": obj.dtype.str, "shape": list(obj.shape)}
+        elif isinstance(obj, np.dtype):
+            return {"__dtype__": obj.str}
+        elif isinstance(obj, np.random.RandomState):
+            return {"__random_state__": self.encode_random_state(obj)}
+        elif isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            return {"__reference__": _get_reference_name(obj)}
+        elif isinstance(obj, types.MethodType) and getattr(obj, "__self__", None) is not None:
+            return {"__method__": obj.__name__, "object": self.encode(obj.__self__)}
+        elif type(obj).__module__.split(".")[0] == "imgaug":
+            return self.encode_object(obj)
+        else:
+            raise Exception("Could not convert object of type %s to a config." % (type(obj),))
+
+    def encode_random_state(self, random_state):
+        if random_state is current_random_state():
+            return "global"
+        key = id(random_state)
+        if key not in self.random_state_ids:
+            self.random_state_ids[key] = len(self.seeds)
+            self.seeds.append(int(copy_random_state(random_state, force_copy=True).randint(0, 10**6)))
+            self.encoded.append(random_state)
+        return self.random_state_ids[key]
+
+    def encode_object(self, obj):
+        key = id(obj)
+        if key in self.object_ids:
+            return {"__shared__": self.object_ids[key]}
+        self.object_ids[key] = len(self.object_ids)
+        self.encoded.append(obj)
+
+        getstate = getattr(obj, "__getstate__", None)
+        state = getstate() if getstate is not None else obj.__dict__
+        state = dict() if state is None else state
+        do_assert(isinstance(state, dict), "Expected state of %s to be a dict, got %s." % (type(obj), type(state)))
+
+        config = {
+            "__object__": _get_reference_name(type(obj)),
+            "state": [[key_i, self.encode(value)] for key_i, value in state.items()]
+        }
+        if isinstance(obj, list):
+            config["items"] = [self.encode(item) for item in obj]
+        return config
+
+
+class _ConfigDecoder(object):
+    def __init__(self, config):
+        do_assert(config.get("version") == _CONFIG_VERSION,
+                  "Unsupported config version %s, expected %d." % (config.get("version"), _CONFIG_VERSION))
+        self.config = config
+        self.objects = []
+        self.random_states = dict()
+
+    def decode_root(self):
+        return self.decode(self.config["root"])
+
+    def decode(self, config):
+        if isinstance(config, list):
+            return [self.decode(item) for item in config]
+        elif not isinstance(config, dict):
+            return config
+        elif "__object__" in config:
+            return self.decode_object(config)
+        elif "__shared__" in config:
+            return self.objects[config["__shared__"]]
+        elif "__scalar__" in config:
+            return np.dtype(config["dtype"]).type(config["__scalar__"])
+        elif "__tuple__" in config:
+            return tuple([self.decode(item) for item in config["__tuple__"]])
+        elif "__dict__" in config:
+            dict_cls = collections.OrderedDict if config["ordered"] else dict
+            return dict_cls([(self.decode(key), self.decode(value)) for key, value in config["__dict__"]])
+        elif "__ndarray__" in config:
+            arr = np.array(config["__ndarray__"], dtype=np.dtype(config["dtype"]))
+            return arr.reshape(config["shape"])
+        elif "__dtype__" in config:
+            return np.dtype(config["__dtype__"])
+        elif "__random_state__" in config:
+            return self.decode_random_state(config["__random_state__"])
+        elif "__reference__" in config:
+            return _resolve_reference(config["__reference__"])
+        elif "__method__" in config:
+            return getattr(self.decode(config["object"]), config["__method__"])
+        else:
+            raise Exception("Unknown entry in config: %s" % (config,))
+
+    def decode_random_state(self, random_state_id):
+        if random_state_id == "global":
+            return current_random_state()
+        if random_state_id not in self.random_states:
+            self.random_states[random_state_id] = new_random_state(self.config["random_state_seeds"][random_state_id])
+        return self.random_states[random_state_id]
+
+    def decode_object(self, config):
+        reference = config["__object__"]
+        do_assert(reference.split(".")[0] == "imgaug",
+                  "Expected only classes within imgaug in config, got '%s'." % (reference,))
+        cls = _resolve_reference(reference)
+        obj = cls.__new__(cls)
+        self.objects.append(obj)
+
+        if "items" in config:
+            list.extend(obj, [self.decode(item) for item in config["items"]])
+        state = dict([(key, self.decode(value)) for key, value in config["state"]])
+        setstate = getattr(obj, "__setstate__", None)
+        if setstate is not None:
+            setstate(state)
+        else:
+            obj.__dict__.update(state)
+        return obj
 
 def _quokka_normalize_extract(extract):
     """
@@ -801,15 +1101,17 @@ def draw_text(img, y, x, text, color=[0, 255, 0], size=25): # pylint: disable=lo
 
 
 # TODO rename sizes to size?
-def imresize_many_images(images, sizes=None, interpolation=None):
+def imresize_many_images(images, sizes=None, interpolation=None, nb_workers=1):
     """
     Resize many images to a specified size.
 
     Parameters
     ----------
-    images : (N,H,W,C) ndarray
+    images : (N,H,W,C) ndarray or list of (H,W,C) ndarray or list of (H,W) ndarray
         Array of the images to resize.
         Expected to usually be of dtype uint8.
+        If this is a list, the images may differ in their shapes. The target
+        size is then computed separately for each image.
 
     sizes : float or iterable of two ints or iterable of two floats
         The new size of the images, given either as a fraction (a single float) or as
@@ -836,10 +1138,16 @@ def imresize_many_images(images, sizes=None, interpolation=None):
         increases, area interpolation will be picked and for size decreases,
         linear interpolation will be picked.
 
+    nb_workers : int, optional(default=1)
+        Number of threads to use for resizing. If above 1, the images will be
+        distributed over a pool of threads. As cv2 releases the GIL while
+        resizing, this can speed up the resizing of large batches.
+
     Returns
     -------
-    result : (N,H',W',C) ndarray
-        Array of the resized images.
+    result : (N,H',W',C) ndarray or list of (H',W',C) ndarray or list of (H',W') ndarray
+        Array of the resized images. If the input was a list, the output
+        will also be a list.
 
     Examples
     --------
@@ -852,12 +1160,45 @@ def imresize_many_images(images, sizes=None, interpolation=None):
     >>> imresize_many_images(np.zeros((2, 16, 16, 3), dtype=np.uint8), (2.0, 4.0))
     Converts 2 RGB images of height and width 16 to images of height 32 and width 64.
 
+    >>> imresize_many_images([np.zeros((16, 16, 3), dtype=np.uint8), np.zeros((8, 32, 3), dtype=np.uint8)], 0.5)
+    Converts two RGB images of different shapes to images of height and width 8x8 and 4x16.
+
     """
-    shape = images.shape
-    do_assert(images.ndim == 4, "Expected array of shape (N, H, W, C), got shape %s" % (str(shape),))
-    nb_images = shape[0]
-    im_height, im_width = shape[1], shape[2]
-    nb_channels = shape[3]
+    do_assert(nb_workers >= 1)
+    if isinstance(images, list):
+        do_assert(all([image.ndim in [2, 3] for image in images]),
+                  "Expected list of arrays of shape (H, W) or (H, W, C), got shapes %s" % (
+                      str([image.shape for image in images]),))
+        result = []
+        for image in images:
+            height, width = _compute_resized_height_width(image.shape, sizes)
+            result.append(np.empty((height, width) + image.shape[2:], dtype=image.dtype))
+    else:
+        shape = images.shape
+        do_assert(images.ndim == 4, "Expected array of shape (N, H, W, C), got shape %s" % (str(shape),))
+        height, width = _compute_resized_height_width(shape[1:], sizes)
+        if height == shape[1] and width == shape[2]:
+            return np.copy(images)
+        result = np.empty((shape[0], height, width, shape[3]), dtype=images.dtype)
+
+    do_assert(interpolation is None or interpolation in [
+        "nearest", "linear", "area", "cubic",
+        cv2.INTER_NEAREST, cv2.INTER_LINEAR, cv2.INTER_AREA, cv2.INTER_CUBIC
+    ])
+
+    def _resize(img_idx):
+        _imresize_into(images[img_idx], result[img_idx], interpolation)
+
+    if nb_workers > 1 and len(images) > 1:
+        _get_thread_pool(nb_workers).map(_resize, sm.xrange(len(images)))
+    else:
+        for img_idx in sm.xrange(len(images)):
+            _resize(img_idx)
+    return result
+
+
+def _compute_resized_height_width(shape, sizes):
+    im_height, im_width = shape[0], shape[1]
     if is_single_float(sizes):
         do_assert(sizes > 0.0)
         height = int(round(im_height * sizes))
@@ -872,12 +1213,19 @@ def imresize_many_images(images, sizes=None, interpolation=None):
         else:
             height = int(round(im_height * sizes[0]))
             width = int(round(im_width * sizes[1]))
+    return height, width
+
 
+def _imresize_into(image, out, interpolation):
+    # Resizes a single (H,W) or (H,W,C) image and writes the result into the preallocated
+    # array out, which must already have the target height, width and the image's dtype.
+    im_height, im_width = image.shape[0:2]
+    height, width = out.shape[0:2]
     if height == im_height and width == im_width:
-        return np.copy(images)
+        out[...] = image
+        return
 
     ip = interpolation
-    do_assert(ip is None or ip in ["nearest", "linear", "area", "cubic", cv2.INTER_NEAREST, cv2.INTER_LINEAR, cv2.INTER_AREA, cv2.INTER_CUBIC])
     if ip is None:
         if height > im_height or width > im_width:
             ip = cv2.INTER_AREA
@@ -892,14 +1240,58 @@ def imresize_many_images(images, sizes=None, interpolation=None):
     else:  # if ip in ["cubic", cv2.INTER_CUBIC]:
         ip = cv2.INTER_CUBIC
 
-    result = np.zeros((nb_images, height, width, nb_channels), dtype=images.dtype)
-    for img_idx in sm.xrange(nb_images):
-        # TODO fallback to scipy here if image isn't uint8
-        result_img = cv2.resize(images[img_idx], (width, height), interpolation=ip)
-        if len(result_img.shape) == 2:
-            result_img = result_img[:, :, np.newaxis]
-        result[img_idx] = result_img.astype(images.dtype)
-    return result
+    # cv2 drops the channel axis of single-channel images, so the output slot is handed over
+    # without it. If cv2 can't write into the slot, it allocates a new array, which is then
+    # copied into the slot.
+    dst = out[:, :, 0] if out.ndim == 3 and out.shape[2] == 1 else out
+    # TODO fallback to scipy here if image isn't uint8
+    if _is_cv2_compatible(out):
+        result_img = cv2.resize(image, (width, height), dst=dst, interpolation=ip)
+    else:
+        result_img = cv2.resize(image, (width, height), interpolation=ip)
+    if result_img is not dst:
+        dst[...] = result_img.reshape(dst.shape)
+
+
+def _is_cv2_compatible(arr):
+    # Whether cv2 functions can read and write arrays of that dtype and number of channels.
+    dtype_supported = arr.dtype.type in [np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32, np.float64]
+    return dtype_supported and (arr.ndim == 2 or arr.shape[2] <= 512)
+
+
+def _is_cv2_border_equivalent(shape, top, right, bottom, left, mode):
+    # Whether cv2's border mode fills the padded areas in the same way as numpy.pad().
+    # numpy fills reflected or wrapped areas that are larger than the array iteratively, using
+    # the already padded values, which leads to different results than in cv2.
+    if mode in ["constant", "edge"]:
+        return True
+    return max(top, bottom) <= shape[0] and max(left, right) <= shape[1]
+
+
+def _get_thread_pool(nb_workers):
+    # Thread pools are shared between calls, as creating a pool for each batch would be
+    # comparatively slow.
+    with _THREAD_POOLS_LOCK:
+        # Pools that were inherited from a parent process via fork (e.g. in the workers of
+        # BackgroundAugmenter) have no running threads in this process and can't be used.
+        if _THREAD_POOLS_PID[0] != os.getpid():
+            _THREAD_POOLS.clear()
+            _THREAD_POOLS_PID[0] = os.getpid()
+        pool = _THREAD_POOLS.get(nb_workers)
+        if pool is None:
+            pool = multiprocessing.pool.ThreadPool(nb_workers)
+            _THREAD_POOLS[nb_workers] = pool
+            if len(_THREAD_POOLS) == 1:
+                atexit.register(_close_thread_pools)
+        return pool
+
+
+def _close_thread_pools():
+    with _THREAD_POOLS_LOCK:
+        if _THREAD_POOLS_PID[0] == os.getpid():
+            for pool in _THREAD_POOLS.values():
+                pool.terminate()
+        _THREAD_POOLS.clear()
 
 
 def imresize_single_image(image, sizes, interpolation=None):
@@ -936,11 +1328,65 @@ def imresize_single_image(image, sizes, interpolation=None):
         return rs[0, ...]
 
 
+def apply_lut(image, table):
+    """
+    Map the pixel values of a uint8 image via a lookup table.
+
+    Parameters
+    ----------
+    image : (H,W) ndarray or (H,W,C) ndarray
+        The image to map. Must have dtype uint8.
+
+    table : (256,) ndarray or (256,C) ndarray
+        The lookup table, containing the new value for each of the 256
+        possible pixel values. Either a single table that is used for all
+        channels or one table per channel (i.e. one per column).
+
+    Returns
+    -------
+    image_aug : (H,W) ndarray or (H,W,C) ndarray
+        The mapped image. Has the same shape as the input image and the same
+        dtype as the table.
+
+    Examples
+    --------
+    >>> table = 255 - np.arange(256).astype(np.uint8)
+    >>> image_inv = apply_lut(np.zeros((2, 2, 3), dtype=np.uint8), table)
+
+    Inverts an image.
+
+    """
+    do_assert(image.dtype.type == np.uint8, "Expected image with dtype uint8, got %s." % (image.dtype,))
+    do_assert(table.ndim in [1, 2] and table.shape[0] == 256, "Expected table of shape (256,) or (256, C), got %s." % (table.shape,))
+    nb_channels = image.shape[2] if image.ndim == 3 else 1
+    if table.ndim == 2:
+        do_assert(table.shape[1] == nb_channels, "Expected one table per channel (%d), got %d tables." % (nb_channels, table.shape[1]))
+        if nb_channels == 1:
+            table = table[:, 0]
+
+    # 512 is the maximum number of channels supported by cv2
+    if nb_channels <= 512:
+        if table.ndim == 2:
+            image_aug = cv2.LUT(image, table.reshape((1, 256, nb_channels)))
+        else:
+            image_aug = cv2.LUT(image, table)
+        # cv2 drops the channel axis for single-channel images
+        if image_aug.ndim != image.ndim:
+            image_aug = image_aug.reshape(image.shape)
+    elif table.ndim == 2:
+        image_aug = table[image, np.arange(nb_channels)]
+    else:
+        image_aug = table[image]
+    return image_aug
+
+
 def pad(arr, top=0, right=0, bottom=0, left=0, mode="constant", cval=0):
     """
     Pad an image-like array on its top/right/bottom/left side.
 
-    This function is a wrapper around `numpy.pad()`.
+    This function is a wrapper around `numpy.pad()`. For the modes "constant", "edge", "reflect",
+    "symmetric" and "wrap", the padding is performed via `cv2.copyMakeBorder()` instead (if cv2
+    supports the array's dtype), which produces the same results, but is significantly faster.
 
     Parameters
     ----------
@@ -981,6 +1427,25 @@ def pad(arr, top=0, right=0, bottom=0, left=0, mode="constant", cval=0):
     do_assert(bottom >= 0)
     do_assert(left >= 0)
     if top > 0 or right > 0 or bottom > 0 or left > 0:
+        nb_channels = 1 if arr.ndim == 2 else arr.shape[2]
+        use_cv2 = (
+            mode in _PAD_MODE_TO_CV2_BORDER
+            and _is_cv2_compatible(arr)
+            and _is_cv2_border_equivalent(arr.shape, top, right, bottom, left, mode)
+        )
+        if use_cv2:
+            if mode == "constant" and nb_channels > 4:
+                # cv2 only supports border values for up to four channels
+                arr_pad = np.full((arr.shape[0]+top+bottom, arr.shape[1]+left+right) + arr.shape[2:],
+                                  cval, dtype=arr.dtype)
+                arr_pad[top:top+arr.shape[0], left:left+arr.shape[1], ...] = arr
+                return arr_pad
+            arr_pad = cv2.copyMakeBorder(arr, top, bottom, left, right, _PAD_MODE_TO_CV2_BORDER[mode],
+                                         value=(float(cval),) * 4)
+            if arr_pad.ndim < arr.ndim:
+                arr_pad = arr_pad[..., np.newaxis]
+            return arr_pad
+
         paddings_np = [(top, bottom), (left, right)]  # paddings for 2d case
         if arr.ndim == 3:
             paddings_np.append((0, 0))  # add paddings for 3d case
@@ -995,6 +1460,109 @@ def pad(arr, top=0, right=0, bottom=0, left=0, mode="constant", cval=0):
     return np.copy(arr)
 
 
+def pad_and_resize(arr, top=0, right=0, bottom=0, left=0, mode="constant", cval=0, sizes=None,
+                   interpolation=None):
+    """
+    Pad an image-like array on its top/right/bottom/left side and resize the result.
+
+    The output is the same as `imresize_single_image(pad(arr, ...), sizes, ...)`. When
+    downscaling with linear interpolation, both steps are performed as a single
+    `cv2.warpAffine()` call, which avoids creating the padded intermediate array. That call
+    quantizes the sampling locations to 1/32 pixel, so values may then differ by up to 1/32 of
+    the difference between neighbouring pixels.
+
+    Parameters
+    ----------
+    arr : (H,W) or (H,W,C) ndarray
+        Image-like array to pad and resize.
+
+    top : int, optional(default=0)
+        See `pad()`.
+
+    right : int, optional(default=0)
+        See `pad()`.
+
+    bottom : int, optional(default=0)
+        See `pad()`.
+
+    left : int, optional(default=0)
+        See `pad()`.
+
+    mode : string, optional(default="constant")
+        See `pad()`.
+
+    cval : number, optional(default=0)
+        See `pad()`.
+
+    sizes : None or float or iterable of two ints or iterable of two floats, optional(default=None)
+        The size of the output array, relative to the padded array. See
+        `imresize_single_image()` for details. If None, the output array will have the same
+        height and width as `arr`.
+
+    interpolation : None or string or int, optional(default=None)
+        See `imresize_single_image()`.
+
+    Returns
+    -------
+    arr_pad_rs : (H',W') or (H',W',C) ndarray
+        Padded and resized array.
+
+    """
+    do_assert(arr.ndim in [2, 3])
+    height_pad = arr.shape[0] + top + bottom
+    width_pad = arr.shape[1] + left + right
+    if sizes is None:
+        height, width = arr.shape[0:2]
+    else:
+        height, width = _compute_resized_height_width((height_pad, width_pad), sizes)
+
+    if (height, width) == (height_pad, width_pad):
+        return pad(arr, top=top, right=right, bottom=bottom, left=left, mode=mode, cval=cval)
+
+    # same automatic choice as in imresize_many_images()
+    ip = interpolation
+    if ip is None:
+        ip = "area" if height > height_pad or width > width_pad else "linear"
+    # The warp may only be used if it never samples outside of the padded area, as
+    # cv2.resize() repeats the padded array's edge there, while the warp would fill these
+    # locations according to the border mode. That is only the case for linear interpolation
+    # and downscaling. (Cubic interpolation also reads one pixel beyond the edge, area
+    # interpolation isn't supported by cv2.warpAffine() and nearest neighbour interpolation picks
+    # different pixels than cv2.resize().) All other cases fall back to padding and resizing.
+    nb_channels = 1 if arr.ndim == 2 else arr.shape[2]
+    is_padded = top > 0 or right > 0 or bottom > 0 or left > 0
+    can_warp = (
+        is_padded
+        and ip in ["linear", cv2.INTER_LINEAR]
+        and height <= height_pad
+        and width <= width_pad
+        and mode in _PAD_MODE_TO_CV2_BORDER
+        and _is_cv2_compatible(arr)
+        and _is_cv2_border_equivalent(arr.shape, top, right, bottom, left, mode)
+        # cv2 supports border values only for up to four channels
+        and (mode != "constant" or nb_channels <= 4)
+    )
+    if not can_warp:
+        arr_pad = pad(arr, top=top, right=right, bottom=bottom, left=left, mode=mode, cval=cval) if is_padded else arr
+        return imresize_single_image(arr_pad, (height, width), interpolation=interpolation)
+
+    # Map each output pixel (center) back to the corresponding location in the padded array
+    # (same pixel center alignment as in cv2.resize()) and shift that location by the padding
+    # amounts to get the location in arr. Locations outside of arr are filled according to the
+    # border mode, i.e. in the same way as the padding would have filled them.
+    scale_y = height_pad / height
+    scale_x = width_pad / width
+    matrix = np.float64([
+        [scale_x, 0, 0.5 * scale_x - 0.5 - left],
+        [0, scale_y, 0.5 * scale_y - 0.5 - top]
+    ])
+    arr_pad_rs = cv2.warpAffine(arr, matrix, (width, height), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                borderMode=_PAD_MODE_TO_CV2_BORDER[mode], borderValue=(float(cval),) * 4)
+    if arr_pad_rs.ndim < arr.ndim:
+        arr_pad_rs = arr_pad_rs[..., np.newaxis]
+    return arr_pad_rs
+
+
 def compute_paddings_for_aspect_ratio(arr, aspect_ratio):
     """
     Compute the amount of pixels by which an array has to be padded to fulfill an aspect ratio.
@@ -1823,19 +2391,35 @@ class KeypointsOnImage(object):
         if copy:
             image = np.copy(image)
 
+        if len(self.keypoints) == 0:
+            return image
+
         height, width = image.shape[0:2]
 
-        for keypoint in self.keypoints:
-            y, x = keypoint.y_int, keypoint.x_int
-            if 0 <= y < height and 0 <= x < width:
-                x1 = max(x - size//2, 0)
-                x2 = min(x + 1 + size//2, width)
-                y1 = max(y - size//2, 0)
-                y2 = min(y + 1 + size//2, height)
-                image[y1:y2, x1:x2] = color
-            else:
-                if raise_if_out_of_image:
-                    raise Exception("Cannot draw keypoint x=%.8f, y=%.8f on image with shape %s." % (y, x, image.shape))
+        ys = np.int32([keypoint.y_int for keypoint in self.keypoints])
+        xs = np.int32([keypoint.x_int for keypoint in self.keypoints])
+        inside = np.logical_and(
+            np.logical_and(0 <= ys, ys < height),
+            np.logical_and(0 <= xs, xs < width)
+        )
+        if raise_if_out_of_image and not np.all(inside):
+            idx = np.argmin(inside)
+            raise Exception("Cannot draw keypoint x=%.8f, y=%.8f on image with shape %s." % (ys[idx], xs[idx], image.shape))
+        ys = ys[inside]
+        xs = xs[inside]
+
+        # Draw the squares of all keypoints with a single write. Each square is
+        # generated by adding the offsets of its pixels to its center, parts of
+        # squares outside of the image are dropped.
+        offsets = np.arange(-(size//2), size//2 + 1)
+        offsets_y, offsets_x = np.meshgrid(offsets, offsets, indexing="ij")
+        ys = (ys[:, np.newaxis] + offsets_y.flatten()[np.newaxis, :]).flatten()
+        xs = (xs[:, np.newaxis] + offsets_x.flatten()[np.newaxis, :]).flatten()
+        inside = np.logical_and(
+            np.logical_and(0 <= ys, ys < height),
+            np.logical_and(0 <= xs, xs < width)
+        )
+        image[ys[inside], xs[inside]] = color
 
         return image
 
@@ -2695,37 +3279,75 @@ class BoundingBox(object):
         if isinstance(color, (tuple, list)):
             color = np.uint8(color)
 
-        for i in range(thickness):
-            y1, y2, x1, x2 = self.y1_int, self.y2_int, self.x1_int, self.x2_int
-
-            # When y values get into the range (H-0.5, H), the *_int functions round them to H.
-            # That is technically sensible, but in the case of drawing means that the border lies
-            # just barely outside of the image, making the border disappear, even though the BB
-            # is fully inside the image. Here we correct for that because of beauty reasons.
-            # Same is the case for x coordinates.
-            if self.is_fully_within_image(image):
-                y1 = np.clip(y1, 0, image.shape[0]-1)
-                y2 = np.clip(y2, 0, image.shape[0]-1)
-                x1 = np.clip(x1, 0, image.shape[1]-1)
-                x2 = np.clip(x2, 0, image.shape[1]-1)
-
-            y = [y1-i, y1-i, y2+i, y2+i]
-            x = [x1-i, x2+i, x2+i, x1-i]
-            rr, cc = skimage.draw.polygon_perimeter(y, x, shape=result.shape)
+        for slice_y, slice_x in self._compute_border_slices(image.shape, thickness):
             if alpha >= 0.99:
-                result[rr, cc, :] = color
+                result[slice_y, slice_x, :] = color
+            elif is_float_array(result):
+                result[slice_y, slice_x, :] = (1 - alpha) * result[slice_y, slice_x, :] + alpha * color
             else:
-                if is_float_array(result):
-                    result[rr, cc, :] = (1 - alpha) * result[rr, cc, :] + alpha * color
-                    result = np.clip(result, 0, 255)
-                else:
-                    input_dtype = result.dtype
-                    result = result.astype(np.float32)
-                    result[rr, cc, :] = (1 - alpha) * result[rr, cc, :] + alpha * color
-                    result = np.clip(result, 0, 255).astype(input_dtype)
+                blended = (1 - alpha) * result[slice_y, slice_x, :].astype(np.float32) + alpha * color
+                result[slice_y, slice_x, :] = np.clip(blended.astype(np.float32), 0, 255).astype(result.dtype)
+
+        if alpha < 0.99 and thickness > 0 and is_float_array(result):
+            result = np.clip(result, 0, 255)
 
         return result
 
+    def _compute_border_slices(self, shape, thickness):
+        """
+        Compute the image areas covered by the border of this bounding box when drawn.
+
+        The border consists of `thickness` rectangle outlines, each one pixel further outside
+        than the previous one. Together they form four non-overlapping bands (top, bottom,
+        left, right), which allows to draw the border via slicing.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            Shape of the image onto which the border is drawn.
+
+        thickness : int
+            Thickness of the border in pixels.
+
+        Returns
+        -------
+        slices : list of tuple of slice
+            One ``(slice_y, slice_x)`` tuple per non-empty band within the image.
+
+        """
+        if thickness <= 0:
+            return []
+
+        height, width = shape[0:2]
+        y1, y2, x1, x2 = self.y1_int, self.y2_int, self.x1_int, self.x2_int
+
+        # When y values get into the range (H-0.5, H), the *_int functions round them to H.
+        # That is technically sensible, but in the case of drawing means that the border lies
+        # just barely outside of the image, making the border disappear, even though the BB
+        # is fully inside the image. Here we correct for that because of beauty reasons.
+        # Same is the case for x coordinates.
+        if self.is_fully_within_image(shape):
+            y1 = np.clip(y1, 0, height-1)
+            y2 = np.clip(y2, 0, height-1)
+            x1 = np.clip(x1, 0, width-1)
+            x2 = np.clip(x2, 0, width-1)
+
+        ext = thickness - 1
+        bands = [
+            (y1 - ext, y1 + 1, x1 - ext, x2 + ext + 1),  # top
+            (max(y2, y1 + 1), y2 + ext + 1, x1 - ext, x2 + ext + 1),  # bottom
+            (y1 + 1, y2, x1 - ext, x1 + 1),  # left
+            (y1 + 1, y2, max(x2, x1 + 1), x2 + ext + 1)  # right
+        ]
+
+        slices = []
+        for band_y1, band_y2, band_x1, band_x2 in bands:
+            band_y1, band_y2 = max(band_y1, 0), min(band_y2, height)
+            band_x1, band_x2 = max(band_x1, 0), min(band_x2, width)
+            if band_y1 < band_y2 and band_x1 < band_x2:
+                slices.append((slice(band_y1, band_y2), slice(band_x1, band_x2)))
+        return slices
+
     def extract_from_image(self, image):
         """
         Extract the image pixels within the bounding box.
@@ -2990,14 +3612,20 @@ class BoundingBoxesOnImage(object):
             Image with drawn bounding boxes.
 
         """
+        if raise_if_out_of_image:
+            for bb in self.bounding_boxes:
+                if bb.is_out_of_image(image):
+                    raise Exception("Cannot draw bounding box x1=%.8f, y1=%.8f, x2=%.8f, y2=%.8f on image with shape %s." % (bb.x1, bb.y1, bb.x2, bb.y2, image.shape))
+
+        # the image is copied (at most) once, all boxes are then drawn in-place
+        image = np.copy(image) if copy else image
         for bb in self.bounding_boxes:
             image = bb.draw_on_image(
                 image,
                 color=color,
                 alpha=alpha,
                 thickness=thickness,
-                copy=copy,
-                raise_if_out_of_image=raise_if_out_of_image
+                copy=False
             )
 
         return image
@@ -3098,6 +3726,39 @@ class BoundingBoxesOnImage(object):
         return "BoundingBoxesOnImage(%s, shape=%s)" % (str(self.bounding_boxes), self.shape)
 
 
+def _get_colormap_lut(cmap):
+    """
+    Get a lookup table that maps uint8 heatmap values to RGB colors of a color map.
+
+    Tables of named color maps are computed once and then cached.
+
+    Parameters
+    ----------
+    cmap : string or matplotlib.colors.Colormap or None
+        Color map of matplotlib. If None, the table maps each value to a gray color.
+
+    Returns
+    -------
+    lut : (256,3) ndarray(uint8)
+        RGB color for each of the 256 possible heatmap values.
+
+    """
+    is_named = isinstance(cmap, six.string_types)
+    if is_named and cmap in _COLORMAP_LUTS:
+        return _COLORMAP_LUTS[cmap]
+
+    values = np.arange(256).astype(np.float32) / 255.0
+    if cmap is not None:
+        lut = plt.get_cmap(cmap)(values)[:, 0:3]
+    else:
+        lut = np.tile(values[:, np.newaxis], (1, 3))
+    lut = np.clip(lut * 255, 0, 255).astype(np.uint8)
+
+    if is_named or cmap is None:
+        _COLORMAP_LUTS[cmap] = lut
+    return lut
+
+
 class HeatmapsOnImage(object):
     """
     Object representing heatmaps on images.
@@ -3206,6 +3867,7 @@ class HeatmapsOnImage(object):
         """
         heatmaps_uint8 = self.to_uint8()
         heatmaps_drawn = []
+        lut = _get_colormap_lut(cmap)
 
         for c in sm.xrange(heatmaps_uint8.shape[2]):
             # c:c+1 here, because the additional axis is needed by imresize_single_image
@@ -3216,18 +3878,12 @@ class HeatmapsOnImage(object):
                                                      interpolation="nearest")
             else:
                 heatmap_c_rs = heatmap_c
-            heatmap_c_rs = np.squeeze(heatmap_c_rs).astype(np.float32) / 255.0
-
-            if cmap is not None:
-                cmap_func = plt.get_cmap(cmap)
-                heatmap_cmapped = cmap_func(heatmap_c_rs)
-                heatmap_cmapped = np.delete(heatmap_cmapped, 3, 2)
-            else:
-                heatmap_cmapped = np.tile(heatmap_c_rs[..., np.newaxis], (1, 1, 3))
+            if heatmap_c_rs.ndim == 3:
+                heatmap_c_rs = heatmap_c_rs[..., 0]
 
-            heatmap_cmapped = np.clip(heatmap_cmapped * 255, 0, 255).astype(np.uint8)
-
-            heatmaps_drawn.append(heatmap_cmapped)
+            # the heatmap has only 256 possible values, so each value's color is computed once
+            # and then looked up for every pixel
+            heatmaps_drawn.append(lut[heatmap_c_rs])
         return heatmaps_drawn
 
     def draw_on_image(self, image, alpha=0.75, cmap="jet", resize="heatmaps"):
@@ -3634,6 +4290,16 @@ class SegmentationMapOnImage(object):
     DEFAULT_SEGMENT_COLORS : list of tuple of int
         Standard RGB colors to use during drawing, ordered by class index.
 
+    arr : (H,W,C) ndarray(float32)
+        The segmentation map as one float mask per class. If the map was created from an
+        integer array, this array is generated from `arr_int` upon the first access and then
+        replaces `arr_int` (which becomes None), so that in-place changes of it take effect.
+
+    arr_int : None or (H,W) ndarray(int32)
+        The segmentation map as class ids, if it was created from an integer array. Otherwise
+        None. The value -1 denotes locations that belong to no class, e.g. areas that were
+        added by padding. These are treated as background by `get_arr_int()`.
+
     Parameters
     ----------
     arr : (H,W) ndarray or (H,W,1) ndarray or (H,W,C) ndarray
@@ -3646,7 +4312,9 @@ class SegmentationMapOnImage(object):
             * If integer: Assumed to be of shape (H,W) or (H,W,1). Each pixel is assumed to
               contain an integer denoting the class index. Classes are assumed to be
               non-overlapping. The number of classes cannot be guessed from this input, hence
-              nb_classes must be set.
+              nb_classes must be set. The map is stored as an (H,W) array of class ids (see
+              attribute `arr_int`), i.e. no one-hot array with one channel per class is created
+              (unless `arr` or `to_heatmaps()` is used).
             * If float: Assumed to b eof shape (H,W), (H,W,1) or (H,W,C) with meanings being
               similar to the case of `bool`. Values are expected to fall always in the range
               0.0 to 1.0 and are usually expected to be either 0.0 or 1.0 upon instantiation
@@ -3723,14 +4391,19 @@ class SegmentationMapOnImage(object):
             do_assert(nb_classes is not None)
             do_assert(nb_classes > 0)
             do_assert(np.min(arr.flat[0:100]) >= 0)
-            do_assert(np.max(arr.flat[0:100]) <= nb_classes)
+            max_class_id = np.max(arr) if arr.size > 0 else 0
+            do_assert(max_class_id < nb_classes,
+                      "Expected class ids to be below nb_classes (%d), got %d." % (nb_classes, max_class_id))
             self.input_was = ("int", arr.dtype.type, arr.ndim)
             if arr.ndim == 3:
                 arr = arr[..., 0]
-            # TODO improve efficiency here by building only sub-heatmaps for classes actually
-            # present in the image. This would also get rid of nb_classes.
-            arr = np.eye(nb_classes)[arr]  # from class indices to one hot
-            arr = arr.astype(np.float32)
+            # Class id maps are stored as such, as a one-hot float array with one channel per
+            # class would usually be much larger. The one-hot form is only generated when needed.
+            self.arr_int = arr.astype(np.int32)
+            self._arr = None
+            self.shape = shape
+            self.nb_classes = nb_classes
+            return
         elif arr.dtype.type in [np.float16, np.float32]:
             do_assert(arr.ndim == 3)
             self.input_was = ("float", arr.dtype.type, arr.ndim)
@@ -3741,7 +4414,8 @@ class SegmentationMapOnImage(object):
                             "int8, int16, int32 or float32. Got type %s with dtype %s." % (type(arr), dt))
         do_assert(arr.ndim == 3)
         do_assert(arr.dtype.type == np.float32)
-        self.arr = arr
+        self.arr_int = None
+        self._arr = arr
         self.shape = shape
         self.nb_classes = nb_classes if nb_classes is not None else arr.shape[2]
 
@@ -3749,6 +4423,58 @@ class SegmentationMapOnImage(object):
     #def nb_classes(self):
     #    return self.arr.shape[2]
 
+    @property
+    def arr(self):
+        if self.arr_int is not None:
+            # The one-hot array can be changed in-place by the caller, which could not be
+            # reflected in the class ids. Hence it becomes the map's only representation.
+            self._arr = self._generate_arr_from_arr_int()
+            self.arr_int = None
+        return self._arr
+
+    @arr.setter
+    def arr(self, value):
+        self.arr_int = None
+        self._arr = value
+
+    @property
+    def arr_shape(self):
+        """
+        Get the shape of the segmentation map array, i.e. (H,W,C) with C being the number of classes.
+
+        This does not require to generate the array.
+
+        Returns
+        -------
+        shape : tuple of int
+            Shape of the array.
+
+        """
+        if self.arr_int is not None:
+            return self.arr_int.shape + (self.nb_classes,)
+        return self._arr.shape
+
+    def _generate_arr_from_arr_int(self):
+        # the additional last row of zeros is picked by class id -1 (no class)
+        eye = np.eye(self.nb_classes + 1, self.nb_classes, dtype=np.float32)
+        eye[-1, :] = 0
+        return eye[self.arr_int]
+
+    @staticmethod
+    def _warn_if_cval_is_ignored(mode, cval):
+        if mode == "constant" and cval != 0:
+            warnings.warn(
+                "Padding integer-based segmentation maps marks the padded areas as belonging to no "
+                "class (class id -1), got cval=%s, which is ignored." % (cval,)
+            )
+
+    def _copy_with_arr_int(self, arr_int, shape=None):
+        # Create a copy of this integer-based segmentation map with a new class id array.
+        segmap = copy.copy(self)
+        segmap.arr_int = arr_int
+        segmap.shape = shape if shape is not None else self.shape
+        return segmap
+
     def get_arr_int(self, background_threshold=0.01, background_class_id=None):
         """
         Get the segmentation map array as an integer array of shape (H, W).
@@ -3789,6 +4515,11 @@ class SegmentationMapOnImage(object):
         if background_class_id is None:
             background_class_id = 0
 
+        if self.arr_int is not None:
+            result = np.copy(self.arr_int)
+            result[result < 0] = background_class_id
+            return result
+
         channelwise_max_idx = np.argmax(self.arr, axis=2)
         # for bool and float input masks, we assume that the background is implicitly given,
         # i.e. anything where all masks/channels have zero-like values
@@ -3844,16 +4575,12 @@ class SegmentationMapOnImage(object):
         """
         arr = self.get_arr_int(background_threshold=background_threshold, background_class_id=background_class_id)
         nb_classes = 1 + np.max(arr)
-        segmap_drawn = np.zeros((arr.shape[0], arr.shape[1], 3), dtype=np.uint8)
         if colors is None:
             colors = SegmentationMapOnImage.DEFAULT_SEGMENT_COLORS
         do_assert(nb_classes <= len(colors), "Can't draw all %d classes as it would exceed the maximum number of %d available colors." % (nb_classes, len(colors),))
 
-        ids_in_map = np.unique(arr)
-        for c, color in zip(sm.xrange(nb_classes), colors):
-            if c in ids_in_map:
-                class_mask = (arr == c)
-                segmap_drawn[class_mask] = color
+        palette = np.array(colors[0:nb_classes], dtype=np.uint8).reshape((nb_classes, 3))
+        segmap_drawn = palette[arr]
 
         if return_foreground_mask:
             background_class_id = 0 if background_class_id is None else background_class_id
@@ -3919,7 +4646,7 @@ class SegmentationMapOnImage(object):
         do_assert(resize in ["segmentation_map", "image"])
 
         if resize == "image":
-            image = imresize_single_image(image, self.arr.shape[0:2], interpolation="cubic")
+            image = imresize_single_image(image, self.arr_shape[0:2], interpolation="cubic")
 
         segmap_drawn, foreground_mask = self.draw(
             background_threshold=background_threshold,
@@ -3970,9 +4697,13 @@ class SegmentationMapOnImage(object):
 
         mode : string, optional(default="constant")
             Padding mode to use. See `numpy.pad()` for details.
+            For integer-based segmentation maps, mode "constant" marks the padded areas as not
+            belonging to any class (class id -1), independent of `cval`.
 
         cval : number, optional(default=0.0)
             Value to use for padding if mode="constant". See `numpy.pad()` for details.
+            Ignored for integer-based segmentation maps, which emit a warning if a value other
+            than 0 is provided.
 
         Returns
         -------
@@ -3980,6 +4711,11 @@ class SegmentationMapOnImage(object):
             Padded segmentation map of height H'=H+top+bottom and width W'=W+left+right.
 
         """
+        if self.arr_int is not None:
+            self._warn_if_cval_is_ignored(mode, cval)
+            arr_int_padded = pad(self.arr_int, top=top, right=right, bottom=bottom, left=left, mode=mode, cval=-1)
+            return self._copy_with_arr_int(arr_int_padded)
+
         arr_padded = pad(self.arr, top=top, right=right, bottom=bottom, left=left, mode=mode, cval=cval)
         segmap = SegmentationMapOnImage(arr_padded, shape=self.shape)
         segmap.input_was = self.input_was
@@ -4004,6 +4740,7 @@ class SegmentationMapOnImage(object):
 
         cval : number, optional(default=0.0)
             Value to use for padding if mode="constant". See `numpy.pad()` for details.
+            Ignored for integer-based segmentation maps, see `SegmentationMapOnImage.pad()`.
 
         return_pad_amounts : bool, optional(default=False)
             If False, then only the padded image will be returned. If True, a tuple with two
@@ -4020,9 +4757,14 @@ class SegmentationMapOnImage(object):
             If return_pad_amounts is False, then only the segmentation map object is returned.
 
         """
-        arr_padded, pad_amounts = pad_to_aspect_ratio(self.arr, aspect_ratio=aspect_ratio, mode=mode, cval=cval, return_pad_amounts=True)
-        segmap = SegmentationMapOnImage(arr_padded, shape=self.shape)
-        segmap.input_was = self.input_was
+        if self.arr_int is not None:
+            self._warn_if_cval_is_ignored(mode, cval)
+            arr_int_padded, pad_amounts = pad_to_aspect_ratio(self.arr_int, aspect_ratio=aspect_ratio, mode=mode, cval=-1, return_pad_amounts=True)
+            segmap = self._copy_with_arr_int(arr_int_padded)
+        else:
+            arr_padded, pad_amounts = pad_to_aspect_ratio(self.arr, aspect_ratio=aspect_ratio, mode=mode, cval=cval, return_pad_amounts=True)
+            segmap = SegmentationMapOnImage(arr_padded, shape=self.shape)
+            segmap.input_was = self.input_was
         if return_pad_amounts:
             return segmap, pad_amounts
         else:
@@ -4041,7 +4783,9 @@ class SegmentationMapOnImage(object):
             The interpolation to use during resize. See `imresize_single_image()` for details.
             Note: The segmentation map is internally stored as multiple float-based heatmaps,
             making smooth interpolations potentially more reasonable than nearest neighbour
-            interpolation.
+            interpolation. Integer-based segmentation maps are always resized with nearest
+            neighbour interpolation. They emit a warning if any interpolation other than
+            the default or nearest neighbour is requested.
 
         Returns
         -------
@@ -4049,6 +4793,15 @@ class SegmentationMapOnImage(object):
             Rescaled segmentation map object.
 
         """
+        if self.arr_int is not None:
+            if interpolation not in ["cubic", "nearest", cv2.INTER_NEAREST]:
+                warnings.warn(
+                    "Integer-based segmentation maps are always scaled with nearest neighbour "
+                    "interpolation, got interpolation=%s, which is ignored." % (interpolation,)
+                )
+            arr_int_rescaled = imresize_single_image(self.arr_int, sizes, interpolation="nearest")
+            return self._copy_with_arr_int(arr_int_rescaled)
+
         arr_rescaled = imresize_single_image(self.arr, sizes, interpolation=interpolation)
 
         # cubic interpolation can lead to values outside of [0.0, 1.0],
@@ -4089,7 +4842,18 @@ class SegmentationMapOnImage(object):
 
         """
         if not only_nonempty:
-            return HeatmapsOnImage.from_0to1(self.arr, self.shape, min_value=0.0, max_value=1.0)
+            arr = self._generate_arr_from_arr_int() if self.arr_int is not None else self.arr
+            return HeatmapsOnImage.from_0to1(arr, self.shape, min_value=0.0, max_value=1.0)
+        elif self.arr_int is not None:
+            # generate only the channels of the classes that actually appear in the map
+            class_indices = np.unique(self.arr_int)
+            class_indices = class_indices[class_indices >= 0]
+            if len(class_indices) == 0:
+                if not not_none_if_no_nonempty:
+                    return None, []
+                class_indices = np.int32([0])
+            channels = (self.arr_int[..., np.newaxis] == class_indices).astype(np.float32)
+            return HeatmapsOnImage(channels, self.shape, min_value=0.0, max_value=1.0), class_indices
         else:
             nonempty_mask = np.sum(self.arr, axis=(0, 1)) > 0 + 1e-4
             if np.sum(nonempty_mask) == 0:
@@ -4168,6 +4932,8 @@ class SegmentationMapOnImage(object):
             Deep copy.
 
         """
+        if self.arr_int is not None:
+            return self._copy_with_arr_int(np.copy(self.arr_int))
         segmap = SegmentationMapOnImage(self.arr, shape=self.shape, nb_classes=self.nb_classes)
         segmap.input_was = self.input_was
         return segmap
@@ -4322,7 +5088,7 @@ class BatchLoader(object):
 
     def _load_batches(self, load_batch_func, queue, finished_signal, join_signal, seedval):
         if seedval is not None:
-            random.seed(seedval)
+            random.seed(int(seedval))
             np.random.seed(seedval)
             seed(seedval)
 
@@ -4391,6 +5157,153 @@ class BatchLoader(object):
         self.queue.close()
 
 
+class FileBatchLoader(BatchLoader):
+    """
+    Class to load batches of images from files in the background.
+
+    The images are read and decoded in batches. For each batch, the raw
+    bytes of all files are read first and then decoded with `cv2.imdecode`
+    on a pool of threads. The decoded images are converted to RGB and put
+    as `Batch` objects into the queue, which can then be fed into a
+    `BackgroundAugmenter`. The filepaths of the images are saved in
+    `Batch.data`, as batches may arrive in a different order than the
+    filepaths when multiple workers are used.
+
+    Loaded batches can be accessed using `FileBatchLoader.queue`.
+
+    Parameters
+    ----------
+    filepaths : list of string
+        Paths to the image files to load, in any format supported by cv2.
+
+    batch_size : int
+        Number of images per batch. The last batch may contain fewer images.
+
+    reduce_factor : int, optional(default=1)
+        Factor by which to reduce the height and width of the images while
+        decoding. One of 1, 2, 4 or 8. Values above 1 are significantly faster
+        than decoding at full size and downscaling afterwards (especially for
+        JPEGs) and should be used if the augmentation pipeline starts with a
+        downscaling step anyways.
+
+    grayscale : bool, optional(default=False)
+        Whether to load the images as grayscale images of shape (H, W, 1)
+        instead of RGB images of shape (H, W, 3).
+
+    queue_size : int, optional(default=50)
+        Maximum number of batches to store in the queue, i.e. how many batches
+        may be loaded in advance.
+
+    nb_workers : int, optional(default=1)
+        Number of workers that load batches in parallel. Each worker loads
+        different batches.
+
+    nb_decode_workers : int or "auto", optional(default="auto")
+        Number of threads that each worker uses to decode the images of a
+        batch. If "auto", the number of CPU cores will be used.
+
+    threaded : bool, optional(default=True)
+        Whether to run the workers as threads (True) or as processes (False).
+
+    Examples
+    --------
+    >>> filepaths = ["/path/to/image%05d.jpg" % (i,) for i in range(10000)]
+    >>> loader = FileBatchLoader(filepaths, batch_size=32, reduce_factor=2)
+    >>> bg_augmenter = BackgroundAugmenter(loader, augseq)
+    >>> batch = bg_augmenter.get_batch()
+
+    Loads the images in batches of 32 at half the original height and width
+    and augments them in the background.
+
+    """
+    REDUCE_FACTOR_TO_CV2_FLAGS = {
+        (1, False): cv2.IMREAD_COLOR,
+        (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+        (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+        (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+        (1, True): cv2.IMREAD_GRAYSCALE,
+        (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8
+    }
+
+    def __init__(self, filepaths, batch_size, reduce_factor=1, grayscale=False, queue_size=50, nb_workers=1,
+                 nb_decode_workers="auto", threaded=True):
+        do_assert(batch_size >= 1)
+        do_assert(reduce_factor in [1, 2, 4, 8], "Expected reduce_factor to be 1, 2, 4 or 8, got %s." % (reduce_factor,))
+        if nb_decode_workers == "auto":
+            nb_decode_workers = multiprocessing.cpu_count()
+        do_assert(is_single_integer(nb_decode_workers) and nb_decode_workers >= 1,
+                  "Expected nb_decode_workers to be \"auto\" or an int >= 1, got %s." % (nb_decode_workers,))
+
+        self.filepaths = list(filepaths)
+        self.batch_size = batch_size
+        self.nb_batches = int(np.ceil(len(self.filepaths) / batch_size))
+        self.cv2_flags = self.REDUCE_FACTOR_TO_CV2_FLAGS[(reduce_factor, grayscale)]
+        self.nb_decode_workers = nb_decode_workers
+        # index of the next batch to load, shared by all workers (also if they are processes)
+        self._next_batch_idx = multiprocessing.Value("i", 0)
+
+        super(FileBatchLoader, self).__init__(self._generate_batches, queue_size=queue_size, nb_workers=nb_workers,
+                                              threaded=threaded)
+
+    def _generate_batches(self):
+        while True:
+            with self._next_batch_idx.get_lock():
+                batch_idx = self._next_batch_idx.value
+                self._next_batch_idx.value += 1
+            if batch_idx >= self.nb_batches:
+                return
+            filepaths = self.filepaths[batch_idx*self.batch_size:(batch_idx+1)*self.batch_size]
+            yield Batch(images=self.load_images(filepaths), data=filepaths)
+
+    def load_images(self, filepaths):
+        """
+        Read and decode images.
+
+        Parameters
+        ----------
+        filepaths : list of string
+            Paths to the image files.
+
+        Returns
+        -------
+        images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+            The decoded images with dtype uint8. An array if all images have
+            the same shape, otherwise a list.
+
+        """
+        # the files are read one after another, which is usually the fastest access pattern for
+        # disks, while the decoding releases the GIL and can hence use multiple threads
+        buffers = []
+        for filepath in filepaths:
+            with open(filepath, "rb") as f:
+                buffers.append(np.frombuffer(f.read(), dtype=np.uint8))
+
+        def _decode(idx):
+            image = cv2.imdecode(buffers[idx], self.cv2_flags)
+            do_assert(image is not None, "Could not decode image file '%s'." % (filepaths[idx],))
+            if image.ndim == 2:
+                return image[..., np.newaxis]
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        if self.nb_decode_workers > 1 and len(buffers) > 1:
+            images = _get_thread_pool(self.nb_decode_workers).map(_decode, sm.xrange(len(buffers)))
+        else:
+            images = [_decode(idx) for idx in sm.xrange(len(buffers))]
+
+        if len(images) > 0 and len(set([image.shape for image in images])) == 1:
+            return np.array(images)
+        return images
+
+
+def _uses_fork_start_method():
+    if hasattr(multiprocessing, "get_start_method"):
+        return multiprocessing.get_start_method() == "fork"
+    # python 2 always forks on posix systems
+    return os.name == "posix"
+
+
 class BackgroundAugmenter(object):
     """
     Class to augment batches in the background (while training on the GPU).
@@ -4418,8 +5331,25 @@ class BackgroundAugmenter(object):
         Number of background workers to spawn. If auto, it will be set
         to C-1, where C is the number of CPU cores.
 
+    sample_seed : None or int, optional(default=None)
+        If None, each worker reseeds `augseq` with a random seed and augments
+        whole batches at once, i.e. a sample's augmentation depends on the
+        worker that received it. If an int, each batch is instead augmented via
+        ``augseq.augment_indexed_batch(batch, sample_seed, epoch)``, which
+        requires `Batch.data` to contain the indices of the batch's samples.
+        Each sample's augmentation then only depends on `sample_seed`, `epoch`
+        and its index.
+
+    epoch : int, optional(default=0)
+        Epoch to derive the samples' seeds from. Only used if `sample_seed`
+        is not None.
+
+    If the workers are not started via forking (e.g. when using the 'spawn'
+    or 'forkserver' start methods of multiprocessing), `augseq` is sent to them
+    as a JSON config (see `imgaug.to_config()`) instead of being pickled.
+
     """
-    def __init__(self, batch_loader, augseq, queue_size=50, nb_workers="auto"):
+    def __init__(self, batch_loader, augseq, queue_size=50, nb_workers="auto", sample_seed=None, epoch=0):
         do_assert(queue_size > 0)
         self.augseq = augseq
         self.source_finished_signals = batch_loader.finished_signals
@@ -4444,9 +5374,14 @@ class BackgroundAugmenter(object):
         self.augment_images = True
         self.augment_keypoints = True
 
+        # Forked workers inherit the augmenter without any serialization. Other start methods
+        # would pickle it, which is slower and larger than its config. The workers reseed the
+        # augmenter anyways, so the config's seeds lose nothing compared to the full states.
+        augseq_worker = augseq if _uses_fork_start_method() else augseq.to_json()
+
         seeds = current_random_state().randint(0, 10**6, size=(nb_workers,))
         for i in range(nb_workers):
-            worker = multiprocessing.Process(target=self._augment_images_worker, args=(augseq, self.queue_source, self.queue_result, self.source_finished_signals, seeds[i]))
+            worker = multiprocessing.Process(target=BackgroundAugmenter._augment_images_worker, args=(augseq_worker, self.queue_source, self.queue_result, self.source_finished_signals, seeds[i], sample_seed, epoch))
             worker.daemon = True
             worker.start()
             self.workers.append(worker)
@@ -4475,15 +5410,22 @@ class BackgroundAugmenter(object):
             else:
                 return self.get_batch()
 
-    def _augment_images_worker(self, augseq, queue_source, queue_result, source_finished_signals, seedval):
+    @staticmethod
+    def _augment_images_worker(augseq, queue_source, queue_result, source_finished_signals, seedval, sample_seed=None, epoch=0):
         """
         Worker function that endlessly queries the source queue (input
         batches), augments batches in it and sends the result to the output
         queue.
 
+        This is a static method, as otherwise the whole BackgroundAugmenter
+        would have to be pickled for start methods other than fork.
+
         """
+        if is_string(augseq):
+            augseq = from_json(augseq)
+
         np.random.seed(seedval)
-        random.seed(seedval)
+        random.seed(int(seedval))
         augseq.reseed(seedval)
         seed(seedval)
 
@@ -4493,7 +5435,10 @@ class BackgroundAugmenter(object):
                 batch_str = queue_source.get(timeout=0.1)
                 batch = pickle.loads(batch_str)
 
-                batch_aug = list(augseq.augment_batches([batch], background=False))[0]
+                if sample_seed is None:
+                    batch_aug = list(augseq.augment_batches([batch], background=False))[0]
+                else:
+                    batch_aug = augseq.augment_indexed_batch(batch, sample_seed, epoch=epoch)
 
                 # send augmented batch to output queue
                 batch_str = pickle.dumps(batch_aug, protocol=-1)
@@ -4513,3 +5458,598 @@ class BackgroundAugmenter(object):
             worker.terminate()
 
         self.queue_result.close()
+
+
+class AugmentationCache(object):
+    """
+    Class to read pre-augmented variants of a dataset from disk.
+
+    Expensive augmentation pipelines (e.g. containing `PiecewiseAffine`,
+    `ElasticTransformation` or `Superpixels`) may be too slow to run during
+    training. The cache allows to instead augment a dataset `K` times once
+    (via `AugmentationCache.create()`) and then read these variants during
+    training. Each variant is saved as a shard of memory-mapped `.npy`
+    files. The shards form a ring, i.e. each call of `get_batches()` reads
+    the next variant, so that every epoch is a single sequential read of one
+    shard.
+
+    The augmented images must all have the same shape and the augmented
+    heatmaps must all have the same array shape. Keypoints and bounding boxes
+    may vary in their number between images.
+
+    Parameters
+    ----------
+    dirpath : string
+        Directory in which the cache was created via `AugmentationCache.create()`.
+
+    Examples
+    --------
+    >>> seq = iaa.Sequential([iaa.Fliplr(0.5), iaa.PiecewiseAffine(scale=(0.01, 0.05))])
+    >>> cache = AugmentationCache.create("/path/to/cache", seq, images, nb_variants=10, keypoints=keypoints)
+    >>> for epoch in range(100):
+    >>>     for batch in cache.get_batches(batch_size=32):
+    >>>         train_on(batch.images_aug, batch.keypoints_aug)
+
+    Augments the dataset ten times and then iterates over the ten variants
+    in a ring during the 100 epochs.
+
+    """
+    INDEX_FILENAME = "index.pkl"
+    SHARD_NAMES = ["images", "heatmaps", "keypoints", "bounding_boxes"]
+
+    def __init__(self, dirpath):
+        filepath = os.path.join(dirpath, self.INDEX_FILENAME)
+        do_assert(os.path.isfile(filepath), "Could not find cache index file '%s'." % (filepath,))
+        with open(filepath, "rb") as f:
+            self.index = pickle.load(f)
+        self.dirpath = dirpath
+        self.nb_images = self.index["nb_images"]
+        self.nb_variants = self.index["nb_variants"]
+        self.next_variant_idx = 0
+
+    def __len__(self):
+        return self.nb_images
+
+    @classmethod
+    def create(cls, dirpath, augseq, images, nb_variants, heatmaps=None, keypoints=None, bounding_boxes=None,
+               batch_size=32, background=False):
+        """
+        Augment a dataset multiple times and save the results as a cache.
+
+        Parameters
+        ----------
+        dirpath : string
+            Directory to save the cache in. Will be created if it does not exist.
+            An existing cache in that directory is deleted before the new one is written.
+
+        augseq : Augmenter
+            Augmenter to apply to the dataset. Augmented images, heatmaps, keypoints and
+            bounding boxes of the same image are augmented in the same way.
+
+        images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+            Images of the dataset.
+
+        nb_variants : int
+            Number of augmented variants to create per image, i.e. number of shards.
+
+        heatmaps : None or list of HeatmapsOnImage, optional(default=None)
+            Heatmaps of the images. One object per image.
+
+        keypoints : None or list of KeypointsOnImage, optional(default=None)
+            Keypoints of the images. One object per image.
+
+        bounding_boxes : None or list of BoundingBoxesOnImage, optional(default=None)
+            Bounding boxes of the images. One object per image.
+
+        batch_size : int, optional(default=32)
+            Number of images to augment at the same time.
+
+        background : bool, optional(default=False)
+            Whether to augment the batches in background processes,
+            see `Augmenter.augment_batches()`.
+
+        Returns
+        -------
+        cache : AugmentationCache
+            Cache object to read the augmented variants.
+
+        """
+        nb_images = len(images)
+        do_assert(nb_images > 0)
+        do_assert(nb_variants >= 1)
+        do_assert(batch_size >= 1)
+        for augmentables in [heatmaps, keypoints, bounding_boxes]:
+            do_assert(augmentables is None or len(augmentables) == nb_images,
+                      "Expected one object per image (%d), got %d." % (nb_images, len(augmentables) if augmentables is not None else 0))
+
+        if not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+        # an existing cache is invalidated before any of its shards is overwritten, as it could
+        # otherwise still be opened with partially overwritten or stale shards
+        cls._remove_cache_files(dirpath)
+
+        # the number of keypoints and bounding boxes does not change during augmentation,
+        # hence their positions in the flat coordinate arrays are the same for all variants
+        def _compute_offsets(counts):
+            return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        index = {
+            "nb_images": nb_images,
+            "nb_variants": nb_variants,
+            "images": None,
+            "heatmaps": None,
+            "keypoints": None,
+            "bounding_boxes": None
+        }
+        if keypoints is not None:
+            index["keypoints"] = {"offsets": _compute_offsets([len(kpsoi.keypoints) for kpsoi in keypoints])}
+        if bounding_boxes is not None:
+            index["bounding_boxes"] = {
+                "offsets": _compute_offsets([len(bbsoi.bounding_boxes) for bbsoi in bounding_boxes]),
+                "labels": [[bb.label for bb in bbsoi.bounding_boxes] for bbsoi in bounding_boxes]
+            }
+
+        batches = []
+        for start in sm.xrange(0, nb_images, batch_size):
+            end = min(start + batch_size, nb_images)
+            batches.append(Batch(
+                images=images[start:end],
+                heatmaps=heatmaps[start:end] if heatmaps is not None else None,
+                keypoints=keypoints[start:end] if keypoints is not None else None,
+                bounding_boxes=bounding_boxes[start:end] if bounding_boxes is not None else None,
+                data=start
+            ))
+
+        for variant_idx in sm.xrange(nb_variants):
+            arrays = {}
+
+            def _get_array(name, shape, dtype):
+                if name not in arrays:
+                    arrays[name] = np.lib.format.open_memmap(cls._get_filepath(dirpath, name, variant_idx),
+                                                             mode="w+", dtype=dtype, shape=shape)
+                return arrays[name]
+
+            # in background mode, the batches may be returned in any order
+            for batch_aug in augseq.augment_batches(batches, background=background):
+                start = batch_aug.data
+                end = start + len(batch_aug.images_aug)
+
+                images_aug = batch_aug.images_aug
+                if index["images"] is None:
+                    index["images"] = {"shape": images_aug[0].shape, "dtype": images_aug[0].dtype}
+                do_assert(all([image_aug.shape == index["images"]["shape"] for image_aug in images_aug]),
+                          "Expected all augmented images to have shape %s, got shapes %s." % (
+                              index["images"]["shape"], [image_aug.shape for image_aug in images_aug]))
+                arr = _get_array("images", (nb_images,) + index["images"]["shape"], index["images"]["dtype"])
+                arr[start:end] = images_aug
+
+                if heatmaps is not None:
+                    heatmaps_aug = batch_aug.heatmaps_aug
+                    if index["heatmaps"] is None:
+                        index["heatmaps"] = {
+                            "arr_shape": heatmaps_aug[0].arr_0to1.shape,
+                            "shape": heatmaps_aug[0].shape,
+                            "min_value": heatmaps_aug[0].min_value,
+                            "max_value": heatmaps_aug[0].max_value
+                        }
+                    do_assert(all([heatmaps_i.arr_0to1.shape == index["heatmaps"]["arr_shape"] for heatmaps_i in heatmaps_aug]),
+                              "Expected all augmented heatmap arrays to have shape %s." % (index["heatmaps"]["arr_shape"],))
+                    arr = _get_array("heatmaps", (nb_images,) + index["heatmaps"]["arr_shape"], np.float32)
+                    arr[start:end] = [heatmaps_i.arr_0to1 for heatmaps_i in heatmaps_aug]
+
+                if keypoints is not None:
+                    offsets = index["keypoints"]["offsets"]
+                    arr = _get_array("keypoints", (offsets[-1], 2), np.float32)
+                    for i, kpsoi in enumerate(batch_aug.keypoints_aug):
+                        arr[offsets[start+i]:offsets[start+i+1]] = kpsoi.get_coords_array()
+
+                if bounding_boxes is not None:
+                    offsets = index["bounding_boxes"]["offsets"]
+                    arr = _get_array("bounding_boxes", (offsets[-1], 4), np.float32)
+                    for i, bbsoi in enumerate(batch_aug.bounding_boxes_aug):
+                        for j, bb in enumerate(bbsoi.bounding_boxes):
+                            arr[offsets[start+i]+j] = (bb.x1, bb.y1, bb.x2, bb.y2)
+
+            for arr in arrays.values():
+                arr.flush()
+
+        # the index is written last, so that only complete caches can be opened
+        with open(os.path.join(dirpath, cls.INDEX_FILENAME), "wb") as f:
+            pickle.dump(index, f, protocol=-1)
+
+        return cls(dirpath)
+
+    @staticmethod
+    def _get_filepath(dirpath, name, variant_idx):
+        return os.path.join(dirpath, "%s_%05d.npy" % (name, variant_idx))
+
+    @classmethod
+    def _remove_cache_files(cls, dirpath):
+        # the index is removed first, so that the cache can no longer be opened
+        filepath = os.path.join(dirpath, cls.INDEX_FILENAME)
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+        for filename in os.listdir(dirpath):
+            name, _, suffix = filename.rpartition("_")
+            if name in cls.SHARD_NAMES and len(suffix) == 9 and suffix.endswith(".npy") and suffix[:5].isdigit():
+                os.remove(os.path.join(dirpath, filename))
+
+    def get_batches(self, batch_size, variant_idx=None):
+        """
+        Yield the augmented images and other data of one variant in batches.
+
+        The arrays in the batches are read-only views on the memory-mapped
+        cache files, i.e. no data is copied or read before it is accessed.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of images per batch. The last batch may contain fewer images.
+
+        variant_idx : None or int, optional(default=None)
+            Index of the variant to read. If None, the next variant in the
+            ring of variants will be read.
+
+        Yields
+        -------
+        batch : Batch
+            Batch with the cached results in `images_aug`, `heatmaps_aug`,
+            `keypoints_aug` and `bounding_boxes_aug`. `data` contains the indices
+            of the images in the dataset.
+
+        """
+        do_assert(batch_size >= 1)
+        if variant_idx is None:
+            variant_idx = self.next_variant_idx
+            self.next_variant_idx = (self.next_variant_idx + 1) % self.nb_variants
+        do_assert(0 <= variant_idx < self.nb_variants,
+                  "Expected variant_idx to be in the interval [0, %d), got %d." % (self.nb_variants, variant_idx))
+
+        arrays = dict([
+            (name, np.load(self._get_filepath(self.dirpath, name, variant_idx), mmap_mode="r"))
+            for name in ["images", "heatmaps", "keypoints", "bounding_boxes"]
+            if self.index[name] is not None
+        ])
+
+        for start in sm.xrange(0, self.nb_images, batch_size):
+            end = min(start + batch_size, self.nb_images)
+            batch = Batch(data=np.arange(start, end))
+            batch.images_aug = arrays["images"][start:end]
+            image_shape = self.index["images"]["shape"]
+
+            if "heatmaps" in arrays:
+                heatmaps_index = self.index["heatmaps"]
+                batch.heatmaps_aug = [
+                    HeatmapsOnImage.from_0to1(arrays["heatmaps"][i], heatmaps_index["shape"],
+                                              min_value=heatmaps_index["min_value"],
+                                              max_value=heatmaps_index["max_value"])
+                    for i in sm.xrange(start, end)
+                ]
+
+            if "keypoints" in arrays:
+                offsets = self.index["keypoints"]["offsets"]
+                batch.keypoints_aug = [
+                    KeypointsOnImage.from_coords_array(arrays["keypoints"][offsets[i]:offsets[i+1]], image_shape)
+                    for i in sm.xrange(start, end)
+                ]
+
+            if "bounding_boxes" in arrays:
+                offsets = self.index["bounding_boxes"]["offsets"]
+                labels = self.index["bounding_boxes"]["labels"]
+                batch.bounding_boxes_aug = []
+                for i in sm.xrange(start, end):
+                    coords = arrays["bounding_boxes"][offsets[i]:offsets[i+1]]
+                    bbs = [BoundingBox(x1=coords[j, 0], y1=coords[j, 1], x2=coords[j, 2], y2=coords[j, 3], label=labels[i][j])
+                           for j in sm.xrange(coords.shape[0])]
+                    batch.bounding_boxes_aug.append(BoundingBoxesOnImage(bbs, image_shape))
+
+            yield batch
+
+
+class TTA(object):
+    """
+    Helper for test time augmentation with inversion of the predictions.
+
+    The helper applies `K` deterministic augmenters (views) to a batch of `N`
+    images and returns all `K*N` augmented images in one array, so that they can
+    be fed through a model in a single forward pass. Predicted heatmaps,
+    segmentation maps and keypoints on the augmented images can then be mapped
+    back to the original images in batched form, e.g. to average them.
+
+    The views must transform images affinely, i.e. consist of augmenters such as
+    `Fliplr`, `Flipud`, `Affine`, `CropAndPad`, `Scale` or `PadToFixedSize`. The
+    transformation of each image is recorded as an affine matrix, which is
+    estimated from augmented probe keypoints at the corners and the center of
+    the image. As augmenters do not use the same pixel convention for keypoints
+    (e.g. `Scale` treats coordinates as continuous, `Fliplr` as pixel indices),
+    heatmaps and segmentation maps are inverted with a second matrix, which is
+    estimated in pixel space from augmented coordinate ramp heatmaps.
+
+    Parameters
+    ----------
+    augmenters : Augmenter or list of Augmenter
+        Augmenter(s) to generate the views. If a list, each augmenter generates
+        one view and is converted to a deterministic one if it is not already
+        deterministic. If a single augmenter, `nb_views` deterministic variations
+        of it are generated via `to_deterministic()`.
+
+    nb_views : None or int, optional(default=None)
+        Number of views to generate if `augmenters` is a single augmenter.
+
+    Examples
+    --------
+    >>> tta = TTA([iaa.Noop(), iaa.Fliplr(1.0), iaa.Affine(scale=1.2)])
+    >>> views = tta.augment_images(images)
+    >>> heatmaps_pred = model.predict(views)
+    >>> heatmaps_inv = tta.invert_heatmaps(heatmaps_pred)
+
+    Generates three views of each image (unchanged, horizontally flipped and
+    zoomed in), predicts heatmaps for all of them in one pass and maps the
+    predicted heatmaps back to the original images. `heatmaps_inv[k*N+i]`
+    contains the prediction of view `k` for image `i`.
+
+    """
+
+    def __init__(self, augmenters, nb_views=None):
+        if isinstance(augmenters, (list, tuple)):
+            do_assert(len(augmenters) > 0)
+            do_assert(nb_views is None or nb_views == len(augmenters),
+                      "Expected nb_views to be None or the number of augmenters (%d), got %s." % (len(augmenters), nb_views))
+            self.augmenters = [aug if aug.deterministic else aug.to_deterministic() for aug in augmenters]
+        else:
+            do_assert(nb_views is not None and nb_views >= 1,
+                      "Expected nb_views to be an int >= 1 if a single augmenter is provided, got %s." % (nb_views,))
+            self.augmenters = augmenters.to_deterministic(nb_views)
+        self.nb_views = len(self.augmenters)
+
+        # set by augment_images(), one entry per image (image_shapes) or per augmented image (others)
+        self.image_shapes = None
+        self.view_shapes = None
+        self.matrices = None
+        self.matrices_inv = None
+        self.pixel_matrices = None
+
+    def augment_images(self, images):
+        """
+        Generate all views of a batch of images and record their transformations.
+
+        Parameters
+        ----------
+        images : (N,H,W,C) ndarray or list of (H,W,C) ndarray
+            Images to augment.
+
+        Returns
+        -------
+        views : (K*N,H',W',C) ndarray or list of (H',W',C) ndarray
+            Augmented images, where `views[k*N+i]` is the `k`-th view of image `i`.
+            An array if all augmented images have the same shape, otherwise a list.
+
+        """
+        image_shapes = [image.shape for image in images]
+        probes = []
+        ramps = []
+        for shape in image_shapes:
+            height, width = shape[0:2]
+            coords = np.float32([[0, 0], [width, 0], [0, height], [width, height], [width/2, height/2]])
+            probes.append(KeypointsOnImage.from_coords_array(coords, shape))
+            # pixel (y, x) has the values ((x+1)/(W+1), (y+1)/(H+1)), so that padded areas (zeros) decode
+            # to coordinates outside of the image
+            ramp_x = (np.arange(width, dtype=np.float32) + 1) / (width + 1)
+            ramp_y = (np.arange(height, dtype=np.float32) + 1) / (height + 1)
+            ramp = np.dstack([np.tile(ramp_x[np.newaxis, :], (height, 1)), np.tile(ramp_y[:, np.newaxis], (1, width))])
+            ramps.append(HeatmapsOnImage(ramp, shape))
+
+        views = []
+        view_shapes = []
+        matrices = []
+        pixel_matrices = []
+        for view_idx, augmenter in enumerate(self.augmenters):
+            images_aug = augmenter.augment_images(images)
+            probes_aug = augmenter.augment_keypoints(probes)
+            ramps_aug = augmenter.augment_heatmaps(ramps)
+            for probe, probe_aug, ramp_aug, image_aug in zip(probes, probes_aug, ramps_aug, images_aug):
+                matrix = self._estimate_matrix(probe.get_coords_array(), probe_aug.get_coords_array(), view_idx)
+                matrices.append(matrix)
+                pixel_matrices.append(self._estimate_pixel_matrix(ramp_aug, probe.shape, image_aug.shape, matrix))
+                view_shapes.append(image_aug.shape)
+            views.extend(images_aug)
+
+        self.image_shapes = image_shapes
+        self.view_shapes = view_shapes
+        self.matrices = np.float64(matrices)
+        self.matrices_inv = np.float64([np.linalg.inv(matrix) for matrix in matrices])
+        self.pixel_matrices = np.float64(pixel_matrices)
+
+        if len(views) > 0 and len(set(view_shapes)) == 1:
+            return np.array(views)
+        return views
+
+    @staticmethod
+    def _estimate_matrix(coords, coords_aug, view_idx):
+        coords_h = np.hstack([coords, np.ones((coords.shape[0], 1), dtype=coords.dtype)]).astype(np.float64)
+        solution = np.linalg.lstsq(coords_h, coords_aug.astype(np.float64), rcond=None)[0]
+        error = np.max(np.abs(coords_h.dot(solution) - coords_aug))
+        do_assert(error < 1e-2,
+                  "Expected the augmenter of view %d to transform images affinely (e.g. via Fliplr, Flipud, Affine, "
+                  "CropAndPad, Scale or PadToFixedSize), but its transformation could not be represented as an "
+                  "affine matrix." % (view_idx,))
+        # 3x3 matrix that maps coordinates on the image to coordinates on the view
+        matrix = np.eye(3)
+        matrix[0:2, :] = solution.T
+        return matrix
+
+    @staticmethod
+    def _estimate_pixel_matrix(ramp_aug, image_shape, view_shape, matrix):
+        # Estimates the matrix that maps pixel centers on the image to pixel centers on the view
+        # from an augmented coordinate ramp. The keypoint based matrix can be off by up to about
+        # half a pixel (per scale factor), hence it is only used to select the view pixels whose
+        # source lies well inside of the image, i.e. which are not affected by interpolation with
+        # padded areas. Falls back to the keypoint based matrix if the ramp cannot be used.
+        arr = ramp_aug.get_arr()
+        if arr.shape[0:2] != tuple(view_shape[0:2]):
+            return matrix
+        height, width = image_shape[0:2]
+        yy, xx = np.mgrid[0:arr.shape[0], 0:arr.shape[1]]
+        coords_view = np.stack([xx.ravel(), yy.ravel(), np.ones((xx.size,))], axis=1).astype(np.float64)
+        matrix_inv = np.linalg.inv(matrix)
+        coords_approx = coords_view.dot(matrix_inv[0:2, :].T)
+        margin = 2 + 2 * np.max(np.sqrt(np.sum(matrix_inv[0:2, 0:2] ** 2, axis=0)))
+        mask = (coords_approx[:, 0] >= margin) & (coords_approx[:, 0] <= width - 1 - margin) \
+            & (coords_approx[:, 1] >= margin) & (coords_approx[:, 1] <= height - 1 - margin)
+        if np.sum(mask) < 16:
+            return matrix
+        coords_view = coords_view[mask]
+        coords_image = np.stack([
+            arr[..., 0].ravel()[mask].astype(np.float64) * (width + 1) - 1,
+            arr[..., 1].ravel()[mask].astype(np.float64) * (height + 1) - 1
+        ], axis=1)
+        solution, _, rank, _ = np.linalg.lstsq(coords_view, coords_image, rcond=None)
+        if rank < 3:
+            return matrix
+        # solution maps view to image, the recorded matrix maps image to view
+        matrix_view_to_image = np.eye(3)
+        matrix_view_to_image[0:2, :] = solution.T
+        return np.linalg.inv(matrix_view_to_image)
+
+    def _assert_recorded(self, nb_items):
+        do_assert(self.matrices is not None and self.pixel_matrices is not None, "Expected augment_images() to be called before inverting predictions.")
+        do_assert(nb_items == len(self.matrices),
+                  "Expected one prediction per augmented image (%d), got %d." % (len(self.matrices), nb_items))
+
+    def _iter_items(self, items):
+        self._assert_recorded(len(items))
+        nb_images = len(self.image_shapes)
+        for idx, item in enumerate(items):
+            yield item, self.pixel_matrices[idx], self.image_shapes[idx % nb_images]
+
+    @staticmethod
+    def _warp_to_image(arr, matrix, arr_shape_view, image_shape, view_shape, interpolation, border_value=0):
+        # The array may have a different resolution than the image it is placed on, hence the
+        # matrix is converted from image coordinates to array coordinates. The output array
+        # has the same resolution relative to the original image as the input array relative
+        # to the augmented image. Pixel centers are at integer coordinates, hence the half
+        # pixel offsets.
+        factor_y = arr_shape_view[0] / view_shape[0]
+        factor_x = arr_shape_view[1] / view_shape[1]
+        height = max(int(round(image_shape[0] * factor_y)), 1)
+        width = max(int(round(image_shape[1] * factor_x)), 1)
+        gx = image_shape[1] / width
+        gy = image_shape[0] / height
+        scale_view = np.float64([[factor_x, 0, 0.5*factor_x - 0.5],
+                                 [0, factor_y, 0.5*factor_y - 0.5],
+                                 [0, 0, 1]])
+        scale_image_inv = np.float64([[gx, 0, 0.5*gx - 0.5],
+                                      [0, gy, 0.5*gy - 0.5],
+                                      [0, 0, 1]])
+        matrix_arr = scale_view.dot(matrix).dot(scale_image_inv)
+
+        # cv2.warpAffine supports at most four channels per call
+        flags = interpolation | cv2.WARP_INVERSE_MAP
+        channels = []
+        for c in sm.xrange(0, arr.shape[2], 4):
+            warped = cv2.warpAffine(np.ascontiguousarray(arr[..., c:c+4]), matrix_arr[0:2, :], (width, height),
+                                    flags=flags, borderMode=cv2.BORDER_CONSTANT, borderValue=border_value)
+            if warped.ndim == 2:
+                warped = warped[..., np.newaxis]
+            channels.append(warped)
+        return np.concatenate(channels, axis=2)
+
+    def invert_heatmaps(self, heatmaps):
+        """
+        Map heatmaps predicted on the augmented images back to the original images.
+
+        Areas of the original images that are not visible in a view are filled with
+        the minimum heatmap value.
+
+        Parameters
+        ----------
+        heatmaps : list of HeatmapsOnImage
+            Heatmaps on the augmented images, one object per augmented image
+            (i.e. `K*N` objects in the order returned by `augment_images()`).
+
+        Returns
+        -------
+        heatmaps_inv : list of HeatmapsOnImage
+            Heatmaps on the original images.
+
+        """
+        result = []
+        for heatmaps_i, matrix, image_shape in self._iter_items(heatmaps):
+            arr_inv = self._warp_to_image(heatmaps_i.arr_0to1, matrix, heatmaps_i.arr_0to1.shape, image_shape,
+                                          heatmaps_i.shape, cv2.INTER_LINEAR)
+            heatmaps_inv = HeatmapsOnImage.from_0to1(np.clip(arr_inv, 0.0, 1.0), image_shape,
+                                                     min_value=heatmaps_i.min_value, max_value=heatmaps_i.max_value)
+            heatmaps_inv.arr_was_2d = heatmaps_i.arr_was_2d
+            result.append(heatmaps_inv)
+        return result
+
+    def invert_segmentation_maps(self, segmaps):
+        """
+        Map segmentation maps predicted on the augmented images back to the original images.
+
+        Segmentation maps based on class ids are interpolated using nearest neighbour
+        interpolation, other maps (e.g. class probabilities) using linear interpolation.
+        Areas of the original images that are not visible in a view are set to class id -1,
+        i.e. no class (class id maps), or all zeros (other maps).
+
+        Parameters
+        ----------
+        segmaps : list of SegmentationMapOnImage
+            Segmentation maps on the augmented images, one object per augmented image
+            (i.e. `K*N` objects in the order returned by `augment_images()`).
+
+        Returns
+        -------
+        segmaps_inv : list of SegmentationMapOnImage
+            Segmentation maps on the original images.
+
+        """
+        result = []
+        for segmap, matrix, image_shape in self._iter_items(segmaps):
+            # the arrays are set directly, as the constructor does not accept class id -1
+            segmap_inv = copy.copy(segmap)
+            segmap_inv.shape = image_shape
+            if segmap.arr_int is not None:
+                arr = segmap.arr_int.astype(np.float32)[..., np.newaxis]
+                arr_inv = self._warp_to_image(arr, matrix, arr.shape, image_shape, segmap.shape, cv2.INTER_NEAREST,
+                                              border_value=-1)
+                segmap_inv.arr_int = np.round(arr_inv[..., 0]).astype(np.int32)
+            else:
+                segmap_inv._arr = self._warp_to_image(segmap.arr, matrix, segmap.arr.shape, image_shape, segmap.shape,
+                                                      cv2.INTER_LINEAR)
+            result.append(segmap_inv)
+        return result
+
+    def invert_keypoints(self, keypoints_on_images):
+        """
+        Map keypoints predicted on the augmented images back to the original images.
+
+        Parameters
+        ----------
+        keypoints_on_images : list of KeypointsOnImage
+            Keypoints on the augmented images, one object per augmented image
+            (i.e. `K*N` objects in the order returned by `augment_images()`).
+
+        Returns
+        -------
+        keypoints_on_images_inv : list of KeypointsOnImage
+            Keypoints on the original images.
+
+        """
+        self._assert_recorded(len(keypoints_on_images))
+        nb_images = len(self.image_shapes)
+        counts = [len(kpsoi.keypoints) for kpsoi in keypoints_on_images]
+        if sum(counts) == 0:
+            coords_inv = np.zeros((0, 2), dtype=np.float32)
+        else:
+            # transform the keypoints of all augmented images at once, using one matrix per keypoint
+            coords = np.concatenate([kpsoi.get_coords_array() for kpsoi in keypoints_on_images]).astype(np.float64)
+            matrices_inv = np.repeat(self.matrices_inv, counts, axis=0)
+            coords_inv = np.einsum("pij,pj->pi", matrices_inv[:, 0:2, 0:2], coords) + matrices_inv[:, 0:2, 2]
+
+        result = []
+        offsets = np.cumsum([0] + counts)
+        for idx in sm.xrange(len(keypoints_on_images)):
+            coords_inv_i = coords_inv[offsets[idx]:offsets[idx+1]]
+            result.append(KeypointsOnImage.from_coords_array(coords_inv_i, self.image_shapes[idx % nb_images]))
+        return result
@@ -4,6 +4,8 @@ from .external.opensimplex import OpenSimplex
 from abc import ABCMeta, abstractmethod
 import numpy as np
 import copy as copy_module
+import json
+import multiprocessing
 import six
 import six.moves as sm
 import scipy
@@ -151,6 +153,30 @@ def both_np_float_if_one_is_float(a, b):
     else:
         return a.astype(np.float64), b.astype(np.float64)
 
+def _convert_samples_dtype(samples, dtype):
+    # Converts sampled values to the given dtype, see StochasticParameter.draw_samples().
+    if dtype is None or samples.dtype == dtype:
+        return samples
+    if dtype.kind == "b":
+        return samples > 0.5
+    if samples.dtype.kind == "b":
+        if dtype.itemsize == 1:
+            return samples.view(dtype)
+        return samples.astype(dtype)
+    if dtype.kind in ["i", "u"]:
+        if samples.dtype.kind == "f":
+            samples = np.round(samples)
+        dtype_info = np.iinfo(dtype)
+        samples = np.clip(samples, dtype_info.min, dtype_info.max)
+    return samples.astype(dtype)
+
+def _get_calc_dtype(dtype):
+    # Returns the dtype in which parameters that modify the samples of other parameters
+    # (e.g. Multiply, Clip) should compute their results when samples of `dtype` are requested.
+    # Float results are computed directly in the requested precision, all others in float32 and
+    # converted afterwards.
+    return dtype if dtype.kind == "f" else np.dtype(np.float32)
+
 def draw_distributions_grid(params, rows=None, cols=None, graph_sizes=(350, 350), sample_sizes=None, titles=None):
     if titles is None:
         titles = [None] * len(params)
@@ -211,7 +237,74 @@ class StochasticParameter(object): # pylint: disable=locally-disabled, unused-va
         """
         return self.draw_samples(1, random_state=random_state)[0]
 
-    def draw_samples(self, size, random_state=None):
+    def draw_samples_seeded(self, size, seed, dtype=None):
+        """
+        Draws one or more sample values from the parameter using a new random state with the given seed.
+
+        This is equivalent to
+        ``draw_samples(size, random_state=ia.new_random_state(seed), dtype=dtype)``,
+        but skips the creation of the random state for constant parameters
+        (see `is_constant()`). Creating random states is comparatively
+        expensive, so augmenters should prefer this method when they
+        would otherwise create a random state only to sample from a
+        single parameter.
+
+        Parameters
+        ----------
+        size : tuple of int
+            Number of sample values by
+            dimension.
+
+        seed : int
+            Seed of the random state to use during the sampling process.
+
+        dtype : None or numpy.dtype, optional(default=None)
+            See `draw_samples()`.
+
+        Returns
+        -------
+        out : (size) iterable
+            Sampled values.
+
+        """
+        if self.is_constant():
+            value = np.array([self.get_constant_value()])
+            if dtype is not None:
+                value = _convert_samples_dtype(value, np.dtype(dtype))
+            return np.full(size, value[0], dtype=value.dtype)
+        return self.draw_samples(size, random_state=ia.new_random_state(seed), dtype=dtype)
+
+    def is_constant(self):
+        """
+        Returns whether this parameter always samples the same value.
+
+        Augmenters may use this to skip sampling or even skip their whole
+        augmentation if the value has no effect, e.g. adding a value of 0.
+
+        Returns
+        -------
+        out : bool
+            True if the parameter is guaranteed to always sample the value
+            returned by `get_constant_value()`, otherwise False.
+
+        """
+        return False
+
+    def get_constant_value(self):
+        """
+        Returns the value that this parameter always samples.
+
+        May only be called if `is_constant()` returned True.
+
+        Returns
+        -------
+        out : number or string
+            The constant value.
+
+        """
+        raise Exception("Parameter %s is not constant." % (self,))
+
+    def draw_samples(self, size, random_state=None, dtype=None):
         """
         Draws one or more sample values from the parameter.
 
@@ -225,6 +318,24 @@ class StochasticParameter(object): # pylint: disable=locally-disabled, unused-va
             A random state to use during the sampling process.
             If None, the libraries global random state will be used.
 
+        dtype : None or numpy.dtype, optional(default=None)
+            Dtype of the returned samples. If None, the samples will have
+            whatever dtype the parameter generates, usually float64 or int64.
+            Otherwise, the samples will be converted to the given dtype:
+
+                * bool: Values above 0.5 become True, all others False.
+                * integer dtypes: Values are rounded and clipped to the
+                  dtype's value range.
+                * float dtypes: Values are converted as usual.
+
+            Many parameters can generate samples of the requested dtype
+            directly (e.g. Binomial generates bool masks) or compute their
+            results in-place in the requested float precision (e.g.
+            Multiply, Add, Clip), which is faster and needs less memory than
+            converting afterwards. The sampled values may then differ
+            from the ones generated with `dtype=None` for the same random
+            state, though they follow the same distribution.
+
         Returns
         -------
         out : (size) iterable
@@ -233,7 +344,10 @@ class StochasticParameter(object): # pylint: disable=locally-disabled, unused-va
 
         """
         random_state = random_state if random_state is not None else ia.current_random_state()
-        samples = self._draw_samples(size, random_state)
+        if dtype is None:
+            samples = self._draw_samples(size, random_state)
+        else:
+            samples = self._draw_samples_as(size, random_state, np.dtype(dtype))
         ia.forward_random_state(random_state)
 
         return samples
@@ -242,6 +356,11 @@ class StochasticParameter(object): # pylint: disable=locally-disabled, unused-va
     def _draw_samples(self, size, random_state):
         raise NotImplementedError()
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        # Draws samples that have the given dtype. Parameters that can generate samples of
+        # that dtype directly, without intermediate arrays of other dtypes, overwrite this.
+        return _convert_samples_dtype(np.asarray(self._draw_samples(size, random_state)), dtype)
+
     def __add__(self, other):
         if ia.is_single_number(other) or isinstance(other, StochasticParameter):
             return Add(self, other)
@@ -330,6 +449,34 @@ class StochasticParameter(object): # pylint: disable=locally-disabled, unused-va
         else:
             raise Exception("Invalid datatypes in: StochasticParameter // %s (rfloordiv). Expected second argument to be number or StochasticParameter." % (type(other),))
 
+    def to_config(self):
+        """
+        Convert this parameter and all of its child parameters to a config.
+
+        See `imgaug.to_config()` for details.
+
+        Returns
+        -------
+        config : dict
+            Config of this parameter.
+
+        """
+        return ia.to_config(self)
+
+    def to_json(self):
+        """
+        Convert this parameter and all of its child parameters to a JSON string.
+
+        Use `imgaug.from_json()` to rebuild the parameter.
+
+        Returns
+        -------
+        json_str : string
+            Config of this parameter in JSON format.
+
+        """
+        return json.dumps(self.to_config())
+
     def copy(self):
         """
         Create a shallow copy of this parameter.
@@ -458,6 +605,22 @@ class Binomial(StochasticParameter):
         ia.do_assert(0 <= p <= 1.0, "Expected probability p to be in range [0.0, 1.0], got %s." % (p,))
         return random_state.binomial(1, p, size)
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        p = self.p.draw_sample(random_state=random_state)
+        ia.do_assert(0 <= p <= 1.0, "Expected probability p to be in range [0.0, 1.0], got %s." % (p,))
+        # Comparing uniform samples with p is significantly faster than binomial(1, p) and
+        # directly leads to a bool mask instead of an int64 array.
+        samples = random_state.random_sample(size) < p
+        return _convert_samples_dtype(samples, dtype)
+
+    def is_constant(self):
+        # p=0 and p=1 always lead to the same value
+        return self.p.is_constant() and self.p.get_constant_value() in [0, 1]
+
+    def get_constant_value(self):
+        ia.do_assert(self.is_constant())
+        return int(self.p.get_constant_value())
+
     def __repr__(self):
         return self.__str__()
 
@@ -1002,7 +1165,17 @@ class Deterministic(StochasticParameter):
             raise Exception("Expected StochasticParameter object or number or string, got %s." % (type(value),))
 
     def _draw_samples(self, size, random_state):
-        return np.tile(np.array([self.value]), size)
+        return np.full(size, self.value, dtype=np.array([self.value]).dtype)
+
+    def _draw_samples_as(self, size, random_state, dtype):
+        value = _convert_samples_dtype(np.array([self.value]), dtype)[0]
+        return np.full(size, value, dtype=dtype)
+
+    def is_constant(self):
+        return True
+
+    def get_constant_value(self):
+        return self.value
 
     def __repr__(self):
         return self.__str__()
@@ -1015,6 +1188,20 @@ class Deterministic(StochasticParameter):
         else:
             return "Deterministic(%s)" % (str(self.value),)
 
+def _to_minimal_nearest_dtype(arrs):
+    # Converts a list of integer arrays to uint8 if their values fit into that dtype.
+    # Boolean arrays are viewed as uint8, as cv2 cannot resize them.
+    # Returns the converted arrays and the dtype that results of nearest neighbour
+    # upsampling should have.
+    dtype = arrs[0].dtype
+    if all([arr.dtype.type == np.bool_ for arr in arrs]):
+        return [arr.view(np.uint8) for arr in arrs], np.bool_
+    if all([arr.dtype.kind in ["i", "u"] for arr in arrs]):
+        if all([arr.size == 0 or (np.min(arr) >= 0 and np.max(arr) <= 255) for arr in arrs]):
+            return [arr.astype(np.uint8, copy=False) for arr in arrs], np.uint8
+    return arrs, dtype
+
+
 class FromLowerResolution(StochasticParameter):
     """
     A meta parameter used to sample other parameter values on a low resolution
@@ -1066,6 +1253,13 @@ class FromLowerResolution(StochasticParameter):
         Minimum size in pixels of the low resolution sampling
         plane.
 
+    nb_workers : int or "auto", optional(default="auto")
+        Number of threads to use when upsampling the sampling planes of
+        multiple images, i.e. when samples of shape (N, H, W, C) are
+        requested. If "auto", one thread per CPU core will be used, but
+        only if the upsampled planes are large enough to make threading
+        worthwhile.
+
     Examples
     --------
     >>> param = FromLowerResolution(Binomial(0.05), size_px=(2, 16), method=Choice(["nearest", "linear"]))
@@ -1079,7 +1273,10 @@ class FromLowerResolution(StochasticParameter):
     sometimes blurry blobs of 1s, surrounded by values <1.0.
 
     """
-    def __init__(self, other_param, size_percent=None, size_px=None, method="nearest", min_size=1):
+    # minimum number of components (N*H*W*C) of the upsampled planes for nb_workers="auto" to use threads
+    NB_COMPONENTS_MIN_THREADING = 2**20
+
+    def __init__(self, other_param, size_percent=None, size_px=None, method="nearest", min_size=1, nb_workers="auto"):
         super(FromLowerResolution, self).__init__()
 
         ia.do_assert(size_percent is not None or size_px is not None)
@@ -1120,7 +1317,14 @@ class FromLowerResolution(StochasticParameter):
 
         self.min_size = min_size
 
+        ia.do_assert(nb_workers == "auto" or (ia.is_single_integer(nb_workers) and nb_workers >= 1),
+                     "Expected nb_workers to be \"auto\" or an int >= 1, got %s." % (nb_workers,))
+        self.nb_workers = nb_workers
+
     def _draw_samples(self, size, random_state):
+        return self._draw_samples_as(size, random_state, None)
+
+    def _draw_samples_as(self, size, random_state, dtype):
         if len(size) == 3:
             n = 1
             h, w, c = size
@@ -1136,27 +1340,70 @@ class FromLowerResolution(StochasticParameter):
             hw_pxs = self.size_px.draw_samples((n, 2), random_state=random_state)
 
         methods = self.method.draw_samples((n,), random_state=random_state)
-        result = None
-        for i, (hw_px, method) in enumerate(zip(hw_pxs, methods)):
+
+        # Each plane is sampled with its own call, as parameters like Binomial sample their
+        # hyperparameters (e.g. p) once per call and these should still vary between images.
+        # The low resolution planes are small, so this is cheap compared to the upsampling.
+        # If a dtype was requested, the planes are already sampled in that dtype (nearest
+        # neighbour interpolation) or in the float dtype used for the interpolation.
+        samples_small = []
+        for hw_px, method in zip(hw_pxs, methods):
             h_small = max(hw_px[0], self.min_size)
             w_small = max(hw_px[1], self.min_size)
-            samples = self.other_param.draw_samples((1, h_small, w_small, c), random_state=random_state)
+            if dtype is None:
+                dtype_small = None
+            else:
+                dtype_small = dtype if method == "nearest" else _get_calc_dtype(dtype)
+            samples_small.append(self.other_param.draw_samples((1, h_small, w_small, c), random_state=random_state, dtype=dtype_small)[0])
+
+        # Upsample all planes with the same interpolation method in one batch.
+        # Masks (e.g. from Binomial) are upsampled and returned as uint8 or bool instead of
+        # int64 when using nearest neighbour interpolation, which keeps their values intact.
+        methods_unique = []
+        for method in methods:
+            if method not in methods_unique:
+                methods_unique.append(method)
+        nb_workers = self._get_nb_workers(n * h * w * c)
+        groups = []
+        for method in methods_unique:
+            indices = [i for i in sm.xrange(n) if methods[i] == method]
+            samples_group = [samples_small[i] for i in indices]
             if method != "nearest":
                 # hacky cast because opencv resize seems to be unable to handle non-nearest
                 # interpolation methods in combination with large ints
                 # also, using lower ints with interpolation!=nearest seems to not result in the
                 # expected "gradual" values, but rather still behave like nearest
-                samples = samples.astype(np.float32)
-            samples_upscaled = ia.imresize_many_images(samples, (h, w), interpolation=method)
-            if result is None:
-                result = np.zeros((n, h, w, c), dtype=samples_upscaled.dtype)
-            result[i] = samples_upscaled
+                samples_group = [samples_i.astype(np.float32, copy=False) for samples_i in samples_group]
+                dtype_group = samples_group[0].dtype
+            else:
+                samples_group, dtype_group = _to_minimal_nearest_dtype(samples_group)
+            samples_upscaled = ia.imresize_many_images(samples_group, (h, w), interpolation=method, nb_workers=nb_workers)
+            groups.append((indices, samples_upscaled, dtype_group))
+
+        dtypes = set([np.dtype(dtype_group) for _, _, dtype_group in groups])
+        result = np.empty((n, h, w, c), dtype=dtypes.pop() if len(dtypes) == 1 else np.float32)
+        for indices, samples_upscaled, dtype_group in groups:
+            for i, samples_upscaled_i in zip(indices, samples_upscaled):
+                if dtype_group == np.bool_:
+                    samples_upscaled_i = samples_upscaled_i.view(np.bool_)
+                result[i] = samples_upscaled_i
+        result = _convert_samples_dtype(result, dtype)
 
         if len(size) == 3:
             return result[0]
         else:
             return result
 
+    def _get_nb_workers(self, nb_components):
+        if self.nb_workers != "auto":
+            return self.nb_workers
+        if nb_components < self.NB_COMPONENTS_MIN_THREADING:
+            return 1
+        try:
+            return multiprocessing.cpu_count()
+        except (ImportError, NotImplementedError):
+            return 1
+
     def __repr__(self):
         return self.__str__()
 
@@ -1207,6 +1454,13 @@ class Clip(StochasticParameter):
 
     def _draw_samples(self, size, random_state):
         samples = self.other_param.draw_samples(size, random_state=random_state)
+        return self._clip_inplace(samples)
+
+    def _draw_samples_as(self, size, random_state, dtype):
+        samples = self.other_param.draw_samples(size, random_state=random_state, dtype=_get_calc_dtype(dtype))
+        return _convert_samples_dtype(self._clip_inplace(samples), dtype)
+
+    def _clip_inplace(self, samples):
         if self.minval is not None and self.maxval is not None:
             np.clip(samples, self.minval, self.maxval, out=samples)
         elif self.minval is not None:
@@ -1273,6 +1527,24 @@ class Discretize(StochasticParameter):
         opstr = str(self.other_param)
         return "Discretize(%s)" % (opstr,)
 
+def _draw_samples_arithmetic_as(param, func, size, random_state, dtype):
+    # Draws samples of the arithmetic parameters Multiply, Add and Subtract in the given dtype.
+    # Follows the same sampling steps as their _draw_samples(), but computes func() in-place
+    # on the samples of other_param instead of allocating a new array for the result.
+    dtype_calc = _get_calc_dtype(dtype)
+    seed = random_state.randint(0, 10**6, 1)[0]
+    samples = param.other_param.draw_samples(size, random_state=ia.new_random_state(seed), dtype=dtype_calc)
+
+    elementwise = param.elementwise and not isinstance(param.val, Deterministic)
+
+    if elementwise:
+        val_samples = param.val.draw_samples(size, random_state=ia.new_random_state(seed+1), dtype=dtype_calc)
+    else:
+        val_samples = param.val.draw_sample(random_state=ia.new_random_state(seed+1))
+
+    func(samples, val_samples, out=samples, casting="unsafe")
+    return _convert_samples_dtype(samples, dtype)
+
 class Multiply(StochasticParameter):
     """
     Parameter to multiply other parameter's results with.
@@ -1326,6 +1598,9 @@ class Multiply(StochasticParameter):
         else:
             return samples * val_samples
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        return _draw_samples_arithmetic_as(self, np.multiply, size, random_state, dtype)
+
     def __repr__(self):
         return self.__str__()
 
@@ -1402,6 +1677,28 @@ class Divide(StochasticParameter):
 
             return force_np_float_dtype(samples) / float(val_sample)
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        dtype_calc = _get_calc_dtype(dtype)
+        seed = random_state.randint(0, 10**6, 1)[0]
+        samples = self.other_param.draw_samples(size, random_state=ia.new_random_state(seed), dtype=dtype_calc)
+
+        elementwise = self.elementwise and not isinstance(self.val, Deterministic)
+
+        if elementwise:
+            val_samples = self.val.draw_samples(size, random_state=ia.new_random_state(seed+1), dtype=dtype_calc)
+
+            # prevent division by zero
+            val_samples[val_samples == 0] = 1
+        else:
+            val_samples = self.val.draw_sample(random_state=ia.new_random_state(seed+1))
+
+            # prevent division by zero
+            if val_samples == 0:
+                val_samples = 1
+
+        np.divide(samples, val_samples, out=samples, casting="unsafe")
+        return _convert_samples_dtype(samples, dtype)
+
     def __repr__(self):
         return self.__str__()
 
@@ -1460,6 +1757,9 @@ class Add(StochasticParameter):
         else:
             return samples + val_samples
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        return _draw_samples_arithmetic_as(self, np.add, size, random_state, dtype)
+
     def __repr__(self):
         return self.__str__()
 
@@ -1518,6 +1818,9 @@ class Subtract(StochasticParameter):
         else:
             return samples - val_samples
 
+    def _draw_samples_as(self, size, random_state, dtype):
+        return _draw_samples_arithmetic_as(self, np.subtract, size, random_state, dtype)
+
     def __repr__(self):
         return self.__str__()
 
@@ -14,6 +14,7 @@ from __future__ import print_function, division
 # fix execution of tests involving matplotlib on travis
 import matplotlib
 matplotlib.use('Agg')
+import matplotlib.pyplot as plt
 
 import imgaug as ia
 from imgaug import augmenters as iaa
@@ -31,6 +32,12 @@ import scipy
 import copy
 import warnings
 import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
 
 #from nose.plugins.attrib import attr
 
@@ -59,13 +66,16 @@ def main():
     test_derive_random_state()
     test_derive_random_states()
     test_forward_random_state()
+    test_to_config()
     # test_quokka()
     # test_quokka_square()
     # test_angle_between_vectors()
     # test_draw_text()
     test_imresize_many_images()
     test_imresize_single_image()
+    test_apply_lut()
     test_pad()
+    test_pad_and_resize()
     test_compute_paddings_for_aspect_ratio()
     test_pad_to_aspect_ratio()
     test_pool()
@@ -110,11 +120,15 @@ def main():
     test_SegmentationMapOnImage_from_heatmaps()
     test_SegmentationMapOnImage_copy()
     test_SegmentationMapOnImage_deepcopy()
+    test_SegmentationMapOnImage_arr_int()
     # test_Batch()
     test_BatchLoader()
+    test_FileBatchLoader()
     # test_BackgroundAugmenter.get_batch()
     # test_BackgroundAugmenter._augment_images_worker()
     # test_BackgroundAugmenter.terminate()
+    test_AugmentationCache()
+    test_TTA()
 
     # ----------------------
     # augmenters
@@ -144,7 +158,7 @@ def main():
     # TODO BilateralBlur
 
     # color
-    # TODO WithColorspace
+    test_WithColorspace()
     test_AddToHueAndSaturation()
     # TODO ChangeColorspace
     test_Grayscale()
@@ -155,6 +169,7 @@ def main():
     test_LogContrast()
     test_LinearContrast()
     test_contrast_adjust_linear()
+    test_contrast_lut_per_channel()
 
     # convolutional
     test_Convolve()
@@ -193,12 +208,18 @@ def main():
     test_Augmenter_remove()
     test_Augmenter_hooks()
     test_Augmenter_copy_random_state()
+    test_Augmenter_set_nb_workers()
+    test_Augmenter_augment_images_parallel()
+    test_Augmenter_default_hooks()
+    test_Augmenter_augment_indexed_batch()
     test_Augmenter_augment_batches()
     test_Sequential()
+    test_Sequential_pointwise_fusion()
     test_SomeOf()
     test_OneOf()
     test_Sometimes()
     test_WithChannels()
+    test_Cached()
     test_Noop()
     test_Lambda()
     test_AssertLambda()
@@ -268,6 +289,7 @@ def main():
     #test_parameters_FrequencyNoise()
     test_parameters_operators()
     test_parameters_copy()
+    test_parameters_draw_samples_dtype()
 
     time_end = time.time()
     print("Finished without errors in %.4fs." % (time_end - time_start,))
@@ -507,6 +529,87 @@ def test_forward_random_state():
     assert rs1.randint(0, 10**6) == rs2.randint(0, 10**6)
 
 
+def _to_config_func_images(images, random_state, parents, hooks):
+    return images
+
+
+def test_to_config():
+    reseed()
+
+    image = np.arange(16*16*3).astype(np.uint8).reshape((1, 16, 16, 3))
+    rs = np.random.RandomState(1)
+    shared_param = iap.Uniform(0.0, 1.0)
+    seq = iaa.Sequential([
+        iaa.Fliplr(0.5, random_state=rs),
+        iaa.Sometimes(0.5, iaa.Add((-10, 10), per_channel=0.5, random_state=rs), name="sometimes"),
+        iaa.Sharpen(alpha=shared_param, lightness=(0.75, 1.5)),
+        iaa.Emboss(alpha=shared_param),
+        iaa.Affine(rotate=(-20, 20), order=[0, 1]),
+        iaa.Lambda(_to_config_func_images, None, None)
+    ], random_order=True, name="seq")
+
+    config = seq.to_config()
+    json_str = json.dumps(config)
+    assert "RandomState" not in json_str
+    seq_rebuilt = ia.from_json(json_str)
+    assert isinstance(seq_rebuilt, iaa.Sequential)
+    assert seq_rebuilt.name == "seq"
+    assert seq_rebuilt.random_order is True
+    assert len(seq_rebuilt) == len(seq)
+    assert [aug.name for aug in seq_rebuilt.get_all_children(flat=True)] \
+        == [aug.name for aug in seq.get_all_children(flat=True)]
+    assert seq_rebuilt[-1].func_images is _to_config_func_images
+
+    # shared objects stay shared, the global random state stays global
+    assert seq_rebuilt[0].random_state is seq_rebuilt[1].then_list[0].random_state
+    assert seq_rebuilt[0].random_state is not rs
+    assert seq_rebuilt.random_state is ia.current_random_state()
+    assert seq_rebuilt[2].matrix.alpha_param is seq_rebuilt[3].matrix.alpha_param
+
+    # converting does not change the random states of the source
+    seq.localize_random_state_()
+    seq_copy = seq.deepcopy()
+    _ = seq.to_config()
+    assert np.array_equal(seq.augment_images(image), seq_copy.augment_images(image))
+
+    # after reseeding, original and rebuilt augmenters produce the same outputs
+    seq.reseed(100)
+    seq_rebuilt.reseed(100)
+    for _ in sm.xrange(3):
+        assert np.array_equal(seq.augment_images(image), seq_rebuilt.augment_images(image))
+
+    # cached results and matrices are not part of the config
+    images = np.random.RandomState(2).randint(0, 255, size=(4, 64, 64, 3)).astype(np.uint8)
+    aug = iaa.Cached(iaa.Sharpen(alpha=(0.0, 1.0))).to_deterministic()
+    _ = aug.augment_images(images)
+    assert aug.get_cache_info()["nb_entries"] == 1
+    assert len(aug.children[0].matrix.matrix_cache.matrices) > 0
+    json_str = aug.to_json()
+    assert len(json_str) < images.nbytes // 10
+    aug_rebuilt = ia.from_json(json_str)
+    assert aug_rebuilt.get_cache_info()["nb_entries"] == 0
+    assert aug_rebuilt.get_cache_info()["max_bytes"] == aug.get_cache_info()["max_bytes"]
+    assert len(aug_rebuilt.children[0].matrix.matrix_cache.matrices) == 0
+    aug.reseed(100, deterministic_too=True)
+    aug_rebuilt.reseed(100, deterministic_too=True)
+    assert np.array_equal(aug_rebuilt.augment_images(images), aug.augment_images(images))
+    assert aug_rebuilt.get_cache_info()["nb_entries"] == 1
+    assert aug.get_cache_info()["nb_entries"] == 2
+
+    param = iap.Clip(iap.Normal(0, 1) + iap.Choice([1, 2]), -1, 1)
+    param_rebuilt = ia.from_config(param.to_config())
+    assert np.array_equal(param.draw_samples((100,), random_state=np.random.RandomState(1)),
+                          param_rebuilt.draw_samples((100,), random_state=np.random.RandomState(1)))
+
+    got_exception = False
+    try:
+        _ = iaa.Lambda(lambda images, random_state, parents, hooks: images, None, None).to_json()
+    except Exception as exc:
+        assert "lambda" in str(exc)
+        got_exception = True
+    assert got_exception
+
+
 def test_imresize_many_images():
     for c in [1, 3]:
         image1 = np.zeros((16, 16, c), dtype=np.uint8) + 255
@@ -563,6 +666,31 @@ def test_imresize_many_images():
                 diff_fraction = np.sum(diff) / (image_observed.size * 255)
                 assert diff_fraction < 0.5
 
+    # list of images with different shapes
+    images = [
+        np.random.randint(0, 255, size=(16, 16, 3)).astype(np.uint8),
+        np.random.randint(0, 255, size=(8, 32, 1)).astype(np.uint8),
+        np.random.randint(0, 255, size=(10, 12)).astype(np.uint8)
+    ]
+    observed = ia.imresize_many_images(images, 0.5, interpolation="linear")
+    assert isinstance(observed, list)
+    assert [image.shape for image in observed] == [(8, 8, 3), (4, 16, 1), (5, 6)]
+    for image, image_observed in zip(images, observed):
+        expected = ia.imresize_single_image(image, 0.5, interpolation="linear")
+        assert np.array_equal(image_observed, expected)
+
+    observed = ia.imresize_many_images(images, (4, 5))
+    assert [image.shape for image in observed] == [(4, 5, 3), (4, 5, 1), (4, 5)]
+
+    # thread pool
+    images = np.random.randint(0, 255, size=(8, 16, 16, 3)).astype(np.uint8)
+    for interpolation in ["nearest", "linear", "area", "cubic"]:
+        expected = ia.imresize_many_images(images, (12, 20), interpolation=interpolation)
+        observed = ia.imresize_many_images(images, (12, 20), interpolation=interpolation, nb_workers=3)
+        assert np.array_equal(observed, expected)
+    observed = ia.imresize_many_images(list(images), (12, 20), nb_workers=3)
+    assert np.array_equal(np.array(observed), ia.imresize_many_images(images, (12, 20)))
+
 
 def test_imresize_single_image():
     for c in [-1, 1, 3]:
@@ -627,6 +755,51 @@ def test_imresize_single_image():
                 assert diff_fraction < 0.5
 
 
+def test_apply_lut():
+    table = 255 - np.arange(256).astype(np.uint8)
+
+    # 2d image
+    arr = np.uint8([[0, 1], [254, 255]])
+    observed = ia.apply_lut(arr, table)
+    assert observed.shape == arr.shape
+    assert observed.dtype.type == np.uint8
+    assert np.array_equal(observed, 255 - arr)
+
+    # 3d image, single table
+    arr = np.uint8([[[0, 1, 2], [3, 4, 5]]])
+    observed = ia.apply_lut(arr, table)
+    assert observed.shape == arr.shape
+    assert np.array_equal(observed, 255 - arr)
+
+    # 3d image with one channel
+    arr = np.uint8([[[0], [10]]])
+    observed = ia.apply_lut(arr, table)
+    assert observed.shape == arr.shape
+    assert np.array_equal(observed, 255 - arr)
+
+    # one table per channel
+    tables = np.stack([np.arange(256), 255 - np.arange(256), np.full((256,), 7)], axis=1).astype(np.uint8)
+    arr = np.uint8([[[0, 1, 2], [3, 4, 5]]])
+    observed = ia.apply_lut(arr, tables)
+    expected = np.uint8([[[0, 254, 7], [3, 251, 7]]])
+    assert observed.shape == arr.shape
+    assert np.array_equal(observed, expected)
+
+    # more channels than supported by cv2
+    arr = np.random.RandomState(1).randint(0, 256, size=(2, 2, 513)).astype(np.uint8)
+    tables = np.tile(table[:, np.newaxis], (1, 513))
+    assert np.array_equal(ia.apply_lut(arr, table), 255 - arr)
+    assert np.array_equal(ia.apply_lut(arr, tables), 255 - arr)
+
+    # wrong dtype
+    got_exception = False
+    try:
+        _ = ia.apply_lut(np.float32([[0, 1]]), table)
+    except Exception:
+        got_exception = True
+    assert got_exception
+
+
 def test_pad():
     # -------
     # uint8, int32
@@ -788,6 +961,54 @@ def test_pad():
         assert 0.7 - 1e-6 < arr_pad[3, 0] < 0.7 + 1e-6
         assert 0.6 - 1e-6 < arr_pad[4, 0] < 0.6 + 1e-6
 
+    # same results as numpy.pad() for the modes that are padded via cv2
+    for dtype in [np.uint8, np.int32, np.float32, np.float64, np.int64]:
+        for shape in [(1, 1), (2, 3), (5, 4, 1), (5, 4, 3), (4, 4, 7)]:
+            arr = np.random.randint(0, 200, size=shape).astype(dtype)
+            for mode in ["constant", "edge", "reflect", "symmetric", "wrap"]:
+                # includes pads larger than the array, which numpy fills iteratively
+                for top, right, bottom, left in [(1, 2, 0, 3), (7, 9, 8, 6), (0, 0, 5, 0), (0, 7, 9, 2), (1, 8, 9, 1)]:
+                    paddings_np = [(top, bottom), (left, right)] + [(0, 0)] * (arr.ndim - 2)
+                    if mode == "constant":
+                        expected = np.pad(arr, paddings_np, mode=mode, constant_values=17)
+                    else:
+                        expected = np.pad(arr, paddings_np, mode=mode)
+                    observed = ia.pad(arr, top=top, right=right, bottom=bottom, left=left, mode=mode, cval=17)
+                    assert observed.dtype.type == dtype
+                    assert np.array_equal(observed, expected)
+
+
+def test_pad_and_resize():
+    arr = np.random.randint(0, 255, size=(20, 30, 3)).astype(np.uint8)
+
+    # no resize necessary
+    observed = ia.pad_and_resize(arr, top=2, bottom=3, mode="edge", sizes=(25, 30))
+    assert np.array_equal(observed, ia.pad(arr, top=2, bottom=3, mode="edge"))
+
+    # output size defaults to the input size
+    observed = ia.pad_and_resize(arr, top=2, left=3, mode="constant", cval=128)
+    assert observed.shape == (20, 30, 3)
+
+    for dtype in [np.uint8, np.float32]:
+        for shape in [(20, 30), (20, 30, 1), (20, 30, 3), (20, 30, 6)]:
+            arr = np.random.randint(0, 255, size=shape).astype(dtype)
+            for mode in ["constant", "edge", "reflect", "symmetric", "wrap", "linear_ramp"]:
+                for interpolation in [None, "nearest", "linear", "cubic"]:
+                    for top, right, bottom, left in [(1, 2, 0, 3), (10, 0, 6, 0), (0, 0, 0, 0), (1, 40, 25, 0)]:
+                        for sizes in [(20, 30), (15, 40), (40, 60), (10, 12)]:
+                            arr_pad = ia.pad(arr, top=top, right=right, bottom=bottom, left=left,
+                                             mode=mode, cval=50)
+                            expected = ia.imresize_single_image(arr_pad, sizes, interpolation=interpolation)
+                            observed = ia.pad_and_resize(arr, top=top, right=right, bottom=bottom, left=left,
+                                                         mode=mode, cval=50, sizes=sizes,
+                                                         interpolation=interpolation)
+                            assert observed.shape == expected.shape
+                            assert observed.dtype.type == dtype
+                            # the warp quantizes sampling locations to 1/32 pixel per axis, so results
+                            # may differ by up to 1/32 of the value range, but never more
+                            diff = np.abs(observed.astype(np.float64) - expected.astype(np.float64))
+                            assert diff.size == 0 or np.max(diff) <= 255/32
+
 
 def test_compute_paddings_for_aspect_ratio():
     arr = np.zeros((4, 4), dtype=np.uint8)
@@ -1289,6 +1510,14 @@ def test_KeypointsOnImage():
     assert np.all(image2[kps_mask] == [0, 255, 0])
     assert np.all(image2[~kps_mask] == [10, 10, 10])
 
+    # even sizes extend by size//2 pixels in each direction
+    image_kps = kpi.draw_on_image(image, color=[0, 255, 0], size=2, copy=True, raise_if_out_of_image=False)
+    assert np.all(image_kps[kps_mask_size3] == [0, 255, 0])
+    assert np.all(image_kps[~kps_mask_size3] == [10, 10, 10])
+
+    image_kps = ia.KeypointsOnImage([], shape=(5, 5, 3)).draw_on_image(image, color=[0, 255, 0], size=3)
+    assert np.array_equal(image_kps, image)
+
     kpi = ia.KeypointsOnImage(keypoints=kps + [ia.Keypoint(x=100, y=100)], shape=(5, 5, 3))
     image = np.zeros((5, 5, 3), dtype=np.uint8) + 10
     kps_mask = np.zeros(image.shape[0:2], dtype=np.bool)
@@ -1994,6 +2223,26 @@ def test_BoundingBoxesOnImage():
     assert np.all(image[35+0, 45+0, :] == [0, 255, 0])
     assert np.all(image[35+1, 45+1, :] == [0, 0, 0])
 
+    # draw_on_image() with thicker borders, the second box is partially outside of the image
+    bbsoi = ia.BoundingBoxesOnImage([bb1, ia.BoundingBox(y1=-5, x1=42, y2=5, x2=60)], shape=(40, 50, 3))
+    image = np.zeros(bbsoi.shape, dtype=np.uint8)
+    image_drawn = bbsoi.draw_on_image(image, color=[0, 255, 0], thickness=3, copy=True)
+    assert np.all(image == 0)
+    expected = np.zeros((40, 50), dtype=bool)
+    expected[10-2:30+3, 20-2:40+3] = True
+    expected[10+1:30, 20+1:40] = False
+    expected[0:5+3, 42-2:50] = True
+    expected[0:5, 42+1:50] = False
+    assert np.array_equal(image_drawn[..., 1] == 255, expected)
+
+    # alpha blending is applied once per box that covers a pixel
+    bbsoi = ia.BoundingBoxesOnImage([bb1, ia.BoundingBox(y1=10, x1=30, y2=20, x2=45)], shape=(40, 50, 3))
+    image = np.zeros(bbsoi.shape, dtype=np.uint8)
+    image_drawn = bbsoi.draw_on_image(image, color=[0, 200, 0], alpha=0.5, copy=False)
+    assert image_drawn is image
+    assert image_drawn[30, 25, 1] == 100
+    assert image_drawn[10, 35, 1] == 150
+
     # remove_out_of_image()
     bb1 = ia.BoundingBox(y1=10, x1=20, y2=30, x2=40, label=None)
     bb2 = ia.BoundingBox(y1=15, x1=25, y2=35, x2=51, label=None)
@@ -2123,6 +2372,25 @@ def test_HeatmapsOnImage_draw():
         for x in range(2, 4):
             assert np.allclose(heatmaps_drawn[y, x], v2)
 
+    # colors match the ones of the matplotlib color map, also for cmap=None
+    heatmaps_arr = np.float32([[0.0, 0.25, 0.5, 0.75, 1.0]])
+    heatmaps = ia.HeatmapsOnImage(heatmaps_arr, shape=(1, 5, 3))
+    values = heatmaps.to_uint8()[..., 0].astype(np.float32) / 255.0
+    for cmap in ["jet", "gray", plt.get_cmap("viridis")]:
+        heatmaps_drawn = heatmaps.draw(cmap=cmap)[0]
+        expected = np.clip(plt.get_cmap(cmap)(values)[..., 0:3] * 255, 0, 255).astype(np.uint8)
+        assert np.array_equal(heatmaps_drawn, expected)
+    heatmaps_drawn = heatmaps.draw(cmap=None)[0]
+    expected = np.tile(heatmaps.to_uint8(), (1, 1, 3))
+    assert np.array_equal(heatmaps_drawn, expected)
+
+    # multiple channels with the same cached color map
+    heatmaps_arr = np.float32([[[0.0, 1.0], [1.0, 0.0]]])
+    heatmaps = ia.HeatmapsOnImage(heatmaps_arr, shape=(1, 2, 3))
+    heatmaps_drawn = heatmaps.draw()
+    assert len(heatmaps_drawn) == 2
+    assert np.array_equal(heatmaps_drawn[0], heatmaps_drawn[1][:, ::-1, :])
+
 
 def test_HeatmapsOnImage_draw_on_image():
     heatmaps_arr = np.float32([
@@ -2421,6 +2689,21 @@ def test_SegmentationMapOnImage_draw():
     ])
     assert np.array_equal(observed, expected)
 
+    # class ids that do not appear in the map, more colors than classes
+    arr = np.int32([
+        [0, 3],
+        [3, 0]
+    ])
+    segmap = ia.SegmentationMapOnImage(arr, shape=(2, 2), nb_classes=5)
+    colors = [(0, 0, 0), (1, 1, 1), (2, 2, 2), (3, 4, 5), (6, 6, 6), (7, 7, 7)]
+    observed = segmap.draw(colors=colors)
+    expected = np.uint8([
+        [colors[0], colors[3]],
+        [colors[3], colors[0]]
+    ])
+    assert observed.dtype.type == np.uint8
+    assert np.array_equal(observed, expected)
+
     # background_threshold, background_class and foreground mask
     arr_c0 = np.float32([
         [0, 0, 0],
@@ -2667,9 +2950,10 @@ def test_SegmentationMapOnImage_scale():
     ])
     segmap = ia.SegmentationMapOnImage(arr, shape=(2, 2), nb_classes=3)
 
+    # integer-based maps are always resized with nearest neighbour interpolation
     segmap_scaled = segmap.scale((4, 4))
     observed = segmap_scaled.arr
-    expected = np.clip(ia.imresize_single_image(segmap.arr, (4, 4), interpolation="cubic"), 0, 1.0)
+    expected = ia.imresize_single_image(segmap.arr, (4, 4), interpolation="nearest")
     assert np.allclose(observed, expected)
     assert np.array_equal(segmap_scaled.get_arr_int(), np.int32([
         [0, 0, 1, 1],
@@ -2867,6 +3151,64 @@ def test_SegmentationMapOnImage_copy():
     assert observed.input_was == segmap.input_was
 
 
+def test_SegmentationMapOnImage_arr_int():
+    arr = np.int32([
+        [0, 1, 1],
+        [0, 2, 1]
+    ])
+    segmap = ia.SegmentationMapOnImage(arr, shape=(2, 3), nb_classes=3)
+    assert segmap.arr_int.dtype.type == np.int32
+    assert segmap.arr_shape == (2, 3, 3)
+
+    # class ids must be below nb_classes
+    got_exception = False
+    try:
+        _ = ia.SegmentationMapOnImage(arr, shape=(2, 3), nb_classes=2)
+    except Exception as exc:
+        assert "nb_classes" in str(exc)
+        got_exception = True
+    assert got_exception
+
+    # padded areas belong to no class, non-default cvals are ignored with a warning
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        segmap_padded = segmap.pad(top=1, left=1)
+        assert len(caught_warnings) == 0
+        segmap_padded_cval = segmap.pad(top=1, left=1, cval=1.0)
+        assert len(caught_warnings) == 1
+        assert "cval=1.0" in str(caught_warnings[-1].message)
+        _ = segmap.pad_to_aspect_ratio(1.0, cval=1.0)
+        assert len(caught_warnings) == 2
+    expected = np.int32([
+        [-1, -1, -1, -1],
+        [-1, 0, 1, 1],
+        [-1, 0, 2, 1]
+    ])
+    assert np.array_equal(segmap_padded.arr_int, expected)
+    assert np.array_equal(segmap_padded_cval.arr_int, expected)
+    assert np.array_equal(segmap_padded.get_arr_int(background_class_id=2)[0, :], np.int32([2] * 4))
+
+    # scaling always uses nearest neighbour interpolation, others are ignored with a warning
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        segmap_scaled = segmap.scale((4, 6))
+        segmap_scaled_nn = segmap.scale((4, 6), interpolation="nearest")
+        assert len(caught_warnings) == 0
+        segmap_scaled_linear = segmap.scale((4, 6), interpolation="linear")
+        assert len(caught_warnings) == 1
+        assert "interpolation=linear" in str(caught_warnings[-1].message)
+    expected = ia.imresize_single_image(arr, (4, 6), interpolation="nearest")
+    for segmap_scaled_i in [segmap_scaled, segmap_scaled_nn, segmap_scaled_linear]:
+        assert np.array_equal(segmap_scaled_i.arr_int, expected)
+
+    # accessing arr converts the map to its one-hot form, so that in-place changes are kept
+    segmap = ia.SegmentationMapOnImage(arr, shape=(2, 3), nb_classes=3)
+    segmap.arr[0, 0, :] = [0, 0, 1]
+    assert segmap.arr_int is None
+    assert segmap.get_arr_int()[0, 0] == 2
+    assert np.array_equal(segmap.get_arr_int()[:, 1:], arr[:, 1:])
+
+
 def test_SegmentationMapOnImage_deepcopy():
     arr_c0 = np.float32([
         [1.0, 0.0],
@@ -2942,6 +3284,269 @@ def test_BatchLoader():
             assert loader.all_finished()
 
 
+def test_FileBatchLoader():
+    reseed()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        images = []
+        filepaths = []
+        for i in sm.xrange(7):
+            # PNGs, so that the decoded images are identical to the saved ones
+            image = np.random.randint(0, 255, size=(16, 24, 3)).astype(np.uint8)
+            filepath = os.path.join(tmp_dir, "image%d.png" % (i,))
+            cv2.imwrite(filepath, image[..., ::-1])
+            images.append(image)
+            filepaths.append(filepath)
+
+        for nb_workers, threaded in [(1, True), (2, True), (2, False)]:
+            loader = ia.FileBatchLoader(filepaths, batch_size=3, queue_size=2, nb_workers=nb_workers,
+                                        nb_decode_workers=2, threaded=threaded)
+            loaded = []
+            counter = 0
+            while (not loader.all_finished() or not loader.queue.empty()) and counter < 1000:
+                try:
+                    loaded.append(pickle.loads(loader.queue.get(timeout=0.01)))
+                except:
+                    pass
+                counter += 1
+            loader.terminate()
+
+            # each batch is loaded exactly once, the filepaths are saved in the batches
+            assert len(loaded) == 3
+            assert sorted([len(batch.data) for batch in loaded]) == [1, 3, 3]
+            assert sorted([filepath for batch in loaded for filepath in batch.data]) == sorted(filepaths)
+            for batch in loaded:
+                assert ia.is_np_array(batch.images)
+                assert batch.images.shape == (len(batch.data), 16, 24, 3)
+                for image, filepath in zip(batch.images, batch.data):
+                    assert np.array_equal(image, images[filepaths.index(filepath)])
+
+        # reduced size and grayscale decoding
+        loader = ia.FileBatchLoader(filepaths, batch_size=3, reduce_factor=2, grayscale=True, nb_decode_workers=1)
+        loader.terminate()
+        observed = loader.load_images(filepaths[0:2])
+        assert observed.shape == (2, 8, 12, 1)
+        assert observed.dtype.type == np.uint8
+
+        # images of different sizes are returned as lists
+        filepath = os.path.join(tmp_dir, "image_large.png")
+        cv2.imwrite(filepath, np.zeros((20, 20, 3), dtype=np.uint8))
+        observed = loader.load_images([filepaths[0], filepath])
+        assert isinstance(observed, list)
+        assert observed[0].shape == (8, 12, 1)
+        assert observed[1].shape == (10, 10, 1)
+
+        got_exception = False
+        try:
+            filepath = os.path.join(tmp_dir, "broken.png")
+            with open(filepath, "wb") as f:
+                f.write(b"foo")
+            _ = loader.load_images([filepath])
+        except Exception as exc:
+            assert "Could not decode" in str(exc)
+            got_exception = True
+        assert got_exception
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_AugmentationCache():
+    reseed()
+
+    images = np.random.randint(0, 255, size=(5, 8, 10, 3)).astype(np.uint8)
+    heatmaps = [ia.HeatmapsOnImage(np.random.uniform(-1.0, 1.0, size=(4, 5, 2)).astype(np.float32), shape=(8, 10, 3),
+                                   min_value=-1.0, max_value=1.0)
+                for _ in sm.xrange(5)]
+    keypoints = [ia.KeypointsOnImage([ia.Keypoint(x=i, y=j) for j in sm.xrange(i)], shape=(8, 10, 3))
+                 for i in sm.xrange(5)]
+    bounding_boxes = [ia.BoundingBoxesOnImage([ia.BoundingBox(x1=1, y1=2, x2=3+i, y2=4, label="bb%d" % (i,))],
+                                              shape=(8, 10, 3))
+                      for i in sm.xrange(5)]
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        aug = iaa.Fliplr(1.0)
+        cache = ia.AugmentationCache.create(os.path.join(tmp_dir, "cache"), aug, images, nb_variants=2,
+                                            heatmaps=heatmaps, keypoints=keypoints,
+                                            bounding_boxes=bounding_boxes, batch_size=2)
+        assert len(cache) == 5
+        assert cache.nb_variants == 2
+
+        # a new cache object reads the same files
+        cache = ia.AugmentationCache(os.path.join(tmp_dir, "cache"))
+        for _ in sm.xrange(2):
+            batches = list(cache.get_batches(batch_size=3))
+            assert len(batches) == 2
+            assert [list(batch.data) for batch in batches] == [[0, 1, 2], [3, 4]]
+            images_aug = np.concatenate([batch.images_aug for batch in batches])
+            assert isinstance(batches[0].images_aug, np.memmap)
+            assert np.array_equal(images_aug, images[:, :, ::-1, :])
+
+            heatmaps_aug = [heatmaps_i for batch in batches for heatmaps_i in batch.heatmaps_aug]
+            for heatmaps_i, heatmaps_aug_i in zip(heatmaps, heatmaps_aug):
+                assert heatmaps_aug_i.shape == (8, 10, 3)
+                assert np.allclose(heatmaps_aug_i.get_arr(), heatmaps_i.get_arr()[:, ::-1, :], atol=1e-4)
+
+            keypoints_aug = [kpsoi for batch in batches for kpsoi in batch.keypoints_aug]
+            assert [len(kpsoi.keypoints) for kpsoi in keypoints_aug] == [0, 1, 2, 3, 4]
+            for kpsoi, kpsoi_aug in zip(keypoints, keypoints_aug):
+                expected = aug.augment_keypoints([kpsoi])[0]
+                assert kpsoi_aug.shape == (8, 10, 3)
+                assert np.allclose(kpsoi_aug.get_coords_array(), expected.get_coords_array())
+
+            bounding_boxes_aug = [bbsoi for batch in batches for bbsoi in batch.bounding_boxes_aug]
+            for i, (bbsoi, bbsoi_aug) in enumerate(zip(bounding_boxes, bounding_boxes_aug)):
+                bb = bbsoi_aug.bounding_boxes[0]
+                expected = aug.augment_bounding_boxes([bbsoi])[0].bounding_boxes[0]
+                assert bb.label == "bb%d" % (i,)
+                assert np.allclose([bb.x1, bb.y1, bb.x2, bb.y2], [expected.x1, expected.y1, expected.x2, expected.y2])
+
+        # variants are read in a ring and differ from each other
+        aug = iaa.Add((1, 100))
+        cache = ia.AugmentationCache.create(os.path.join(tmp_dir, "cache_add"), aug, images, nb_variants=2)
+        variants = [np.concatenate([batch.images_aug for batch in cache.get_batches(batch_size=2)])
+                    for _ in sm.xrange(3)]
+        assert not np.array_equal(variants[0], variants[1])
+        assert np.array_equal(variants[0], variants[2])
+        assert np.array_equal(list(cache.get_batches(batch_size=5, variant_idx=1))[0].images_aug, variants[1])
+
+        # an existing cache is replaced, including its shards beyond the new number of variants
+        aug = iaa.Flipud(1.0)
+        cache = ia.AugmentationCache.create(os.path.join(tmp_dir, "cache_add"), aug, images, nb_variants=1)
+        assert cache.nb_variants == 1
+        assert sorted(os.listdir(os.path.join(tmp_dir, "cache_add"))) == ["images_00000.npy", "index.pkl"]
+        images_aug = list(cache.get_batches(batch_size=5))[0].images_aug
+        assert np.array_equal(images_aug, images[:, ::-1, :, :])
+
+        # augmented images must all have the same shape
+        got_exception = False
+        try:
+            aug = iaa.Crop(px=(0, 3), keep_size=False)
+            _ = ia.AugmentationCache.create(os.path.join(tmp_dir, "cache_crop"), aug, images, nb_variants=1)
+        except Exception as exc:
+            assert "Expected all augmented images to have shape" in str(exc)
+            got_exception = True
+        assert got_exception
+
+        # a failed creation does not leave the previous cache in the directory behind
+        got_exception = False
+        try:
+            aug = iaa.Crop(px=(0, 3), keep_size=False)
+            _ = ia.AugmentationCache.create(os.path.join(tmp_dir, "cache"), aug, images, nb_variants=1)
+        except Exception as exc:
+            assert "Expected all augmented images to have shape" in str(exc)
+            got_exception = True
+        assert got_exception
+        got_exception = False
+        try:
+            _ = ia.AugmentationCache(os.path.join(tmp_dir, "cache"))
+        except Exception as exc:
+            assert "Could not find cache index file" in str(exc)
+            got_exception = True
+        assert got_exception
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_TTA():
+    reseed()
+
+    images = np.random.randint(0, 255, size=(2, 20, 30, 3)).astype(np.uint8)
+    augs = [iaa.Noop(), iaa.Fliplr(1.0), iaa.Flipud(1.0), iaa.Affine(rotate=(-30, 30), scale=(0.8, 1.2)),
+            iaa.Scale(0.5), iaa.CropAndPad(px=(-3, 3), keep_size=False), iaa.PadToFixedSize(40, 40)]
+    tta = ia.TTA(augs)
+    assert tta.nb_views == 7
+    assert all([aug.deterministic for aug in tta.augmenters])
+
+    views = tta.augment_images(images)
+    assert isinstance(views, list)
+    assert len(views) == 7 * 2
+    assert np.array_equal(views[0], images[0])
+    assert np.array_equal(views[2], np.fliplr(images[0]))
+    assert np.array_equal(views[3], np.fliplr(images[1]))
+    assert np.array_equal(views[5], np.flipud(images[1]))
+    assert views[8].shape == (10, 15, 3)
+    assert views[12].shape == (40, 40, 3)
+
+    # predictions that follow the augmentations are mapped back to the original images
+    kpsois = [ia.KeypointsOnImage([ia.Keypoint(x=5, y=7), ia.Keypoint(x=20.5, y=3)], shape=(20, 30, 3))
+              for _ in sm.xrange(2)]
+    kpsois_pred = [kpsoi for aug in tta.augmenters for kpsoi in aug.augment_keypoints(kpsois)]
+    kpsois_inv = tta.invert_keypoints(kpsois_pred)
+    assert len(kpsois_inv) == 7 * 2
+    for kpsoi_inv in kpsois_inv:
+        assert kpsoi_inv.shape == (20, 30, 3)
+        assert np.allclose(kpsoi_inv.get_coords_array(), kpsois[0].get_coords_array(), atol=1e-3)
+
+    arr = np.tile(np.linspace(0, 1, 30, dtype=np.float32)[np.newaxis, :], (20, 1))
+    heatmaps = [ia.HeatmapsOnImage(np.copy(arr), shape=(20, 30, 3)) for _ in sm.xrange(2)]
+    heatmaps_pred = [heatmaps_i for aug in tta.augmenters for heatmaps_i in aug.augment_heatmaps(heatmaps)]
+    heatmaps_inv = tta.invert_heatmaps(heatmaps_pred)
+    for heatmaps_inv_i in heatmaps_inv:
+        assert heatmaps_inv_i.shape == (20, 30, 3)
+        assert heatmaps_inv_i.arr_0to1.shape == (20, 30, 1)
+        # areas that are not visible in some views (e.g. due to rotation) are not compared
+        assert np.allclose(heatmaps_inv_i.arr_0to1[6:-6, 8:-8, 0], arr[6:-6, 8:-8], atol=0.02)
+
+    arr_int = np.tile(np.arange(30)[np.newaxis, :] // 10, (20, 1)).astype(np.int32)
+    segmaps = [ia.SegmentationMapOnImage(arr_int, shape=(20, 30, 3), nb_classes=3) for _ in sm.xrange(2)]
+    segmaps_pred = [segmap for aug in tta.augmenters for segmap in aug.augment_segmentation_maps(segmaps)]
+    segmaps_inv = tta.invert_segmentation_maps(segmaps_pred)
+    for segmap_inv in segmaps_inv:
+        assert segmap_inv.shape == (20, 30, 3)
+        assert np.mean(segmap_inv.get_arr_int()[6:-6, 8:-8] == arr_int[6:-6, 8:-8]) > 0.8
+
+    # predictions at a lower resolution than the augmented images
+    tta = ia.TTA([iaa.Fliplr(1.0)])
+    _ = tta.augment_images(images)
+    heatmaps_pred = [ia.HeatmapsOnImage(np.fliplr(arr[::2, ::2]), shape=(20, 30, 3)) for _ in sm.xrange(2)]
+    heatmaps_inv = tta.invert_heatmaps(heatmaps_pred)
+    assert heatmaps_inv[0].arr_0to1.shape == (10, 15, 1)
+
+    # resize-type views are inverted in pixel space, i.e. a block keeps its center of mass
+    def _center_of_mass(arr):
+        yy, xx = np.mgrid[0:arr.shape[0], 0:arr.shape[1]]
+        return np.float64([np.sum(yy * arr), np.sum(xx * arr)]) / np.sum(arr)
+
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    arr_block = np.zeros((64, 64), dtype=np.float32)
+    arr_block[16:48, 20:52] = 1.0
+    heatmaps = [ia.HeatmapsOnImage(arr_block, shape=image.shape)]
+    segmaps = [ia.SegmentationMapOnImage(arr_block.astype(np.int32), shape=image.shape, nb_classes=2)]
+    augs = [iaa.Scale(0.25), iaa.Scale(4.0),
+            iaa.Sequential([iaa.CropAndPad(px=(-4, 4, 4, -4), keep_size=False), iaa.Scale(0.5)])]
+    tta = ia.TTA(augs)
+    _ = tta.augment_images([image])
+    heatmaps_pred = [aug.augment_heatmaps(heatmaps)[0] for aug in tta.augmenters]
+    heatmaps_inv = tta.invert_heatmaps(heatmaps_pred)
+    for heatmaps_inv_i in heatmaps_inv:
+        assert heatmaps_inv_i.arr_0to1.shape == (64, 64, 1)
+        assert np.allclose(_center_of_mass(heatmaps_inv_i.arr_0to1[..., 0]), [31.5, 35.5], atol=0.1)
+    segmaps_pred = [aug.augment_segmentation_maps(segmaps)[0] for aug in tta.augmenters]
+    segmaps_inv = tta.invert_segmentation_maps(segmaps_pred)
+    for segmap_inv in segmaps_inv:
+        arr_inv = segmap_inv.get_arr_int()
+        assert arr_inv.shape == (64, 64)
+        assert np.allclose(_center_of_mass((arr_inv == 1).astype(np.float64)), [31.5, 35.5], atol=0.6)
+
+    # views from a single stochastic augmenter, all views have the same shape
+    tta = ia.TTA(iaa.Affine(translate_px=(-3, 3)), nb_views=3)
+    views = tta.augment_images(images)
+    assert ia.is_np_array(views)
+    assert views.shape == (3 * 2, 20, 30, 3)
+
+    # non-affine augmentations are detected
+    got_exception = False
+    try:
+        tta = ia.TTA([iaa.PerspectiveTransform(scale=0.2)])
+        _ = tta.augment_images(images)
+    except Exception as exc:
+        assert "transform images affinely" in str(exc)
+        got_exception = True
+    assert got_exception
+
+
 def test_Noop():
     reseed()
 
@@ -3502,17 +4107,17 @@ def test_Alpha():
 
     aug = iaa.Alpha(0.75, iaa.Add(10), iaa.Add(20))
     observed = aug.augment_image(base_img)
-    expected = (base_img + 0.75 * 10 + 0.25 * 20).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * 10 + 0.25 * 20).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     aug = iaa.Alpha(0.75, None, iaa.Add(20))
     observed = aug.augment_image(base_img + 10)
-    expected = (base_img + 0.75 * 10 + 0.25 * (10 + 20)).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * 10 + 0.25 * (10 + 20)).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     aug = iaa.Alpha(0.75, iaa.Add(10), None)
     observed = aug.augment_image(base_img + 10)
-    expected = (base_img + 0.75 * (10 + 10) + 0.25 * 10).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * (10 + 10) + 0.25 * 10).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     base_img = np.zeros((1, 2, 1), dtype=np.uint8)
@@ -3654,6 +4259,39 @@ def test_Alpha():
     observed = aug.augment_keypoints([kpsoi], hooks=hooks)[0]
     assert keypoints_equal([observed], [kpsoi])
 
+    # -----
+    # lazy branch evaluation
+    # -----
+    nb_seen = [0, 0]
+    def _count(idx):
+        def _func(images, random_state, parents, hooks):
+            nb_seen[idx] += len(images)
+            return images
+        return _func
+    aug = iaa.Alpha(iap.Choice([0, 1]), iaa.Lambda(func_images=_count(0), func_heatmaps=None, func_keypoints=None), iaa.Lambda(func_images=_count(1), func_heatmaps=None, func_keypoints=None))
+    for _ in sm.xrange(10):
+        _ = aug.augment_images([np.zeros((2, 2, 1), dtype=np.uint8) for _ in sm.xrange(10)])
+    assert nb_seen[0] + nb_seen[1] == 10*10
+    assert 0 < nb_seen[0] < 10*10
+
+    # images, heatmaps and keypoints stay in sync when deterministic
+    aug = iaa.Alpha(iap.Choice([0, 1]), iaa.Affine(translate_px={"x": (1, 3)}), iaa.Affine(translate_px={"y": (1, 3)}))
+    image = np.zeros((20, 20, 1), dtype=np.uint8)
+    image[5, 5, 0] = 255
+    kpsoi_sync = ia.KeypointsOnImage([ia.Keypoint(x=5, y=5)], shape=image.shape)
+    heatmaps_sync_arr = np.zeros((20, 20), dtype=np.float32)
+    heatmaps_sync_arr[5, 5] = 1.0
+    heatmaps_sync = ia.HeatmapsOnImage(heatmaps_sync_arr, shape=image.shape)
+    for _ in sm.xrange(20):
+        aug_det = aug.to_deterministic()
+        image_aug = aug_det.augment_image(image)
+        kpsoi_aug = aug_det.augment_keypoints([kpsoi_sync])[0]
+        heatmaps_aug = aug_det.augment_heatmaps([heatmaps_sync])[0].get_arr()
+        y_img, x_img = np.unravel_index(np.argmax(image_aug[..., 0]), image_aug.shape[0:2])
+        y_hm, x_hm = np.unravel_index(np.argmax(heatmaps_aug), heatmaps_aug.shape[0:2])
+        assert (y_img, x_img) == (y_hm, x_hm)
+        assert (int(kpsoi_aug.keypoints[0].y), int(kpsoi_aug.keypoints[0].x)) == (y_img, x_img)
+
     # -----
     # get_parameters()
     # -----
@@ -3720,17 +4358,17 @@ def test_AlphaElementwise():
 
     aug = iaa.AlphaElementwise(0.75, iaa.Add(10), iaa.Add(20))
     observed = aug.augment_image(base_img)
-    expected = (base_img + 0.75 * 10 + 0.25 * 20).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * 10 + 0.25 * 20).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     aug = iaa.AlphaElementwise(0.75, None, iaa.Add(20))
     observed = aug.augment_image(base_img + 10)
-    expected = (base_img + 0.75 * 10 + 0.25 * (10 + 20)).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * 10 + 0.25 * (10 + 20)).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     aug = iaa.AlphaElementwise(0.75, iaa.Add(10), None)
     observed = aug.augment_image(base_img + 10)
-    expected = (base_img + 0.75 * (10 + 10) + 0.25 * 10).astype(np.uint8)
+    expected = np.round(base_img + 0.75 * (10 + 10) + 0.25 * 10).astype(np.uint8)
     assert np.allclose(observed, expected)
 
     base_img = np.zeros((100, 100), dtype=np.uint8)
@@ -3879,6 +4517,39 @@ def test_AlphaElementwise():
     observed = aug.augment_keypoints([kpsoi], hooks=hooks)[0]
     assert keypoints_equal([observed], [kpsoi])
 
+    # -----
+    # lazy branch evaluation
+    # -----
+    nb_seen = [0, 0]
+    def _count(idx):
+        def _func(images, random_state, parents, hooks):
+            nb_seen[idx] += len(images)
+            return images
+        return _func
+    aug = iaa.AlphaElementwise(iap.Binomial(iap.Choice([0, 1])), iaa.Lambda(func_images=_count(0), func_heatmaps=None, func_keypoints=None), iaa.Lambda(func_images=_count(1), func_heatmaps=None, func_keypoints=None))
+    for _ in sm.xrange(10):
+        _ = aug.augment_images([np.zeros((2, 2, 1), dtype=np.uint8) for _ in sm.xrange(10)])
+    assert nb_seen[0] + nb_seen[1] == 10*10
+    assert 0 < nb_seen[0] < 10*10
+
+    # images, heatmaps and keypoints stay in sync when deterministic
+    aug = iaa.AlphaElementwise(iap.Binomial(iap.Choice([0, 1])), iaa.Affine(translate_px={"x": (1, 3)}), iaa.Affine(translate_px={"y": (1, 3)}))
+    image = np.zeros((20, 20, 1), dtype=np.uint8)
+    image[5, 5, 0] = 255
+    kpsoi_sync = ia.KeypointsOnImage([ia.Keypoint(x=5, y=5)], shape=image.shape)
+    heatmaps_sync_arr = np.zeros((20, 20), dtype=np.float32)
+    heatmaps_sync_arr[5, 5] = 1.0
+    heatmaps_sync = ia.HeatmapsOnImage(heatmaps_sync_arr, shape=image.shape)
+    for _ in sm.xrange(20):
+        aug_det = aug.to_deterministic()
+        image_aug = aug_det.augment_image(image)
+        kpsoi_aug = aug_det.augment_keypoints([kpsoi_sync])[0]
+        heatmaps_aug = aug_det.augment_heatmaps([heatmaps_sync])[0].get_arr()
+        y_img, x_img = np.unravel_index(np.argmax(image_aug[..., 0]), image_aug.shape[0:2])
+        y_hm, x_hm = np.unravel_index(np.argmax(heatmaps_aug), heatmaps_aug.shape[0:2])
+        assert (y_img, x_img) == (y_hm, x_hm)
+        assert (int(kpsoi_aug.keypoints[0].y), int(kpsoi_aug.keypoints[0].x)) == (y_img, x_img)
+
 
 def test_Superpixels():
     reseed()
@@ -4315,7 +4986,21 @@ def test_Scale():
         got_exception = True
     assert got_exception
 
-
+    # batches with several target sizes and interpolations
+    aug = iaa.Scale({"height": [4, 8], "width": [6, 10]}, interpolation=["nearest", "linear", "cubic"])
+    images = np.random.randint(0, 255, size=(20, 8, 8, 3)).astype(np.uint8)
+    for images_in in [images, list(images), [images[0], base_img3d, images[1][:, :5, :]]]:
+        samples_h, samples_w, samples_ip = aug._draw_samples(len(images_in), ia.copy_random_state(aug.random_state))
+        observed = aug.augment_images(images_in)
+        assert len(observed) == len(images_in)
+        for i, image in enumerate(images_in):
+            expected = ia.imresize_single_image(image, (samples_h[i], samples_w[i]), interpolation=samples_ip[i])
+            assert np.array_equal(observed[i], expected)
+
+    aug = iaa.Scale({"height": 4, "width": 6}, interpolation=["nearest", "linear", "cubic"])
+    observed = aug.augment_images(images)
+    assert ia.is_np_array(observed)
+    assert observed.shape == (20, 4, 6, 3)
 
     aug = iaa.Scale(size=1, interpolation="nearest")
     params = aug.get_parameters()
@@ -4703,6 +5388,14 @@ def test_Pad():
     assert seen[3] == 0
     assert 250 - 50 < seen[4] < 250 + 50
 
+    # padding and resizing back to the original size keeps the values at the image borders
+    heatmaps = ia.HeatmapsOnImage(np.ones((16, 16, 1), dtype=np.float32), shape=(16, 16, 3))
+    aug = iaa.CropAndPad(px=(-2, 0, 0, 1), keep_size=True)
+    observed = aug.augment_heatmaps([heatmaps])[0].get_arr()
+    assert observed.shape == (16, 16, 1)
+    assert np.allclose(observed[:, 1:, 0], 1.0)
+    assert np.allclose(observed[:, 0, 0], observed[0, 0, 0])
+
 
 def test_Crop():
     reseed()
@@ -5975,6 +6668,76 @@ def test_MedianBlur():
     assert keypoints_equal(observed, expected)
 
 
+def test_WithColorspace():
+    reseed()
+
+    base_img = np.zeros((2, 2, 3), dtype=np.uint8)
+    base_img[..., 0] += 20
+    base_img[..., 1] += 40
+    base_img[..., 2] += 60
+
+    # no children
+    aug = iaa.WithColorspace("HSV", from_colorspace="RGB")
+    observed = aug.augment_image(base_img)
+    expected = cv2.cvtColor(cv2.cvtColor(base_img, cv2.COLOR_RGB2HSV), cv2.COLOR_HSV2RGB)
+    assert np.array_equal(observed, expected)
+
+    # add to hue
+    aug = iaa.WithColorspace("HSV", from_colorspace="RGB", children=iaa.WithChannels(0, iaa.Add(10)))
+    observed = aug.augment_image(base_img)
+    img_hsv = cv2.cvtColor(base_img, cv2.COLOR_RGB2HSV)
+    img_hsv[..., 0] += 10
+    expected = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
+    assert np.array_equal(observed, expected)
+
+    # images of different shapes in a list
+    images = [base_img, np.tile(base_img, (2, 1, 1)), base_img]
+    observed = aug.augment_images(images)
+    assert len(observed) == 3
+    assert np.array_equal(observed[0], expected)
+    assert np.array_equal(observed[1], np.tile(expected, (2, 1, 1)))
+    assert np.array_equal(observed[2], expected)
+
+    # adjacent augmenters with the same colorspaces only convert once
+    seq = iaa.Sequential([
+        iaa.WithColorspace("HSV", children=iaa.WithChannels(0, iaa.Add(10))),
+        iaa.WithColorspace("HSV", children=iaa.WithChannels(0, iaa.Add(5)))
+    ])
+    assert len(seq._get_fused_runs(ia.HooksImages())) == 1
+    observed = seq.augment_image(base_img)
+    img_hsv = cv2.cvtColor(base_img, cv2.COLOR_RGB2HSV)
+    img_hsv[..., 0] += 15
+    expected = cv2.cvtColor(img_hsv, cv2.COLOR_HSV2RGB)
+    assert np.array_equal(observed, expected)
+
+    # ... but not if hooks are used
+    def activator(images, augmenter, parents, default):
+        return default
+    hooks = ia.HooksImages(activator=activator)
+    assert len(seq._get_fused_runs(hooks)) == 2
+    observed = seq.augment_image(base_img, hooks=hooks)
+    assert np.allclose(observed, expected, atol=3, rtol=0)
+
+    # ... and not for different colorspaces
+    seq = iaa.Sequential([
+        iaa.WithColorspace("HSV", children=iaa.WithChannels(0, iaa.Add(10))),
+        iaa.WithColorspace("HLS", children=iaa.WithChannels(0, iaa.Add(5)))
+    ])
+    assert len(seq._get_fused_runs(ia.HooksImages())) == 2
+
+    # random states are forwarded as in the non-fused execution
+    seq = iaa.Sequential([
+        iaa.WithColorspace("HSV", children=iaa.WithChannels(0, iaa.Add(10))),
+        iaa.WithColorspace("HSV", children=iaa.WithChannels(0, iaa.Add(5)))
+    ], random_state=1)
+    seq.localize_random_state_()
+    states_before = [aug.random_state.get_state() for aug in seq]
+    seq.augment_image(base_img)
+    states_after = [aug.random_state.get_state() for aug in seq]
+    for state_before, state_after in zip(states_before, states_after):
+        assert state_before[2] != state_after[2] or not np.array_equal(state_before[1], state_after[1])
+
+
 def test_AddToHueAndSaturation():
     reseed()
 
@@ -6375,6 +7138,35 @@ def test_contrast_adjust_linear():
     assert np.array_equal(observed, expected)
 
 
+def test_contrast_lut_per_channel():
+    reseed()
+
+    # uint8 images are augmented via lookup tables, compare against applying the
+    # contrast functions to each channel directly
+    img = np.random.RandomState(1).randint(0, 256, size=(16, 16, 3)).astype(np.uint8)
+    augs = [
+        iaa.GammaContrast(gamma=(0.5, 2.0), per_channel=True),
+        iaa.SigmoidContrast(gain=(5, 10), cutoff=(0.25, 0.75), per_channel=True),
+        iaa.LogContrast(gain=(0.5, 1.0), per_channel=True),
+        iaa.LinearContrast(alpha=(0.5, 2.0), per_channel=True)
+    ]
+    for aug in augs:
+        for _ in sm.xrange(3):
+            aug_det = aug.to_deterministic()
+            rs = ia.copy_random_state(aug_det.random_state)
+            observed = aug_det.augment_image(img)
+
+            seeds = rs.randint(0, 10**6, size=(2,))
+            rs_img = ia.new_random_state(seeds[1])
+            samples = [param.draw_samples((3,), random_state=rs_img) for param in aug_det.params1d]
+            expected = np.zeros_like(img)
+            for c in sm.xrange(3):
+                expected[..., c] = aug_det.func(img[..., c], *[sample[c] for sample in samples])
+            assert observed.dtype.type == np.uint8
+            assert observed.shape == img.shape
+            assert np.array_equal(observed, expected)
+
+
 def test_Convolve():
     reseed()
 
@@ -6447,6 +7239,39 @@ def test_Convolve():
     observed = aug.augment_image(img3)
     assert np.array_equal(observed, 2*img3)
 
+    # different matrices per channel vs. the same matrix for all channels
+    m2 = np.float32([
+        [0, 0, 0],
+        [0, 3, 0],
+        [0, 0, 0]
+    ])
+    aug = iaa.Convolve(matrix=lambda _img, nb_channels, random_state: [m, m2, None])
+    observed = aug.augment_image(img3)
+    assert np.array_equal(observed[..., 0], 2*img)
+    assert np.array_equal(observed[..., 1], 3*img)
+    assert np.array_equal(observed[..., 2], img)
+
+    aug = iaa.Convolve(matrix=lambda _img, nb_channels, random_state: [m, np.copy(m), np.copy(m)])
+    observed = aug.augment_image(img3)
+    assert np.array_equal(observed, 2*img3)
+
+    aug = iaa.Convolve(matrix=lambda _img, nb_channels, random_state: np.tile(m[..., np.newaxis], (1, 1, 3)))
+    observed = aug.augment_images(np.uint8([img3, img3]))
+    assert np.array_equal(observed, np.uint8([2*img3, 2*img3]))
+
+    img_large = np.random.randint(0, 255, size=(16, 16, 3)).astype(np.uint8)
+    m_sharpen = np.float32([
+        [-1, -1, -1],
+        [-1, 9.5, -1],
+        [-1, -1, -1]
+    ])
+    aug = iaa.Convolve(matrix=m_sharpen)
+    observed = aug.augment_image(img_large)
+    expected = np.dstack([
+        np.clip(cv2.filter2D(img_large[..., c], -1, m_sharpen), 0, 255) for c in sm.xrange(3)
+    ]).astype(np.uint8)
+    assert np.array_equal(observed, expected)
+
     # matrix is [[0, -1, 0], [0, 10, 0], [0, 0, 0]]
     m = np.float32([
         [0, -1, 0],
@@ -6598,6 +7423,16 @@ def test_Sharpen():
         got_exception = True
     assert got_exception
 
+    # matrices are cached by rounded parameters, so nearly identical samples
+    # lead to the same matrix object
+    aug = iaa.Sharpen(alpha=iap.Choice([0.5, 0.5000001]), lightness=1)
+    matrices_seen = set()
+    for i in sm.xrange(20):
+        matrices = aug.matrix(base_img[..., np.newaxis], 1, ia.new_random_state(i))
+        assert len(matrices) == 1
+        matrices_seen.add(id(matrices[0]))
+    assert len(matrices_seen) == 1
+
     # this part doesnt really work so far due to nonlinearities resulting from clipping to uint8
     """
     # alpha range
@@ -7138,6 +7973,23 @@ def test_CoarseDropout():
         got_exception = True
     assert got_exception
 
+    # masks of a batch are sampled at once, but p still varies per image
+    aug = iaa.CoarseDropout(p=iap.Binomial(1-iap.Choice([0.0, 1.0])), size_px=4)
+    images = np.ones((50, 16, 16, 1), dtype=np.uint8) * 100
+    observed = aug.augment_images(images)
+    assert observed.shape == images.shape
+    nb_dropped = np.sum([np.all(observed_i == 0) for observed_i in observed])
+    nb_kept = np.sum([np.all(observed_i == 100) for observed_i in observed])
+    assert nb_dropped + nb_kept == 50
+    assert 10 < nb_dropped < 40
+
+    # batch with differently sized images and per_channel=0.5
+    aug = iaa.CoarseDropout(p=0.5, size_px=4, per_channel=0.5)
+    images = [np.ones((16, 16, 3), dtype=np.uint8) * 100, np.ones((8, 12, 3), dtype=np.uint8) * 100] * 10
+    observed = aug.augment_images(images)
+    assert [observed_i.shape for observed_i in observed] == [image.shape for image in images]
+    assert all([np.all(np.logical_or(observed_i == 0, observed_i == 100)) for observed_i in observed])
+
 
 def test_Multiply():
     reseed()
@@ -7452,6 +8304,23 @@ def test_MultiplyElementwise():
         got_exception = True
     assert got_exception
 
+    # test saturation and rounding for uint8, also with non-contiguous images
+    image = np.uint8([[[0, 100, 200], [250, 255, 3]]])
+    aug = iaa.MultiplyElementwise(mul=1.5)
+    observed = aug.augment_image(image)
+    expected = np.uint8([[[0, 150, 255], [255, 255, 4]]])
+    assert observed.dtype.type == np.uint8
+    assert np.array_equal(observed, expected)
+    aug = iaa.Sequential([iaa.Fliplr(1.0), aug])
+    observed = aug.augment_image(image)
+    assert np.array_equal(observed, expected[:, ::-1, :])
+
+    aug = iaa.MultiplyElementwise(mul=iap.Choice([0.5, 2.0]), per_channel=True)
+    image = np.full((4, 4, 5), 100, dtype=np.uint8)
+    observed = aug.augment_image(image)
+    assert observed.shape == image.shape
+    assert np.all(np.logical_or(observed == 50, observed == 200))
+
     # test get_parameters()
     aug = iaa.MultiplyElementwise(mul=1, per_channel=False)
     params = aug.get_parameters()
@@ -7460,6 +8329,15 @@ def test_MultiplyElementwise():
     assert params[0].value == 1
     assert params[1].value == 0
 
+    # constant multipliers lead to the same results as sampled ones with the same value
+    image = np.arange(256).astype(np.uint8).reshape((16, 16, 1))
+    for mul in [0.5, 1.0, 1.7]:
+        observed = iaa.MultiplyElementwise(mul).augment_image(image)
+        expected = iaa.MultiplyElementwise(iap.Choice([mul])).augment_image(image)
+        assert np.array_equal(observed, expected)
+    observed = iaa.Dropout(p=0).augment_image(image)
+    assert np.array_equal(observed, image)
+
 def test_ReplaceElementwise():
     reseed()
 
@@ -7629,6 +8507,33 @@ def test_ReplaceElementwise():
     assert params[1].value == 2
     assert params[2].value == 0
 
+    # replacement values are shared by all channels if per_channel is False
+    aug = iaa.ReplaceElementwise(mask=0.5, replacement=iap.DiscreteUniform(0, 255), per_channel=False)
+    img = np.zeros((20, 20, 3), dtype=np.uint8) + 1
+    observed = aug.augment_image(img)
+    replaced = np.any(observed != 1, axis=2)
+    assert 0 < np.sum(replaced) < 20*20
+    assert np.array_equal(observed[..., 0], observed[..., 1])
+    assert np.array_equal(observed[..., 0], observed[..., 2])
+    assert np.all(observed[~replaced] == 1)
+
+    # the dtype is kept and replacement values are clipped to [0, 255]
+    aug = iaa.ReplaceElementwise(mask=0.5, replacement=300)
+    img = np.zeros((20, 20, 1), dtype=np.float32) + 0.5
+    observed = aug.augment_image(img)
+    assert observed.dtype.type == np.float32
+    uq = np.unique(observed)
+    assert len(uq) == 2 and 0.5 in uq and 255 in uq
+
+    # spatially structured replacements wrapped in other parameters are sampled on the whole plane
+    replacement = iap.Multiply(iap.FromLowerResolution(iap.Binomial(0.5), size_px=4), 255)
+    aug = iaa.ReplaceElementwise(mask=0.5, replacement=replacement)
+    img = np.zeros((32, 32, 3), dtype=np.uint8) + 1
+    observed = aug.augment_image(img)
+    assert observed.shape == (32, 32, 3)
+    assert np.all(np.in1d(np.unique(observed), [0, 1, 255]))
+    assert np.array_equal(observed[..., 0], observed[..., 1])
+
 
 def test_SaltAndPepper():
     reseed()
@@ -7646,6 +8551,22 @@ def test_SaltAndPepper():
     assert nb_pepper > 200
     assert nb_salt > 200
 
+    # replacement values are only sampled for the replaced pixels
+    for aug in [iaa.SaltAndPepper(p=0.1), iaa.Salt(p=0.1), iaa.Pepper(p=0.1)]:
+        replacement = aug.replacement
+        sizes = []
+
+        def _draw_samples_seeded(size, seed, dtype=None, _replacement=replacement, _sizes=sizes):
+            _sizes.append(size)
+            return type(_replacement).draw_samples_seeded(_replacement, size, seed, dtype=dtype)
+
+        replacement.draw_samples_seeded = _draw_samples_seeded
+        observed = aug.augment_image(base_img)
+        nb_replaced = np.sum(observed != 128)
+        assert len(sizes) == 1
+        assert len(sizes[0]) == 1
+        assert nb_replaced <= sizes[0][0] < 100*100
+
     # not more tests necessary here as SaltAndPepper is just a tiny wrapper around
     # ReplaceElementwise
 
@@ -8079,6 +9000,19 @@ def test_Add():
     assert params[0].value == 1
     assert params[1].value == 0
 
+    # constant values are applied without sampling, adding 0 leaves the images unchanged
+    image = np.arange(0, 256, 8).astype(np.uint8).reshape((4, 8, 1))
+    images = np.tile(image[np.newaxis, ...], (2, 1, 1, 3))
+    observed = iaa.Add(0).augment_images(images)
+    assert np.array_equal(observed, images)
+    for value in [-20, 30]:
+        expected = np.clip(images.astype(np.int32) + value, 0, 255).astype(np.uint8)
+        assert np.array_equal(iaa.Add(value).augment_images(images), expected)
+        assert np.array_equal(iaa.AddElementwise(value).augment_images(images), expected)
+        observed = iaa.Add(value).augment_image(images[0].astype(np.float32))
+        assert observed.dtype.type == np.float32
+        assert np.allclose(observed, expected[0])
+
 def test_AddElementwise():
     reseed()
 
@@ -8262,6 +9196,23 @@ def test_AddElementwise():
         got_exception = True
     assert got_exception
 
+    # test saturation for uint8, also with non-contiguous images
+    image = np.uint8([[[0, 100, 200], [250, 255, 3]]])
+    aug = iaa.AddElementwise(value=iap.Deterministic(300))
+    assert np.array_equal(aug.augment_image(image), np.full(image.shape, 255, dtype=np.uint8))
+    aug = iaa.AddElementwise(value=iap.Deterministic(-300))
+    assert np.array_equal(aug.augment_image(image), np.zeros(image.shape, dtype=np.uint8))
+    aug = iaa.Sequential([iaa.Fliplr(1.0), iaa.AddElementwise(value=-5)])
+    observed = aug.augment_image(image)
+    expected = np.uint8([[[245, 250, 0], [0, 95, 195]]])
+    assert np.array_equal(observed, expected)
+
+    aug = iaa.AddElementwise(value=iap.Choice([-50, 50]), per_channel=True)
+    image = np.full((4, 4, 5), 100, dtype=np.uint8)
+    observed = aug.augment_image(image)
+    assert observed.shape == image.shape
+    assert np.all(np.logical_or(observed == 50, observed == 150))
+
     # test get_parameters()
     aug = iaa.AddElementwise(value=1, per_channel=False)
     params = aug.get_parameters()
@@ -9335,6 +10286,19 @@ def test_Affine():
     assert params[7] == "cv2"  # backend
     assert params[8] is True  # fit_output
 
+    # default parameters lead to the identity transformation, also for non-image inputs
+    aug = iaa.Affine()
+    image = np.arange(4*5*3).astype(np.uint8).reshape((4, 5, 3))
+    heatmaps = ia.HeatmapsOnImage(np.linspace(0, 1.0, 4*5).reshape((4, 5, 1)).astype(np.float32), shape=(4, 5, 3))
+    kpsoi = ia.KeypointsOnImage([ia.Keypoint(x=1, y=2)], shape=(4, 5, 3))
+    assert np.array_equal(aug.augment_image(image), image)
+    assert np.allclose(aug.augment_heatmaps([heatmaps])[0].get_arr(), heatmaps.get_arr())
+    assert keypoints_equal(aug.augment_keypoints([kpsoi]), [kpsoi])
+    assert not iaa.Affine(rotate=[0, 0])._is_identity()
+    heatmaps_aug = iaa.Affine(rotate=[0, 0]).augment_heatmaps([heatmaps])[0]
+    assert heatmaps_aug.shape == (4, 5, 3)
+    assert np.allclose(heatmaps_aug.get_arr(), heatmaps.get_arr())
+
 
 def test_AffineCv2():
     reseed()
@@ -11893,6 +12857,46 @@ def test_Augmenter_augment_segmentation_maps():
     ], axis=2)
     assert np.allclose(segmap_aug.arr, expected)
 
+    # integer-based maps stay integer-based, i.e. no one-hot arrays are created
+    arr = np.int32([
+        [0, 1, 1],
+        [0, 2, 2],
+        [0, 1, 1]
+    ])
+    segmap = ia.SegmentationMapOnImage(arr, shape=(3, 3), nb_classes=3)
+    assert segmap._arr is None
+    aug = iaa.Sequential([
+        iaa.Fliplr(1.0),
+        iaa.Affine(translate_px={"y": 1}),
+        iaa.CropAndPad(px=(0, 1, 0, 0), keep_size=False),
+        iaa.Add(10)
+    ])
+    segmap_aug = aug.augment_segmentation_maps([segmap])[0]
+    assert segmap_aug.arr_int is not None
+    assert segmap_aug._arr is None
+    assert segmap_aug.arr_int.dtype.type == np.int32
+    assert segmap_aug.shape == (3, 4)
+    expected = np.int32([
+        [-1, -1, -1, -1],
+        [1, 1, 0, -1],
+        [2, 2, 0, -1]
+    ])
+    assert np.array_equal(segmap_aug.arr_int, expected)
+    expected = np.int32([
+        [0, 0, 0, 0],
+        [1, 1, 0, 0],
+        [2, 2, 0, 0]
+    ])
+    assert np.array_equal(segmap_aug.get_arr_int(), expected)
+    assert segmap_aug.arr.shape == (3, 4, 3)
+    assert np.allclose(np.sum(segmap_aug.arr[0, :, :]), 0.0)
+    assert np.array_equal(segmap.arr_int, arr)
+
+    # augmenters without a native implementation use heatmaps internally,
+    # but still return integer-based maps
+    segmap_aug = iaa.ElasticTransformation(alpha=0, sigma=0.25).augment_segmentation_maps([segmap])[0]
+    assert segmap_aug.arr_int is not None
+    assert np.array_equal(segmap_aug.arr_int, arr)
 
 def test_Augmenter_find():
     reseed()
@@ -11936,6 +12940,44 @@ def test_Augmenter_find():
     assert augs[0] == seq1
     assert augs[1] == [seq2]
 
+    augs = seq1.find_augmenters_by_type(iaa.Noop)
+    assert len(augs) == 2
+    assert augs[0] is noop1
+    assert augs[1] is noop2
+
+    augs = seq1.find_augmenters_by_type((iaa.Fliplr, iaa.Flipud), flat=False)
+    assert len(augs) == 2
+    assert augs[0] == [fliplr]
+    assert augs[1] == [[flipud]]
+
+    # lookups must reflect changes of the children lists and of names
+    fliplr2 = iaa.Fliplr(name="Fliplr2")
+    seq2.add(fliplr2)
+    augs = seq1.find_augmenters_by_name(r"Flip.*", regex=True)
+    assert len(augs) == 3
+    assert augs[2] is fliplr2
+    assert seq1.get_all_children(flat=True)[-1] is fliplr2
+
+    del seq2[0]
+    augs = seq1.find_augmenters_by_name(r"Flip.*", regex=True)
+    assert len(augs) == 2
+    assert augs[0] is fliplr
+    assert augs[1] is fliplr2
+
+    fliplr2.name = "Mirror"
+    augs = seq1.find_augmenters_by_names(["Fliplr2", "Mirror"])
+    assert len(augs) == 1
+    assert augs[0] is fliplr2
+
+    sometimes = iaa.Sometimes(0.5, name="Sometimes")
+    seq1.append(sometimes)
+    sometimes.then_list = iaa.Sequential([flipud])
+    augs = seq1.find_augmenters(lambda aug, parents: aug.name == "Flipud")
+    assert len(augs) == 1
+    assert augs[0] is flipud
+    augs = seq1.find_augmenters(lambda aug, parents: aug.name == "Flipud" and parents[-1] is sometimes)
+    assert len(augs) == 1
+
 
 def test_Augmenter_remove():
     reseed()
@@ -12179,6 +13221,207 @@ def test_Augmenter_copy_random_state():
         assert "contains multiple augmenters with the same name" in str(caught_warnings[-1].message)
 
 
+def test_Augmenter_set_nb_workers():
+    reseed()
+
+    seq = iaa.Sequential([
+        iaa.Affine(rotate=(-20, 20)),
+        iaa.Sometimes(0.5, iaa.GaussianBlur((0.5, 1.5))),
+        iaa.AverageBlur((1, 5)),
+        iaa.PerspectiveTransform(scale=0.05),
+        iaa.ElasticTransformation(alpha=2.0, sigma=0.5)
+    ], random_order=True)
+    assert seq.nb_workers == 1
+    assert all([aug.nb_workers == 1 for aug in seq.get_all_children(flat=True)])
+
+    seq_threaded = seq.deepcopy()
+    seq_threaded.set_nb_workers(3)
+    assert seq_threaded.nb_workers == 3
+    assert all([aug.nb_workers == 3 for aug in seq_threaded.get_all_children(flat=True)])
+
+    # the results do not depend on the number of threads
+    images = np.random.RandomState(1).randint(0, 255, size=(8, 32, 32, 3)).astype(np.uint8)
+    seq.reseed(1)
+    seq_threaded.reseed(1)
+    for _ in sm.xrange(3):
+        observed = seq_threaded.augment_images(images)
+        expected = seq.augment_images(images)
+        assert np.array_equal(observed, expected)
+
+    seq_threaded.set_nb_workers(1, recursive=False)
+    assert seq_threaded.nb_workers == 1
+    assert seq_threaded[0].nb_workers == 3
+    seq_threaded.set_nb_workers("auto")
+    assert seq_threaded[0].nb_workers == multiprocessing.cpu_count()
+
+    got_exception = False
+    try:
+        seq.set_nb_workers(0)
+    except Exception as exc:
+        assert "Expected nb_workers" in str(exc)
+        got_exception = True
+    assert got_exception
+
+
+def test_Augmenter_augment_images_parallel():
+    reseed()
+
+    seq = iaa.Sequential([
+        iaa.Affine(rotate=(-20, 20)),
+        iaa.Dropout(0.1)
+    ])
+    images = np.random.RandomState(1).randint(0, 255, size=(10, 16, 16, 3)).astype(np.uint8)
+
+    # the results do not depend on the number of processes, only on the random state and the chunks
+    seq.reseed(1)
+    seq_copy = seq.deepcopy()
+    observed1 = seq.augment_images_parallel(images, processes=2, chunk_size=3)
+    observed2 = seq_copy.augment_images_parallel(images, processes=1, chunk_size=3)
+    assert observed1.shape == images.shape
+    assert observed1.dtype.type == np.uint8
+    assert np.array_equal(observed1, observed2)
+    assert not np.array_equal(observed1, images)
+    assert not np.array_equal(observed1[0:3], observed1[3:6])
+
+    # the default chunk size does not depend on the number of processes either
+    images_many = np.random.RandomState(2).randint(0, 255, size=(30, 16, 16, 3)).astype(np.uint8)
+    seq.reseed(2)
+    seq_copy = seq.deepcopy()
+    observed_p1 = seq.augment_images_parallel(images_many, processes=1)
+    observed_p3 = seq_copy.augment_images_parallel(images_many, processes=3)
+    assert np.array_equal(observed_p1, observed_p3)
+    assert not np.array_equal(observed_p1, images_many)
+
+    # random states are moved forward, unless the augmenter is deterministic
+    observed3 = seq.augment_images_parallel(images, processes=2, chunk_size=3)
+    assert not np.array_equal(observed1, observed3)
+    seq_det = seq.to_deterministic()
+    observed4 = seq_det.augment_images_parallel(images, processes=2, chunk_size=3)
+    observed5 = seq_det.augment_images_parallel(images, processes=2, chunk_size=3)
+    assert np.array_equal(observed4, observed5)
+
+    # input images are not changed, 3d input arrays are supported
+    images_copy = np.copy(images)
+    _ = iaa.Invert(1.0).augment_images_parallel(images, processes=2)
+    assert np.array_equal(images, images_copy)
+    observed = iaa.Invert(1.0).augment_images_parallel(images[..., 0], processes=2)
+    assert np.array_equal(observed, 255 - images[..., 0])
+    assert iaa.Noop().augment_images_parallel(images[0:0]).shape == (0, 16, 16, 3)
+
+    # shape changes are not supported
+    got_exception = False
+    try:
+        _ = iaa.Crop(px=2, keep_size=False).augment_images_parallel(images, processes=2)
+    except Exception as exc:
+        assert "do not change the image shape" in str(exc)
+        got_exception = True
+    assert got_exception
+
+
+def test_Augmenter_default_hooks():
+    reseed()
+
+    images = np.random.randint(0, 255, size=(4, 8, 8, 3)).astype(np.uint8)
+    keypoints = [ia.KeypointsOnImage([ia.Keypoint(x=1, y=2)], shape=(8, 8, 3)) for _ in sm.xrange(4)]
+
+    # augmenting without hooks leads to the same results as with hooks that have no callbacks
+    seq = iaa.Sequential([iaa.Fliplr(0.5), iaa.Sometimes(0.5, iaa.Add((-20, 20))), iaa.Affine(rotate=(-20, 20))])
+    seq_copy = seq.deepcopy()
+    for _ in sm.xrange(3):
+        observed1 = seq.augment_images(images)
+        observed2 = seq_copy.augment_images(images, hooks=ia.HooksImages())
+        assert np.array_equal(observed1, observed2)
+        observed1 = seq.augment_keypoints(keypoints)
+        observed2 = seq_copy.augment_keypoints(keypoints, hooks=ia.HooksKeypoints())
+        assert np.allclose([kpsoi.get_coords_array() for kpsoi in observed1],
+                           [kpsoi.get_coords_array() for kpsoi in observed2])
+
+    # stochastic augmenters still produce new results in each call
+    aug = iaa.Add((-100, 100), per_channel=True)
+    observed1 = aug.augment_images(images)
+    observed2 = aug.augment_images(images)
+    assert not np.array_equal(observed1, observed2)
+
+    # deterministic augmenters still produce the same results in each call
+    aug_det = aug.to_deterministic()
+    observed1 = aug_det.augment_images(images)
+    observed2 = aug_det.augment_images(images)
+    assert np.array_equal(observed1, observed2)
+
+    # shallow copies use their own copies of the random state
+    aug_copy = aug_det.copy()
+    _ = aug_copy.augment_images(images)
+    assert aug_copy._random_state_scratch[1] is not aug_det._random_state_scratch[1]
+
+    # hooks are still used if provided
+    hooks = ia.HooksImages(activator=lambda images, augmenter, parents, default: False)
+    observed = aug.augment_images(images, hooks=hooks)
+    assert np.array_equal(observed, images)
+
+
+def test_Augmenter_augment_indexed_batch():
+    reseed()
+
+    assert ia.derive_sample_seed(1, 0, 0) == 2978611956
+    assert ia.derive_sample_seed(1, 0, 0) != ia.derive_sample_seed(1, 0, 1)
+    assert ia.derive_sample_seed(1, 0, 0) != ia.derive_sample_seed(1, 1, 0)
+    assert ia.derive_sample_seed(1, 0, 0) != ia.derive_sample_seed(2, 0, 0)
+
+    rs = np.random.RandomState(1)
+    images = rs.randint(0, 255, size=(8, 16, 16, 3)).astype(np.uint8)
+    keypoints = [ia.KeypointsOnImage([ia.Keypoint(x=2, y=3)], shape=(16, 16, 3)) for _ in sm.xrange(8)]
+    aug = iaa.Sequential([iaa.Fliplr(0.5), iaa.Add((-20, 20)), iaa.Affine(translate_px=(-3, 3))], random_state=1)
+    aug_state_before = aug.random_state.get_state()
+
+    batch_aug = aug.augment_indexed_batch(ia.Batch(images=images, keypoints=keypoints, data=np.arange(8)),
+                                          seed=5, epoch=1)
+    assert ia.is_np_array(batch_aug.images_aug)
+    assert batch_aug.images_aug.shape == images.shape
+    assert len(batch_aug.keypoints_aug) == 8
+    assert np.array_equal(aug.random_state.get_state()[1], aug_state_before[1])
+
+    # each sample is augmented with a deterministic augmenter that was reseeded with the sample's seed,
+    # hence images and keypoints of the same sample are augmented in the same way
+    for i in sm.xrange(8):
+        aug_det = aug.to_deterministic()
+        aug_det.reseed(ia.derive_sample_seed(5, 1, i), deterministic_too=True)
+        assert np.array_equal(batch_aug.images_aug[i], aug_det.augment_image(images[i]))
+        kp_aug = batch_aug.keypoints_aug[i].keypoints[0]
+        kp_expected = aug_det.augment_keypoints([keypoints[i]])[0].keypoints[0]
+        assert np.allclose([kp_aug.x, kp_aug.y], [kp_expected.x, kp_expected.y])
+
+    # the same sample is augmented in the same way in other batches and positions
+    order = [6, 1, 4]
+    batch_aug_subset = aug.augment_indexed_batch(ia.Batch(images=[images[i] for i in order]), seed=5, epoch=1,
+                                                 sample_indices=order)
+    assert isinstance(batch_aug_subset.images_aug, list)
+    for image_aug, i in zip(batch_aug_subset.images_aug, order):
+        assert np.array_equal(image_aug, batch_aug.images_aug[i])
+
+    # other epochs lead to other augmentations
+    batch_aug_epoch = aug.augment_indexed_batch(ia.Batch(images=images, data=np.arange(8)), seed=5, epoch=2)
+    assert not np.array_equal(batch_aug_epoch.images_aug, batch_aug.images_aug)
+
+    # the background workers that augment a batch do not affect the results
+    def _load_func():
+        for i in sm.xrange(4):
+            yield ia.Batch(images=images[i*2:(i+1)*2], data=np.arange(i*2, (i+1)*2))
+
+    loader = ia.BatchLoader(_load_func, threaded=True)
+    bg_augmenter = ia.BackgroundAugmenter(loader, aug, nb_workers=2, sample_seed=5, epoch=1)
+    nb_batches = 0
+    while True:
+        batch_bg = bg_augmenter.get_batch()
+        if batch_bg is None:
+            break
+        for image_aug, i in zip(batch_bg.images_aug, batch_bg.data):
+            assert np.array_equal(image_aug, batch_aug.images_aug[i])
+        nb_batches += 1
+    assert nb_batches == 4
+    loader.terminate()
+    bg_augmenter.terminate()
+
+
 def test_Sequential():
     reseed()
 
@@ -12533,6 +13776,59 @@ def test_Sequential():
     assert aug.__str__() == aug.__repr__() == expected
 
 
+def test_Sequential_pointwise_fusion():
+    reseed()
+
+    images = np.random.randint(0, 255, size=(4, 16, 16, 3)).astype(np.uint8)
+    images_list = [np.random.randint(0, 255, size=(8+i, 12, nb_channels)).astype(np.uint8)
+                   for i, nb_channels in enumerate([1, 3, 4])]
+    # hooks with an activator deactivate the fusion
+    hooks_no_fusion = ia.HooksImages(activator=lambda images, augmenter, parents, default: default)
+
+    seq = iaa.Sequential([
+        iaa.Add((-40, 40), per_channel=0.5),
+        iaa.Multiply((0.5, 1.5), per_channel=0.5),
+        iaa.ContrastNormalization((0.5, 1.5), per_channel=0.5),
+        iaa.GammaContrast((0.5, 2.0), per_channel=0.5),
+        iaa.Sometimes(0.5, iaa.Invert(0.5, per_channel=0.5)),
+        iaa.SomeOf((0, 2), [iaa.Add(10), iaa.Noop(), iaa.LinearContrast((0.5, 1.5))], random_order=True),
+        iaa.Fliplr(0.5),
+        iaa.Add((-10, 10)),
+        iaa.Multiply((0.8, 1.2))
+    ])
+    runs = seq._get_fused_runs(ia.HooksImages())
+    assert [len(run) for run in runs] == [6, 1, 2]
+    assert len(seq._get_fused_runs(hooks_no_fusion)) == len(seq)
+
+    # results (and random states) are identical to the non-fused execution,
+    # also if the augmenters share the global random state
+    for random_state in [None, 1]:
+        seq_fused = seq.deepcopy()
+        if random_state is not None:
+            seq_fused.reseed(random_state)
+        seq_unfused = seq_fused.deepcopy()
+        for _ in sm.xrange(3):
+            for inputs in [images, images_list, images[..., 0]]:
+                observed = seq_fused.augment_images(inputs)
+                expected = seq_unfused.augment_images(inputs, hooks=hooks_no_fusion)
+                assert all([np.array_equal(image_obs, image_exp) for image_obs, image_exp in zip(observed, expected)])
+
+    # same for SomeOf with only pointwise children
+    aug_fused = iaa.SomeOf((1, None), [iaa.Add((-20, 20)), iaa.Multiply((0.5, 1.5), per_channel=True), iaa.Invert(0.3)])
+    aug_unfused = aug_fused.deepcopy()
+    for _ in sm.xrange(3):
+        observed = aug_fused.augment_images(images)
+        expected = aug_unfused.augment_images(images, hooks=hooks_no_fusion)
+        assert np.array_equal(observed, expected)
+
+    # non-uint8 images are augmented without lookup tables
+    images_float = images.astype(np.float32)
+    seq_fused = iaa.Sequential([iaa.Add(10), iaa.Multiply(2.0)])
+    observed = seq_fused.augment_images(images_float)
+    assert observed.dtype.type == np.float32
+    assert np.allclose(observed, np.clip((images_float + 10) * 2.0, 0, 255))
+
+
 def test_SomeOf():
     reseed()
 
@@ -13284,6 +14580,102 @@ def test_WithChannels():
     assert aug.__repr__() == aug.__str__() == expected
 
 
+def test_Cached():
+    reseed()
+
+    images = np.random.randint(0, 255, size=(4, 10, 12, 3)).astype(np.uint8)
+
+    # deterministic children lead to cache hits
+    aug = iaa.Cached(iaa.Affine(rotate=(-45, 45)))
+    aug_det = aug.to_deterministic()
+    observed1 = aug_det.augment_images(images)
+    observed2 = aug_det.augment_images(images)
+    assert np.array_equal(observed1, observed2)
+    assert aug_det.get_cache_info()["nb_hits"] == 1
+    assert aug_det.get_cache_info()["nb_misses"] == 1
+    assert aug_det.get_cache_info()["nb_entries"] == 1
+    assert aug_det.get_cache_info()["nb_bytes"] == observed1.nbytes
+    # the cache is shared with the source augmenter
+    assert aug.get_cache_info()["nb_hits"] == 1
+
+    # results are copied, i.e. changing them does not change the cache
+    observed2[...] = 0
+    observed3 = aug_det.augment_images(images)
+    assert np.array_equal(observed1, observed3)
+
+    # different images and different deterministic random states lead to misses
+    observed = aug_det.augment_images(images[::-1])
+    assert aug_det.get_cache_info()["nb_misses"] == 2
+    aug_det2 = aug.to_deterministic()
+    _ = aug_det2.augment_images(images)
+    assert aug.get_cache_info()["nb_misses"] == 3
+
+    # results of stochastic children are not reused
+    def _rewind_random_states(aug):
+        aug.children.random_state = ia.new_random_state(1)
+        aug.children[0].random_state = ia.new_random_state(2)
+
+    aug = iaa.Cached(iaa.Add((-50, 50)))
+    _rewind_random_states(aug)
+    observed1 = aug.augment_images(images)
+    _rewind_random_states(aug)
+    observed2 = aug.augment_images(images)
+    observed3 = aug.augment_images(images)
+    assert np.array_equal(observed1, observed2)
+    assert not np.array_equal(observed2, observed3)
+    assert aug.get_cache_info()["nb_hits"] == 1
+    assert aug.get_cache_info()["nb_misses"] == 2
+
+    # ids instead of image contents
+    aug = iaa.Cached(iaa.Add(10)).to_deterministic()
+    observed1 = aug.augment_images(images, ids=[0, 1, 2, 3])
+    observed2 = aug.augment_images(np.zeros_like(images), ids=[0, 1, 2, 3])
+    assert np.array_equal(observed1, observed2)
+    assert np.array_equal(observed1, np.clip(images.astype(np.int32) + 10, 0, 255).astype(np.uint8))
+    _ = aug.augment_images(images, ids=[4, 5, 6, 7])
+    assert aug.get_cache_info()["nb_hits"] == 1
+    assert aug.get_cache_info()["nb_misses"] == 2
+
+    # ids from Batch.data
+    batches = [ia.Batch(images=np.zeros_like(images), data=[0, 1, 2, 3])]
+    batch_aug = list(aug.augment_batches(batches))[0]
+    assert np.array_equal(batch_aug.images_aug, observed1)
+    assert batch_aug.data == [0, 1, 2, 3]
+    assert aug.get_cache_info()["nb_hits"] == 2
+
+    # least recently used results are removed when the cache is full
+    aug = iaa.Cached(iaa.Add(10), max_bytes=2*images.nbytes).to_deterministic()
+    for i in sm.xrange(3):
+        _ = aug.augment_images(images, ids=[i, i, i, i])
+    assert aug.get_cache_info()["nb_entries"] == 2
+    assert aug.get_cache_info()["nb_bytes"] == 2*images.nbytes
+    _ = aug.augment_images(images, ids=[0, 0, 0, 0])
+    assert aug.get_cache_info()["nb_hits"] == 0
+    _ = aug.augment_images(images, ids=[2, 2, 2, 2])
+    assert aug.get_cache_info()["nb_hits"] == 1
+
+    # other augmentables are passed through to the children
+    aug = iaa.Cached(iaa.Fliplr(1.0))
+    kpsoi = ia.KeypointsOnImage([ia.Keypoint(x=1, y=2)], shape=(10, 12, 3))
+    observed = aug.augment_keypoints([kpsoi])
+    expected = iaa.Fliplr(1.0).augment_keypoints([kpsoi])
+    assert np.allclose(observed[0].get_coords_array(), expected[0].get_coords_array())
+
+    # results in a cache directory are reused by new augmenters
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        aug = iaa.Cached(iaa.Add(10), cache_dir=tmp_dir).to_deterministic()
+        observed1 = aug.augment_images(images, ids=["a", "b", "c", "d"])
+        aug_new = iaa.Cached(iaa.Add(10), cache_dir=tmp_dir)
+        aug_new.children = aug.children
+        assert aug_new.get_cache_info()["nb_entries"] == 1
+        observed2 = aug_new.augment_images(np.zeros_like(images), ids=["a", "b", "c", "d"])
+        assert np.array_equal(observed1, observed2)
+        assert aug_new.get_cache_info()["nb_hits"] == 1
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
 def test_2d_inputs():
     """Test whether inputs of 2D-images (i.e. (H, W) instead of (H, W, C)) work.
     """
@@ -15184,6 +16576,35 @@ def test_parameters_Deterministic():
         got_exception = True
     assert got_exception
 
+    # constness
+    param = iap.Deterministic(2)
+    assert param.is_constant()
+    assert param.get_constant_value() == 2
+    assert not iap.Uniform(0, 1).is_constant()
+    assert iap.Binomial(1.0).is_constant()
+    assert iap.Binomial(1.0).get_constant_value() == 1
+    assert iap.Binomial(0).get_constant_value() == 0
+    assert not iap.Binomial(0.5).is_constant()
+    got_exception = False
+    try:
+        _ = iap.Uniform(0, 1).get_constant_value()
+    except Exception as exc:
+        assert "is not constant" in str(exc)
+        got_exception = True
+    assert got_exception
+
+    # draw_samples_seeded() leads to the same values as draw_samples() with a seeded random state
+    for param in [iap.Deterministic(2), iap.Deterministic(0.5), iap.Deterministic("foo"), iap.Binomial(1.0),
+                  iap.Uniform(0, 1), iap.Binomial(0.5)]:
+        samples_seeded = param.draw_samples_seeded((3, 2), 123)
+        samples = param.draw_samples((3, 2), random_state=ia.new_random_state(123))
+        assert samples_seeded.shape == (3, 2)
+        assert samples_seeded.dtype.kind == samples.dtype.kind
+        assert np.array_equal(samples_seeded, samples)
+    samples = iap.Deterministic(0.7).draw_samples_seeded((4,), 1, dtype=np.bool_)
+    assert samples.dtype.type == np.bool_
+    assert np.all(samples)
+
 
 def test_parameters_FromLowerResolution():
     reseed()
@@ -15218,6 +16639,29 @@ def test_parameters_FromLowerResolution():
     uq = np.unique(samples)
     assert len(uq) == 2 and (0 in uq or 1 in uq)
 
+    # masks are returned as uint8 or bool when using nearest neighbour interpolation
+    param = iap.FromLowerResolution(iap.Binomial(0.5), size_px=4)
+    samples = param.draw_samples((3, 8, 8, 2))
+    assert samples.dtype.type == np.uint8
+    assert np.all(np.logical_or(samples == 0, samples == 1))
+    param = iap.FromLowerResolution(iap.Choice([True, False]), size_px=4)
+    samples = param.draw_samples((3, 8, 8, 2))
+    assert samples.dtype.type == np.bool_
+
+    # non-nearest methods still lead to float results
+    param = iap.FromLowerResolution(iap.Binomial(0.5), size_px=4, method=iap.Choice(["nearest", "linear"]))
+    samples = param.draw_samples((10, 8, 8, 1))
+    assert samples.dtype.type == np.float32
+    assert np.all(np.logical_and(samples >= 0.0, samples <= 1.0))
+
+    # planes of different images are sampled independently, also with threads
+    param = iap.FromLowerResolution(iap.Binomial(iap.Choice([0.0, 1.0])), size_px=4, nb_workers=2)
+    samples = param.draw_samples((50, 8, 8, 1))
+    nb_ones = np.sum([np.all(samples_i == 1) for samples_i in samples])
+    nb_zeros = np.sum([np.all(samples_i == 0) for samples_i in samples])
+    assert nb_ones + nb_zeros == 50
+    assert 10 < nb_ones < 40
+
     # different sizes in px
     param1 = iap.FromLowerResolution(iap.Binomial(0.5), size_px=2)
     param2 = iap.FromLowerResolution(iap.Binomial(0.5), size_px=16)
@@ -16528,6 +17972,73 @@ def test_parameters_copy():
     assert param_copy.other_param.a[0] != param.other_param.a[0]
 
 
+def test_parameters_draw_samples_dtype():
+    reseed()
+
+    # Binomial generates masks directly in the requested dtype
+    param = iap.Binomial(0.5)
+    samples = param.draw_samples((100, 100), dtype=np.bool_)
+    assert samples.dtype.type == np.bool_
+    assert 0.45 < np.mean(samples) < 0.55
+    samples = param.draw_samples((100, 100), dtype=np.uint8)
+    assert samples.dtype.type == np.uint8
+    assert np.all(np.logical_or(samples == 0, samples == 1))
+    samples = param.draw_samples((100, 100), dtype=np.float32)
+    assert samples.dtype.type == np.float32
+    assert np.all(np.logical_or(samples == 0, samples == 1))
+    assert iap.Binomial(0).draw_samples((10,), dtype=np.bool_).sum() == 0
+    assert iap.Binomial(1).draw_samples((10,), dtype=np.bool_).sum() == 10
+
+    # Deterministic
+    samples = iap.Deterministic(2.7).draw_samples((2, 3), dtype=np.uint8)
+    assert samples.dtype.type == np.uint8
+    assert np.all(samples == 3)
+    samples = iap.Deterministic(1).draw_samples((2, 3), dtype=np.bool_)
+    assert samples.dtype.type == np.bool_
+    assert np.all(samples)
+
+    # conversion of parameters without a specialized implementation
+    samples = iap.Uniform(-10, 300).draw_samples((1000,), dtype=np.uint8)
+    assert samples.dtype.type == np.uint8
+    assert np.min(samples) == 0 and np.max(samples) == 255
+    samples = iap.Uniform(0.0, 1.0).draw_samples((1000,), dtype=np.bool_)
+    assert samples.dtype.type == np.bool_
+    assert 0.4 < np.mean(samples) < 0.6
+
+    # arithmetic parameters compute in the requested float dtype
+    param = iap.Clip(iap.Uniform(0.0, 1.0) * 2 + 1 - 0.5, 0.75, 2.0) / 2
+    samples = param.draw_samples((1000,), dtype=np.float32)
+    assert samples.dtype.type == np.float32
+    assert np.all(np.logical_and(samples >= 0.375 - 1e-6, samples <= 1.0 + 1e-6))
+    samples_f64 = param.draw_samples((1000,), random_state=np.random.RandomState(1), dtype=np.float64)
+    samples_none = param.draw_samples((1000,), random_state=np.random.RandomState(1))
+    assert samples_f64.dtype.type == np.float64
+    assert np.allclose(samples_f64, samples_none)
+
+    # elementwise arithmetic
+    param = iap.Multiply(iap.Uniform(1.0, 2.0), iap.Uniform(1.0, 2.0), elementwise=True)
+    samples = param.draw_samples((1000,), dtype=np.float32)
+    assert samples.dtype.type == np.float32
+    assert np.all(np.logical_and(samples >= 1.0, samples <= 4.0))
+    param = iap.Divide(iap.Uniform(1.0, 2.0), iap.Choice([0, 2]), elementwise=True)
+    samples = param.draw_samples((1000,), dtype=np.float32)
+    assert np.all(np.logical_and(samples >= 0.5, samples <= 2.0))
+
+    # integer results of arithmetic parameters are rounded
+    samples = (iap.Deterministic(1) * 2.6).draw_samples((10,), dtype=np.uint8)
+    assert samples.dtype.type == np.uint8
+    assert np.all(samples == 3)
+
+    # FromLowerResolution
+    param = iap.FromLowerResolution(iap.Binomial(0.5), size_px=4)
+    samples = param.draw_samples((2, 8, 8, 3), dtype=np.bool_)
+    assert samples.dtype.type == np.bool_
+    param = iap.FromLowerResolution(iap.Binomial(0.5), size_px=4, method="linear")
+    samples = param.draw_samples((2, 8, 8, 3), dtype=np.uint8)
+    assert samples.dtype.type == np.uint8
+    assert np.all(np.logical_or(samples == 0, samples == 1))
+
+
 def create_random_images(size):
     return np.random.uniform(0, 255, size).astype(np.uint8)
 